@@ -0,0 +1,3 @@
+# benchmarks of the ORTEGA pipeline on synthetic tracking data; run with `python -m benchmarks --help`
+from .synthetic import *
+from .run import benchmark, plot_scaling
@@ -0,0 +1,153 @@
+import argparse
+import time
+import tracemalloc
+from datetime import datetime as datetime
+from typing import Any, Callable, Dict, List
+import pandas as pd
+from ortega.ellipses import EllipseList, ellipse_table
+from ortega.ortega import get_timedelay_candidates, get_spatial_intersect_index, intersection_table, \
+    interaction_compute_speed_diff, interaction_compute_direction_diff, interaction_compute_time_diff, \
+    check_continuous
+from ortega.output import ORTEGAResults
+from .synthetic import synthetic_tracks
+
+SIZES = [1000, 10000, 100000, 1000000]
+STAGES = ["ppa_generation", "delay_filtering", "spatial_pairing", "pair_table", "check_continuous",
+          "attach_attributes"]
+
+
+def run_stage(func: Callable[[], Any], memory: bool = True):
+    """
+    Time one stage of the pipeline, then run it again under tracemalloc to measure its peak memory
+    :param func: the stage, without arguments
+    :param memory: if False, skip the second run and report no peak memory
+    :return: result of the stage, time in seconds, peak memory in MB (or None)
+    """
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def benchmark(n_fixes: int, seed: int = 0, minute_min_delay: float = 0, minute_max_delay: float = 10,
+              max_el_time_min: float = 60, speed_average: bool = True, analytic: bool = False,
+              memory: bool = True, **synthetic_kwargs) -> List[Dict[str, Any]]:
+    """
+    Run the interaction analysis of a synthetic co-moving pair stage by stage
+    :param n_fixes: total number of fixes of the two individuals
+    :param seed: seed of the synthetic data
+    :param minute_min_delay: allowable minimum delay for intersecting PPAs, in minute
+    :param minute_max_delay: allowable maximum delay for intersecting PPAs, in minute
+    :param max_el_time_min: PPA's interval greater than this value will be eliminated, in minute
+    :param speed_average: if True, apply speed average to compute max speed for PPA
+    :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+    :param memory: if True, measure the peak memory of each stage
+    :param synthetic_kwargs: other parameters of synthetic_tracks
+    :return: one record per stage with the time, the peak memory and the number of items the stage produced
+    """
+    data = synthetic_tracks(n_fixes, n_individuals=2, seed=seed, **synthetic_kwargs)
+    df1, df2 = data[data["pid"] == 0], data[data["pid"] == 1]
+    records = []
+
+    def record(stage, func, count):
+        result, seconds, peak = run_stage(func, memory)
+        records.append({"n_fixes": n_fixes, "stage": stage, "seconds": seconds, "peak_mb": peak,
+                        "count": count(result)})
+        return result
+
+    def generate():
+        ellipse_lists = []
+        for df in [df1, df2]:
+            ellipse_list = EllipseList("latitude", "longitude", "pid", "time_local", ["speed"])
+            ellipse_list.generate_batch(df, max_el_time_min=max_el_time_min, speed_average=speed_average)
+            ellipse_lists.append(ellipse_list)
+        return ellipse_lists
+
+    gen1, gen2 = record("ppa_generation", generate, lambda r: len(r[0].list) + len(r[1].list))
+    l1, l2 = gen1.list, gen2.list
+    candidates = record("delay_filtering",
+                        lambda: get_timedelay_candidates(l1, l2, minute_min_delay, minute_max_delay),
+                        lambda r: len(r[0]))
+    index1, index2 = record("spatial_pairing",
+                            lambda: get_spatial_intersect_index(l1, l2, candidates, analytic),
+                            lambda r: len(r[0]))
+
+    def pair_table():
+        df = intersection_table(ellipse_table(l1), ellipse_table(l2), index1, index2, ["speed"])
+        df = interaction_compute_speed_diff(df)
+        df = interaction_compute_direction_diff(df)
+        return interaction_compute_time_diff(df)
+
+    pairs = record("pair_table", pair_table, len)
+    record("check_continuous", lambda: check_continuous(pairs, 0, 1), len)
+
+    def attach():
+        results = ORTEGAResults(df_all_intersection_pairs=pairs, attributes={0: gen1.attrs, 1: gen2.attrs})
+        results.attach_attributes("speed", "mean")
+        return results.df_all_intersection_pairs
+
+    record("attach_attributes", attach, len)
+    return records
+
+
+def plot_scaling(results: pd.DataFrame, path: str):
+    """
+    Plot the time and the peak memory of each stage against the number of fixes on log-log axes
+    :param results: records of benchmark
+    :param path: file to save the figure to
+    """
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for stage, df in results.groupby("stage", sort=False):
+        axes[0].plot(df["n_fixes"], df["seconds"], "o-", label=stage)
+        if df["peak_mb"].notna().any():
+            axes[1].plot(df["n_fixes"], df["peak_mb"], "o-", label=stage)
+    for ax, label in zip(axes, ["time (s)", "peak memory (MB)"]):
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("number of fixes")
+        ax.set_ylabel(label)
+    axes[0].legend()
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the ORTEGA interaction analysis on "
+                                                 "synthetic tracking data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of fixes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-delay", type=float, default=0, help="minute_min_delay")
+    parser.add_argument("--max-delay", type=float, default=10, help="minute_max_delay")
+    parser.add_argument("--analytic", action="store_true", help="test PPA overlap on the exact ellipses")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--output", help="save the results to this csv file")
+    parser.add_argument("--plot", help="save the scaling curves to this image file")
+    args = parser.parse_args(argv)
+
+    records = []
+    for n_fixes in args.sizes:
+        print(datetime.now(), f"Benchmark {n_fixes} fixes...")
+        records += benchmark(n_fixes, seed=args.seed, minute_min_delay=args.min_delay,
+                             minute_max_delay=args.max_delay, analytic=args.analytic, memory=not args.no_memory)
+    results = pd.DataFrame(records)
+    with pd.option_context("display.width", 120, "display.max_rows", None):
+        print(results.pivot(index="stage", columns="n_fixes", values="seconds").loc[STAGES].round(3))
+        if not args.no_memory:
+            print(results.pivot(index="stage", columns="n_fixes", values="peak_mb").loc[STAGES].round(1))
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+    if args.plot is not None:
+        plot_scaling(results, args.plot)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+from typing import List, Union
+import numpy as np
+import pandas as pd
+
+
+def correlated_random_walk(
+        n: int,
+        rng: np.random.Generator,
+        interval: float = 60,
+        interval_jitter: float = 0.2,
+        gap_rate: float = 0.001,
+        gap_minutes: float = 120,
+        speed: float = 1.5,
+        heading_sd: float = 0.3,
+):
+    """
+    Simulate one track as a correlated random walk: the heading of each step turns from the previous heading by a
+    normally distributed angle and the speed of each step is log-normally distributed around the given speed
+    :param n: number of fixes
+    :param rng: numpy random generator
+    :param interval: sampling interval, in seconds
+    :param interval_jitter: relative jitter of the sampling interval (uniform in +/- interval * interval_jitter)
+    :param gap_rate: probability that a fix is followed by a gap in the tracking
+    :param gap_minutes: minimum length of a gap, in minutes (gaps are between one and two times this length)
+    :param speed: median speed, in m/s
+    :param heading_sd: standard deviation of the turning angle between two steps, in radians
+    :return: time of each fix in seconds since the first fix, x and y in meters
+    """
+    dt = interval * (1 + interval_jitter * rng.uniform(-1, 1, n - 1))
+    gaps = rng.random(n - 1) < gap_rate
+    dt[gaps] += gap_minutes * 60 * rng.uniform(1, 2, gaps.sum())
+    heading = rng.uniform(0, 2 * np.pi) + np.cumsum(rng.normal(0, heading_sd, n - 1))
+    step = speed * rng.lognormal(0, 0.5, n - 1) * np.minimum(dt, interval * (1 + interval_jitter))
+    t = np.concatenate([[0], np.cumsum(dt)])
+    x = np.concatenate([[0], np.cumsum(step * np.cos(heading))])
+    y = np.concatenate([[0], np.cumsum(step * np.sin(heading))])
+    return t, x, y
+
+
+def synthetic_tracks(
+        n_fixes: int,
+        n_individuals: int = 2,
+        seed: int = 0,
+        interval: Union[float, List[float]] = None,
+        interval_jitter: float = 0.2,
+        gap_rate: float = 0.001,
+        gap_minutes: float = 120,
+        speed: float = 1.5,
+        heading_sd: float = 0.3,
+        co_moving: bool = True,
+        lag_minutes: float = 5,
+        leash: float = 30,
+        start_time: str = "2024-01-01 00:00:00",
+) -> pd.DataFrame:
+    """
+    Generate reproducible synthetic tracking data for benchmarking, in projected coordinates (meters)
+    :param n_fixes: total number of fixes, split evenly between the individuals
+    :param n_individuals: number of individuals
+    :param seed: seed of the random generator
+    :param interval: sampling interval of each individual, in seconds; by default the individuals have different
+        sampling rates (60 s, 90 s, 120 s, ...)
+    :param interval_jitter: relative jitter of the sampling interval
+    :param gap_rate: probability that a fix is followed by a gap in the tracking
+    :param gap_minutes: minimum length of a gap, in minutes
+    :param speed: median speed, in m/s
+    :param heading_sd: standard deviation of the turning angle between two steps, in radians
+    :param co_moving: if True, the individuals follow the first one (a correlated random walk) with a time lag and a
+        random offset, so that they interact; otherwise each individual is an independent random walk
+    :param lag_minutes: maximum time lag of the followers behind the first individual, in minutes
+    :param leash: standard deviation of the offset of the followers from the first individual, in meters
+    :param start_time: time of the first fix
+    :return: dataframe with the columns 'pid', 'time_local', 'latitude' (y), 'longitude' (x) and 'speed' (the speed
+        from the previous fix, in m/s), sorted by pid and time
+    """
+    if n_individuals < 1:
+        raise ValueError("Parameter 'n_individuals' must be at least 1!")
+    if interval is None:
+        interval = [60 * (1 + 0.5 * k) for k in range(n_individuals)]
+    elif not isinstance(interval, list):
+        interval = [interval] * n_individuals
+    rng = np.random.default_rng(seed)
+    counts = np.full(n_individuals, n_fixes // n_individuals)
+    counts[:n_fixes % n_individuals] += 1
+
+    tracks = []
+    leader = None
+    for k in range(n_individuals):
+        t, x, y = correlated_random_walk(int(counts[k]), rng, interval[k], interval_jitter, gap_rate, gap_minutes,
+                                         speed, heading_sd)
+        if co_moving and leader is not None:
+            # follow the first individual: its position a few minutes earlier plus a random offset
+            lag = rng.uniform(0, lag_minutes * 60)
+            t = t + rng.uniform(0, interval[k])
+            x = np.interp(t - lag, leader[0], leader[1]) + rng.normal(0, leash, t.size)
+            y = np.interp(t - lag, leader[0], leader[2]) + rng.normal(0, leash, t.size)
+        elif leader is not None:
+            x, y = x + rng.normal(0, 1000), y + rng.normal(0, 1000)
+        if leader is None:
+            leader = (t, x, y)
+        step_speed = np.hypot(np.diff(x), np.diff(y)) / np.diff(t)
+        tracks.append(pd.DataFrame({
+            "pid": k,
+            "time_local": pd.Timestamp(start_time) + pd.to_timedelta(np.round(t), unit="s"),
+            "latitude": y,
+            "longitude": x,
+            "speed": np.concatenate([[0], step_speed]),
+        }))
+    return pd.concat(tracks, ignore_index=True)
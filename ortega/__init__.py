@@ -2,3 +2,9 @@ from .ortega import *
 from .ellipses import *
 from .STPoint import *
 from .visualization import *
+from .basemap import *
+from .group import *
+from .geodesic import *
+from .instrumentation import *
+from .cache import *
+from .streaming import *
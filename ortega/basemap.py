@@ -0,0 +1,298 @@
+import io
+import math
+import os
+import sqlite3
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Tuple, Union
+import numpy as np
+from pyproj import CRS, Transformer
+
+# half the width of the Web Mercator (EPSG:3857) world, in meter
+MERCATOR_HALF_WIDTH = math.pi * 6378137.0
+TILE_SIZE = 256
+# most tiles fetched for one basemap; the zoom level is lowered until the extent fits in this many tiles
+MAX_TILES = 64
+
+
+def mercator_tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """
+    Web Mercator bounds of an XYZ tile
+    :return: xmin, ymin, xmax, ymax in meter
+    """
+    size = 2 * MERCATOR_HALF_WIDTH / 2 ** z
+    return (-MERCATOR_HALF_WIDTH + x * size, MERCATOR_HALF_WIDTH - (y + 1) * size,
+            -MERCATOR_HALF_WIDTH + (x + 1) * size, MERCATOR_HALF_WIDTH - y * size)
+
+
+def tile_range(bounds: Tuple[float, float, float, float], z: int) -> Tuple[int, int, int, int]:
+    """
+    XYZ tiles of zoom level z covering Web Mercator bounds
+    :param bounds: xmin, ymin, xmax, ymax in meter
+    :param z: zoom level
+    :return: first x, first y, last x, last y (inclusive)
+    """
+    n = 2 ** z
+    size = 2 * MERCATOR_HALF_WIDTH / n
+    xmin, ymin, xmax, ymax = bounds
+
+    def clip(value):
+        return min(max(int(math.floor(value)), 0), n - 1)
+
+    return (clip((xmin + MERCATOR_HALF_WIDTH) / size), clip((MERCATOR_HALF_WIDTH - ymax) / size),
+            clip((xmax + MERCATOR_HALF_WIDTH) / size), clip((MERCATOR_HALF_WIDTH - ymin) / size))
+
+
+def auto_zoom(bounds: Tuple[float, float, float, float], width_px: float, min_zoom: int = 0,
+              max_zoom: int = 19) -> int:
+    """
+    Zoom level whose resolution matches the width of the axes, lowered until the bounds fit in MAX_TILES tiles
+    :param bounds: xmin, ymin, xmax, ymax in meter
+    :param width_px: width of the axes, in pixel
+    """
+    width = max(bounds[2] - bounds[0], bounds[3] - bounds[1], 1e-9)
+    z = int(math.ceil(math.log2(2 * MERCATOR_HALF_WIDTH * max(width_px, 1) / (TILE_SIZE * width))))
+    z = min(max(z, min_zoom), max_zoom)
+    while z > min_zoom:
+        x0, y0, x1, y1 = tile_range(bounds, z)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= MAX_TILES:
+            break
+        z -= 1
+    return z
+
+
+class TileSource(ABC):
+    # base class of the basemap tile sources: tile() returns the encoded image (png, jpg, ...) of an XYZ tile, or
+    # None if the source does not have it; the decoded tiles are kept in memory for the next plots
+    min_zoom = 0
+    max_zoom = 19
+    attribution = None
+
+    def __init__(self, memory_tiles: int = 256):
+        self.memory_tiles = memory_tiles
+        self._images = OrderedDict()
+
+    @abstractmethod
+    def tile(self, z: int, x: int, y: int) -> Union[bytes, None]:
+        """
+        Encoded XYZ tile
+        :return: bytes of the image, or None if the source does not have the tile
+        """
+
+    def image(self, z: int, x: int, y: int) -> Union[np.ndarray, None]:
+        """
+        Decoded XYZ tile
+        :return: RGBA np.ndarray of uint8 of shape (TILE_SIZE, TILE_SIZE, 4), or None if missing
+        """
+        key = (z, x, y)
+        if key in self._images:
+            self._images.move_to_end(key)
+            return self._images[key]
+        data = self.tile(z, x, y)
+        image = None
+        if data is not None:
+            from PIL import Image
+
+            with Image.open(io.BytesIO(data)) as tile:
+                image = np.asarray(tile.convert("RGBA").resize((TILE_SIZE, TILE_SIZE)), dtype=np.uint8)
+        self._images[key] = image
+        if len(self._images) > self.memory_tiles:
+            self._images.popitem(last=False)
+        return image
+
+
+class TileDirectory(TileSource):
+    # tiles stored as files in a local directory, e.g. {directory}/{z}/{x}/{y}.png as written by most tile
+    # downloaders and by CachedTiles
+    def __init__(self, directory: str, pattern: str = "{z}/{x}/{y}.png", max_zoom: int = 19, **kwargs):
+        super().__init__(**kwargs)
+        if not isinstance(directory, (str, os.PathLike)):
+            raise TypeError("Parameter 'directory' must be a path!")
+        self.directory = os.fspath(directory)
+        self.pattern = pattern
+        self.max_zoom = max_zoom
+
+    def path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.directory, self.pattern.format(z=z, x=x, y=y))
+
+    def tile(self, z: int, x: int, y: int) -> Union[bytes, None]:
+        try:
+            with open(self.path(z, x, y), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class MBTiles(TileSource):
+    # tiles of an MBTiles file (an SQLite database; its rows are numbered from the south as in TMS)
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"MBTiles file '{path}' not found!")
+        self.path = os.fspath(path)
+        self._connection = None
+        zooms = self.connection.execute("SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles").fetchone()
+        if zooms[0] is not None:
+            self.min_zoom, self.max_zoom = zooms
+        metadata = dict(self.connection.execute("SELECT name, value FROM metadata").fetchall())
+        self.attribution = metadata.get("attribution")
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # opened read-only and on first use, so that the source can be pickled to worker processes
+        if self._connection is None:
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._connection
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    def tile(self, z: int, x: int, y: int) -> Union[bytes, None]:
+        row = self.connection.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, 2 ** z - 1 - y)).fetchone()
+        return None if row is None else bytes(row[0])
+
+
+class CachedTiles(TileDirectory):
+    # tiles of an XYZ web service (url with {z}, {x} and {y}) saved to a local directory the first time they are
+    # fetched; with offline=True only the saved tiles are used, so that the directory can be filled on a connected
+    # machine and copied to machines without network access
+    def __init__(self, url: str, directory: str, offline: bool = False, max_zoom: int = 19, timeout: float = 10,
+                 headers: dict = None, attribution: str = None, **kwargs):
+        extension = os.path.splitext(url.split("?")[0])[1] or ".png"
+        super().__init__(directory, pattern="{z}/{x}/{y}" + extension, max_zoom=max_zoom, **kwargs)
+        self.url = url
+        self.offline = offline
+        self.timeout = timeout
+        self.headers = {"User-Agent": "ortega"} if headers is None else headers
+        self.attribution = attribution
+
+    def tile(self, z: int, x: int, y: int) -> Union[bytes, None]:
+        data = super().tile(z, x, y)
+        if data is not None or self.offline:
+            return data
+        url = self.url.format(z=z, x=x, y=y, s="a", r="")
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=self.headers),
+                                        timeout=self.timeout) as response:
+                data = response.read()
+        except urllib.error.HTTPError as error:
+            if error.code == 404:
+                return None
+            raise
+        except urllib.error.URLError as error:
+            raise ConnectionError(f"Tile '{url}' cannot be fetched ({error.reason})! Use offline=True to plot only "
+                                  f"the tiles saved in '{self.directory}'.") from error
+        path = self.path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # atomic, so that a concurrent reader never sees a partial tile
+        return data
+
+
+def tile_source(source: Any, cache_dir: str = None, offline: bool = False) -> TileSource:
+    """
+    Create the tile source of a basemap
+    :param source: a TileSource; a path to an .mbtiles file or to a tile directory; an XYZ url or an xyzservices
+        TileProvider (e.g. contextily.providers.OpenStreetMap.Mapnik), fetched through a CachedTiles
+    :param cache_dir: directory of the tiles fetched from an url or a provider
+    :param offline: if True, never fetch tiles from an url or a provider
+    """
+    if isinstance(source, TileSource):
+        return source
+    attribution, max_zoom = None, 19
+    if hasattr(source, "build_url"):  # xyzservices TileProvider
+        attribution = source.get("attribution")
+        max_zoom = source.get("max_zoom", 19)
+        source = source.build_url()
+    if not isinstance(source, (str, os.PathLike)):
+        raise TypeError("Parameter 'basemap' must be None, a TileSource, a path, an url or a tile provider!")
+    source = os.fspath(source)
+    if "{z}" in source and "://" in source:
+        if cache_dir is None:
+            raise ValueError("Parameter 'cache_dir' must be given to use tiles from an url!")
+        return CachedTiles(source, cache_dir, offline=offline, max_zoom=max_zoom, attribution=attribution)
+    if source.endswith(".mbtiles"):
+        return MBTiles(source)
+    if os.path.isdir(source):
+        return TileDirectory(source)
+    raise FileNotFoundError(f"Basemap source '{source}' not found!")
+
+
+def tile_mosaic(source: TileSource, bounds: Tuple[float, float, float, float], z: int):
+    """
+    Assemble the tiles covering Web Mercator bounds into one image
+    :return: RGBA image (missing tiles are transparent) and its extent (xmin, xmax, ymin, ymax) in meter
+    """
+    x0, y0, x1, y1 = tile_range(bounds, z)
+    image = np.zeros(((y1 - y0 + 1) * TILE_SIZE, (x1 - x0 + 1) * TILE_SIZE, 4), dtype=np.uint8)
+    for y in range(y0, y1 + 1):
+        for x in range(x0, x1 + 1):
+            tile = source.image(z, x, y)
+            if tile is not None:
+                image[(y - y0) * TILE_SIZE:(y - y0 + 1) * TILE_SIZE,
+                      (x - x0) * TILE_SIZE:(x - x0 + 1) * TILE_SIZE] = tile
+    xmin, _, _, ymax = mercator_tile_bounds(z, x0, y0)
+    _, ymin, xmax, _ = mercator_tile_bounds(z, x1, y1)
+    return image, (xmin, xmax, ymin, ymax)
+
+
+def warp_image(image: np.ndarray, extent: Tuple[float, float, float, float], crs: CRS):
+    """
+    Reproject a Web Mercator image to another crs by sampling the nearest pixel of each target pixel
+    :param image: RGBA image
+    :param extent: xmin, xmax, ymin, ymax of the image in meter
+    :param crs: target crs
+    :return: RGBA image (transparent outside of the source image) and its extent in the target crs
+    """
+    height, width = image.shape[:2]
+    xmin, xmax, ymin, ymax = extent
+    txmin, tymin, txmax, tymax = Transformer.from_crs(CRS.from_epsg(3857), crs, always_xy=True).transform_bounds(
+        xmin, ymin, xmax, ymax)
+    tx = txmin + (np.arange(width) + 0.5) * (txmax - txmin) / width
+    ty = tymax - (np.arange(height) + 0.5) * (tymax - tymin) / height
+    gx, gy = np.meshgrid(tx, ty)
+    mx, my = Transformer.from_crs(crs, CRS.from_epsg(3857), always_xy=True).transform(gx, gy)
+    col = np.floor((mx - xmin) / (xmax - xmin) * width)
+    row = np.floor((ymax - my) / (ymax - ymin) * height)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    warped = np.zeros_like(image)
+    warped[inside] = image[row[inside].astype(int), col[inside].astype(int)]
+    return warped, (txmin, txmax, tymin, tymax)
+
+
+def add_basemap(ax, crs: Any = None, source: Any = None, zoom: Union[int, str] = "auto", cache_dir: str = None,
+                offline: bool = False):
+    """
+    Add a basemap to the axes from a local or cached tile source, without contextily's network requests
+    :param ax: matplotlib axes, whose limits are the extent of the basemap
+    :param crs: crs of the axes coordinates; None for Web Mercator (EPSG:3857)
+    :param source: see tile_source
+    :param zoom: zoom level of the tiles, or "auto" to match the resolution of the axes
+    :param cache_dir: see tile_source
+    :param offline: see tile_source
+    """
+    source = tile_source(source, cache_dir, offline)
+    xmin, xmax, ymin, ymax = ax.axis()
+    crs = CRS.from_user_input(3857 if crs is None else crs)
+    mercator = CRS.from_epsg(3857)
+    if crs != mercator:
+        bounds = Transformer.from_crs(crs, mercator, always_xy=True).transform_bounds(xmin, ymin, xmax, ymax)
+    else:
+        bounds = (xmin, ymin, xmax, ymax)
+    if zoom == "auto":
+        zoom = auto_zoom(bounds, ax.get_window_extent().width, source.min_zoom, source.max_zoom)
+    image, extent = tile_mosaic(source, bounds, zoom)
+    if crs != mercator:
+        image, extent = warp_image(image, extent, crs)
+    ax.imshow(image, extent=extent, interpolation="bilinear", zorder=0)
+    ax.axis((xmin, xmax, ymin, ymax))
+    if source.attribution:
+        ax.annotate(source.attribution, xy=(0.005, 0.005), xycoords="axes fraction", fontsize=6, alpha=0.7)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# bump when the PPA parameters computed for the same input change, so that old cache entries are not used
+CACHE_VERSION = 1
+# arrays of the PPA parameters (from ppa_parameters) stored in a cache entry
+CACHE_FIELDS = ["index", "major", "minor", "angle", "speed", "speed_memory"]
+
+
+class PPACache:
+    # on-disk cache of the PPA parameters of tracks, one .npz file of arrays per track and set of PPA parameters, so
+    # that running ORTEGA again on the same tracks (e.g. with other delays) skips computing the PPAs; the PPAs
+    # generated as an EllipseStore are also kept as a .npy file of records, which a hit memory-maps instead of
+    # creating the PPAs again; the least recently used entries are removed when the cache grows larger than max_bytes
+    def __init__(self, directory: str, max_bytes: int = 2 ** 30):
+        if not isinstance(directory, (str, os.PathLike)):
+            raise TypeError("Parameter 'directory' must be a path!")
+        if not isinstance(max_bytes, int) or max_bytes <= 0:
+            raise ValueError("Parameter 'max_bytes' must be a positive integer!")
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, x: List[float], y: List[float], t: List[int], pid: List[Any], speed_memory: List[float],
+            max_el_time_min: float, multi_el: float, speed_average: bool, kernel: np.ndarray) -> str:
+        """
+        Hash the input of ppa_parameters: the points of the track (including the point carried over from a previous
+        call) and the parameters of the PPAs
+        :return: hexadecimal key of the cache entry
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION}|{max_el_time_min!r}|{multi_el!r}|{bool(speed_average)}|".encode())
+        for values in [np.asarray(kernel, dtype=np.float64), np.asarray(speed_memory, dtype=np.float64),
+                       np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64),
+                       np.asarray(t, dtype=np.int64)]:
+            digest.update(np.ascontiguousarray(values).tobytes())
+            digest.update(b"|")
+        digest.update(pd.util.hash_pandas_object(pd.Series(pid, dtype=object), index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def records_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.records.npy")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def load(self, key: str) -> Union[Dict[str, np.ndarray], None]:
+        """
+        Read the PPA parameters of a cache entry
+        :param key: key from PPACache.key
+        :return: dict of arrays as returned by ppa_parameters, or None if there is no (valid) entry
+        """
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                params = {name: entry[name] for name in CACHE_FIELDS}
+        except (OSError, KeyError, ValueError):
+            # missing, being replaced or unreadable: compute the PPAs again
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used for the eviction
+        self.hits += 1
+        params["speed_memory"] = params["speed_memory"].tolist()
+        return params
+
+    def load_records(self, key: str) -> Union[Tuple[np.ndarray, List[float]], None]:
+        """
+        Memory-map the PPA records of a cache entry (see EllipseList.generate_store)
+        :param key: key from PPACache.key
+        :return: read-only memory-mapped records and the speed memory after the last PPA, or None if there are no
+            (valid) records or parameters for the key
+        """
+        path, records_path = self.path(key), self.records_path(key)
+        try:
+            records = np.load(records_path, mmap_mode="r", allow_pickle=False)
+            with np.load(path, allow_pickle=False) as entry:
+                speed_memory = entry["speed_memory"].tolist()
+        except (OSError, KeyError, ValueError):
+            # the caller falls back to load, which counts the hit or miss of the parameters
+            return None
+        os.utime(path)
+        os.utime(records_path)
+        self.hits += 1
+        return records, speed_memory
+
+    def save_records(self, key: str, records: np.ndarray):
+        """
+        Write the PPA records of a track to the cache (its parameters are written by save), then evict the least
+        recently used entries if needed
+        :param key: key from PPACache.key
+        :param records: structured array of the PPA records
+        """
+        tmp_path = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, records)
+        os.replace(tmp_path, self.records_path(key))
+        self.evict()
+
+    def save(self, key: str, params: Dict[str, Any]):
+        """
+        Write the PPA parameters of a track to the cache, then evict the least recently used entries if needed
+        :param key: key from PPACache.key
+        :param params: dict returned by ppa_parameters
+        """
+        tmp_path = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_path, **{name: np.asarray(params[name]) for name in CACHE_FIELDS})
+        os.replace(tmp_path, self.path(key))  # atomic, so that a concurrent reader never sees a partial file
+        self.evict()
+
+    def entries(self) -> List[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith((".npz", ".npy")) and ".tmp." not in entry.name]
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self.entries())
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is not larger than max_bytes
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, key: str = None):
+        """
+        Remove one entry, or all entries of the cache
+        :param key: key of the entry to remove; if None, the whole cache is cleared
+        """
+        entries = self.entries() if key is None else [entry for entry in self.entries()
+                                                      if entry.name in (f"{key}.npz", f"{key}.records.npy")]
+        for entry in entries:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -2,25 +2,17 @@ import pandas as pd
 import numpy as np
 import math
 from datetime import datetime as datetime
-from math import radians, cos, sin, asin, sqrt
 from statistics import mean
+from typing import Any
+from .geodesic import haversine_distance
 
 
-def haversine(lat1: float, lon1: float, lat2: float, lon2: float):
+def haversine(lat1: Any, lon1: Any, lat2: Any, lon2: Any):
     """
-    Calculate the great circle distance in kilometers between two points
+    Calculate the great circle distance in meters between two points (or two arrays of points)
     on the earth (specified in decimal degrees)
     """
-    # convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-
-    # haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radius of earth in kilometers. Use 3956 for miles. Determines return value units.
-    return c * r * 1000  # in meters
+    return haversine_distance(lat1, lon1, lat2, lon2)
 
 
 def __check_dist(lat1: float, lon1: float, lat2: float, lon2: float):
@@ -38,12 +30,28 @@ def __check_dist(lat1: float, lon1: float, lat2: float, lon2: float):
     return dist
 
 
-def __timedifcheck(t1: pd.Timestamp, t2: pd.Timestamp):
+def to_epoch_ns(times: Any) -> np.ndarray:
     """
-
-    :param t1:
-    :param t2:
-    :return:
+    Convert datetime-like values to int64 nanoseconds since epoch (timezone-aware values are converted to UTC)
+    :param times: pd.Series, pd.DatetimeIndex, np.ndarray or list of timestamps
+    :return: np.ndarray of int64
     """
-    return abs(pd.Timedelta(t2 - t1).total_seconds())
+    if not pd.api.types.is_datetime64_any_dtype(getattr(times, "dtype", None)):
+        times = pd.to_datetime(times)
+    times = pd.DatetimeIndex(times)
+    if times.tz is not None:
+        times = times.tz_convert(None)
+    return times.to_numpy(dtype='datetime64[ns]').view(np.int64)
 
+
+def timedelay_mask(t1: np.ndarray, t2: np.ndarray, minute_min_delay: float, minute_max_delay: float) -> np.ndarray:
+    """
+    Check which pairs of int64 nanosecond times are within the allowable delay
+    :param t1: times of the first individual
+    :param t2: times of the second individual
+    :param minute_min_delay: allowable minimum delay, in minute
+    :param minute_max_delay: allowable maximum delay, in minute
+    :return: np.ndarray of bool
+    """
+    delay = np.abs(np.asarray(t2, dtype=np.int64) - np.asarray(t1, dtype=np.int64)) / 1e9  # in seconds
+    return (delay >= minute_min_delay * 60) & (delay <= minute_max_delay * 60)
@@ -1,20 +1,67 @@
 from datetime import datetime
+import functools
+import os
 import sys
 
 if sys.version_info >= (3, 8):
     from typing import TypedDict
 else:
     from typing_extensions import TypedDict
-from typing import Any, List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Tuple, Union
 import numpy as np
 import pandas as pd
+import shapely
 from shapely.geometry.polygon import LinearRing
 from shapely.geometry import Point, Polygon
 from attrs import define, field
 from .STPoint import STPoint
+from .cache import PPACache
+from .common import to_epoch_ns
+from .geodesic import euclidean_distance, step_speeds
 
 
-def ellipse_polyline(ptc: Point, major: float, minor: float, angle: float, n: int = 100):
+# number of vertices of the PPA polygons, and the range of vertex_count when it adapts to a tolerance
+DEFAULT_VERTICES = 100
+MIN_VERTICES = 8
+MAX_VERTICES = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def unit_circle(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine and sine of n evenly spaced angles in [0, 2 pi), computed once per n and shared (read-only) by all
+    polylines with n vertices
+    :param n: number of vertices
+    :return: cos and sin arrays
+    """
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)  # Return evenly spaced numbers over a specified interval
+    ct = np.cos(t)
+    st = np.sin(t)
+    ct.flags.writeable = False
+    st.flags.writeable = False
+    return ct, st
+
+
+def vertex_count(major: np.ndarray, tolerance: float = None) -> np.ndarray:
+    """
+    Number of vertices of the polygon of each PPA ellipse so that the polygon is within tolerance of the ellipse
+    :param major: major axis (full length)
+    :param tolerance: largest distance between an ellipse and its polygon, in the unit of the coordinates; if None,
+        DEFAULT_VERTICES for every ellipse as in ellipse_polyline
+    :return: np.ndarray of int, multiples of 8 between MIN_VERTICES and MAX_VERTICES
+    """
+    major = np.asarray(major, dtype=float)
+    if tolerance is None:
+        return np.full(major.shape, DEFAULT_VERTICES, dtype=int)
+    # with vertices at evenly spaced parametric angles, the largest distance between the ellipse and the chords is
+    # a * (1 - cos(pi / n)) for the semi-major axis a
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.pi / np.arccos(np.clip(1 - tolerance / (major / 2.0), -1, 1))
+    n = np.ceil(np.nan_to_num(n, nan=MIN_VERTICES, posinf=MAX_VERTICES) / 8) * 8
+    return np.clip(n, MIN_VERTICES, MAX_VERTICES).astype(int)
+
+
+def ellipse_polyline(ptc: Point, major: float, minor: float, angle: float, n: int = DEFAULT_VERTICES):
     """
     create polyline (a set of sequential points) for ellipse
     :param ptc:
@@ -25,10 +72,7 @@ def ellipse_polyline(ptc: Point, major: float, minor: float, angle: float, n: in
     :return:
     """
 
-    t = np.linspace(0, 2 * np.pi, n, endpoint=False)  # Return evenly spaced numbers over a specified interval
-
-    st = np.sin(t)
-    ct = np.cos(t)
+    ct, st = unit_circle(n)
 
     angle = np.deg2rad(angle)  # rotation angle of ellipse in radius unit
     sa = np.sin(angle)
@@ -60,6 +104,236 @@ def ppa_ellipse(stp1: STPoint, stp2: STPoint, est_speed: float, avg_speed: float
     return ell, angle  # returns a shapely LinearRing and angle of the object
 
 
+def ppa_parameters(
+        x: np.ndarray,
+        y: np.ndarray,
+        t: np.ndarray,
+        pid: np.ndarray,
+        max_el_time_min: float = 100000,
+        multi_el: float = 1.25,
+        speed_average: bool = False,
+        kernel: List[int] = [1, 1, 2, 5, 10],
+        div_constant: float = 0.000000000000000000000000000000001,
+        speed_memory: List[float] = None,
+):
+    """
+    Vectorized counterpart of the PPA loop in EllipseList.generate: compute the parameters of the PPA between every
+    pair of consecutive points of time-sorted tracking data in one pass over NumPy arrays
+    :param x: latitude (or projected y) of each point
+    :param y: longitude (or projected x) of each point
+    :param t: int64 nanosecond timestamps of each point, sorted in ascending order
+    :param pid: id of each point; no PPA is created between two consecutive points of different ids
+    :param max_el_time_min: remove large PPA if time interval greater than this value
+    :param multi_el: default value is 1.25 to avoid the resulted PPA being a beeline between two points
+    :param speed_average: if True, apply speed average over the kernel to compute max speed for PPA
+    :param kernel: weights of the speed average, the last weight is applied to the most recent speed
+    :param div_constant: small constant preventing a division by zero for simultaneous points
+    :param speed_memory: speeds of the PPAs created before the first point since the speed memory was last cleared,
+        so that the speed average continues from a previous call
+    :return: a dict of arrays, one entry per created PPA; 'index' is the position of the PPA's end point in the input
+        arrays (the start point is always at 'index' - 1); 'speed_memory' is the list of the latest speeds to pass to
+        the next call
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    t = np.asarray(t, dtype=np.int64)
+    pid = np.asarray(pid)
+    kernel = np.asarray(kernel)
+
+    dx = x[:-1] - x[1:]  # from the current point to the last point, as in STPoint.dx_dy_euclidean
+    dy = y[:-1] - y[1:]
+    dt = np.abs(t[1:] - t[:-1]) / 1e9  # in seconds
+    inst_speed = step_speeds(x, y, t, div_constant=div_constant)  # supposed to be in m/s
+    est_speed = inst_speed * multi_el
+
+    same_pid = pid[1:] == pid[:-1]
+    # a gap or a stationary step skips the PPA and clears the speed memory
+    reset = same_pid & ((dt > max_el_time_min * 60) | (est_speed <= 0))
+    keep = same_pid & ~reset
+    index = np.flatnonzero(keep) + 1
+
+    speed = est_speed[keep]
+    memory = np.asarray(speed_memory if speed_memory is not None else [], dtype=float)
+    memory_length = len(kernel)
+    run = np.cumsum(reset)[keep]
+    if speed_average:
+        # position of each kept step within its run of steps since the last reset of the speed memory; the first run
+        # continues the given speed memory
+        position = np.arange(speed.size)
+        run_start = np.flatnonzero(np.r_[True, run[1:] != run[:-1]])
+        position -= np.repeat(run_start, np.diff(np.r_[run_start, speed.size]))
+        position[run == 0] += memory.size
+        extended = np.concatenate([memory, speed])
+
+        full = np.flatnonzero(position >= memory_length - 1)
+        avg_speed_kern = speed.copy()  # fewer speeds than the kernel: use the latest speed
+        if full.size:
+            weighted = 0
+            for k, weight in enumerate(kernel):
+                weighted = weighted + weight * extended[memory.size + full - memory_length + 1 + k]
+            avg_speed_kern[full] = weighted / kernel.sum()
+        # avg_speed_kern can be negative value so this step can prevent a negative speed
+        speed = np.where(avg_speed_kern > 0, np.maximum(speed, avg_speed_kern), speed)
+
+    # speeds since the last reset of the speed memory, for the next call
+    n_reset = int(reset.sum())
+    if speed_average:
+        current = est_speed[keep][run == n_reset]
+        memory = np.concatenate([memory, current]) if n_reset == 0 else current
+    elif n_reset:
+        memory = np.empty(0)
+
+    dx, dy, dt = dx[keep], dy[keep], dt[keep]
+    dist = euclidean_distance(x[index - 1], y[index - 1], x[index], y[index])  # of the kept steps only
+    # the major axis of the PPA ellipse based on input speed (in time geography this speed is max speed)
+    major = dt * speed
+    minor = np.sqrt(major ** 2 - dist ** 2)  # calculate minor axis for the ellipse
+    dx = np.where(dx == 0, 0.1, dx)
+    dy = np.where(dy == 0, 0.1, dy)
+    angle = np.rad2deg(np.arctan(np.abs(dy / dx)))  # angle of the ellipse
+    # the rotation angle of the PPA ellipse in 2nd and 4th quadrants
+    angle = np.where(dx * dy < 0, 180 - angle, angle)
+
+    return {
+        "index": index,
+        "center_x": (x[index] + x[index - 1]) / 2,
+        "center_y": (y[index] + y[index - 1]) / 2,
+        "major": major,
+        "minor": minor,
+        "angle": angle,
+        "speed": inst_speed[keep],
+        "speed_memory": memory[-memory_length:].tolist(),
+    }
+
+
+def ellipse_bounds(cx: np.ndarray, cy: np.ndarray, major: np.ndarray, minor: np.ndarray, angle: np.ndarray):
+    """
+    Exact bounding boxes of PPA ellipses given their parameters
+    :param cx: x coordinate of the center
+    :param cy: y coordinate of the center
+    :param major: major axis (full length, as in ellipse_polyline)
+    :param minor: minor axis (full length, as in ellipse_polyline)
+    :param angle: rotation angle of the major axis, in degree
+    :return: np.ndarray of shape (n, 4) with columns xmin, ymin, xmax, ymax
+    """
+    angle = np.deg2rad(angle)
+    sa = np.sin(angle)
+    ca = np.cos(angle)
+    hx = np.sqrt((major / 2.0 * ca) ** 2 + (minor / 2.0 * sa) ** 2)
+    hy = np.sqrt((major / 2.0 * sa) ** 2 + (minor / 2.0 * ca) ** 2)
+    return np.column_stack([cx - hx, cy - hy, cx + hx, cy + hy])
+
+
+def ellipse_polylines(cx: np.ndarray, cy: np.ndarray, major: np.ndarray, minor: np.ndarray, angle: np.ndarray,
+                      n: int = DEFAULT_VERTICES) -> np.ndarray:
+    """
+    Closed polylines of many PPA ellipses at once, with the same vertices as ellipse_polyline
+    :param cx: x coordinate of the center
+    :param cy: y coordinate of the center
+    :param major: major axis (full length)
+    :param minor: minor axis (full length)
+    :param angle: rotation angle of the major axis, in degree
+    :param n: number of vertices of each ellipse
+    :return: np.ndarray of shape (number of ellipses, n + 1, 2); the first vertex is repeated at the end
+    """
+    ct, st = unit_circle(n)
+    ct = np.append(ct, ct[0])
+    st = np.append(st, st[0])
+    angle = np.deg2rad(np.asarray(angle, dtype=float))[:, None]
+    sa = np.sin(angle)
+    ca = np.cos(angle)
+    a = np.asarray(major, dtype=float)[:, None] / 2.0
+    b = np.asarray(minor, dtype=float)[:, None] / 2.0
+    p = np.empty((len(angle), n + 1, 2))
+    p[:, :, 0] = np.asarray(cx, dtype=float)[:, None] + a * ca * ct - b * sa * st
+    p[:, :, 1] = np.asarray(cy, dtype=float)[:, None] + a * sa * ct + b * ca * st
+    return p
+
+
+def ellipse_polygons(cx: np.ndarray, cy: np.ndarray, major: np.ndarray, minor: np.ndarray, angle: np.ndarray,
+                     tolerance: float = None) -> np.ndarray:
+    """
+    Shapely polygons of many PPA ellipses, built with one ellipse_polylines per vertex count
+    :param cx: x coordinate of the center
+    :param cy: y coordinate of the center
+    :param major: major axis (full length)
+    :param minor: minor axis (full length)
+    :param angle: rotation angle of the major axis, in degree
+    :param tolerance: see vertex_count; if None, the polygons are the ones of Ellipse.geom
+    :return: np.ndarray of Polygon
+    """
+    counts = vertex_count(major, tolerance)
+    polygons = np.empty(len(counts), dtype=object)
+    for n in np.unique(counts):
+        k = np.flatnonzero(counts == n)
+        polygons[k] = shapely.polygons(ellipse_polylines(cx[k], cy[k], major[k], minor[k], angle[k], int(n)))
+    return polygons
+
+
+def ellipses_intersect(
+        cx1: np.ndarray, cy1: np.ndarray, major1: np.ndarray, minor1: np.ndarray, angle1: np.ndarray,
+        cx2: np.ndarray, cy2: np.ndarray, major2: np.ndarray, minor2: np.ndarray, angle2: np.ndarray,
+        n_iter: int = 64,
+) -> np.ndarray:
+    """
+    Analytic test of whether pairs of ellipses overlap (boundaries crossing or touching, or one containing the other),
+    computed on the ellipse parameters rather than on polygon approximations; all arguments are broadcast together so
+    that arrays of candidate pairs are tested in one call.
+    Ellipse 1 is mapped to the unit circle; ellipse 2 then becomes another ellipse and the two overlap if and only if
+    the distance from the origin to it is at most one. The distance from a point to an ellipse is found by bisection
+    on the Lagrange multiplier of the closest point (Eberly, "Distance from a Point to an Ellipse").
+    :param cx1: x coordinate of the center of ellipse 1
+    :param cy1: y coordinate of the center of ellipse 1
+    :param major1: major axis of ellipse 1 (full length, as in ellipse_polyline)
+    :param minor1: minor axis of ellipse 1 (full length, as in ellipse_polyline)
+    :param angle1: rotation angle of ellipse 1, in degree
+    :param cx2: x coordinate of the center of ellipse 2
+    :param cy2: y coordinate of the center of ellipse 2
+    :param major2: major axis of ellipse 2
+    :param minor2: minor axis of ellipse 2
+    :param angle2: rotation angle of ellipse 2, in degree
+    :param n_iter: number of bisection steps
+    :return: np.ndarray of bool
+    """
+    cx1, cy1, a1, b1, angle1, cx2, cy2, a2, b2, angle2 = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in [cx1, cy1, major1, minor1, angle1, cx2, cy2, major2, minor2, angle2]]
+    )
+    a1, b1, a2, b2 = a1 / 2.0, b1 / 2.0, a2 / 2.0, b2 / 2.0  # semi-axes
+    theta1 = np.deg2rad(angle1)
+    s1, c1 = np.sin(theta1), np.cos(theta1)
+    phi = np.deg2rad(angle2) - theta1
+    sphi, cphi = np.sin(phi), np.cos(phi)
+
+    # center of ellipse 2 and the linear map of the unit disk onto ellipse 2, in the frame where ellipse 1 is the
+    # unit circle
+    dx, dy = cx2 - cx1, cy2 - cy1
+    center = np.stack([(c1 * dx + s1 * dy) / a1, (-s1 * dx + c1 * dy) / b1], axis=-1)
+    m = np.empty(a1.shape + (2, 2))
+    m[..., 0, 0] = cphi * a2 / a1
+    m[..., 0, 1] = -sphi * b2 / a1
+    m[..., 1, 0] = sphi * a2 / b1
+    m[..., 1, 1] = cphi * b2 / b1
+    # rotate so that ellipse 2 is axis aligned with semi-axes e; z is the origin relative to its center
+    u, e, _ = np.linalg.svd(m)
+    z = np.abs(np.einsum("...ji,...j->...i", u, -center))
+    e = np.maximum(e, np.finfo(float).tiny)
+
+    inside = (z[..., 0] / e[..., 0]) ** 2 + (z[..., 1] / e[..., 1]) ** 2 <= 1
+    # closest point on the boundary: x_i = e_i^2 z_i / (t + e_i^2) where t > 0 is the root of
+    # sum((e_i z_i / (t + e_i^2))^2) = 1, which lies in (0, |e * z|]
+    e2 = e ** 2
+    lo = np.zeros(a1.shape)
+    hi = np.sqrt(np.sum((e * z) ** 2, axis=-1))
+    for _ in range(n_iter):
+        t = (lo + hi) / 2
+        outside = np.sum((e * z / (t[..., None] + e2)) ** 2, axis=-1) > 1
+        lo = np.where(outside, t, lo)
+        hi = np.where(outside, hi, t)
+    t = hi[..., None]
+    distance = np.sqrt(np.sum((z * t / (t + e2)) ** 2, axis=-1))
+    return inside | (distance <= 1)
+
+
 class SpeedMemory:
     # this class is for averaging speeds of several consecutive PPAs in order to mitigate GPS drift effects and
     # prevent PPA being a beeline between two points
@@ -92,30 +366,67 @@ class EllipseDictionary(TypedDict):
     last_lat: Union[float, None]
     speed: float
     direction: float
-    attrs: Union[Any, None]
-    last_attrs: Union[Any, None]
+    row: Union[int, None]
+    last_row: Union[int, None]
+    attrs: Union[Dict[str, Any], None]
+    last_attrs: Union[Dict[str, Any], None]
 
 
 @define(frozen=True)
 class Ellipse:
-    #  this is an Ellipse class for PPAs
-    el: LinearRing  # a shapeley LinearRing object to delimit the PPA boundary
+    #  this is an Ellipse class for PPAs; only the numeric parameters are stored, the shapely objects are created
+    #  the first time they are accessed and then cached
     lat: float
     lon: float
     last_lat: Union[float, None]
     last_lon: Union[float, None]
     pid: int  # current point person id
     last_pid: Union[int, None]  # last point's person id
-    t1: pd.Timestamp  # current timestamp
-    t0: Union[pd.Timestamp, None] = field()  # last point's timestamp
+    t1_ns: int  # current timestamp, in nanoseconds since epoch
+    t0_ns: Union[int, None]  # last point's timestamp, in nanoseconds since epoch
     speed: float  # PPA speed between two consecutive points not the average speed over a few points
-    direction: float  # PPA direction
-    geom: Polygon  # a shapeley Polygon object for PPA (so that we can use geom.within to determine if two PPAs overlap)
-    attrs: Union[Any, None] = None
-    last_attrs: Union[Any, None] = None
+    direction: float  # PPA direction, also the rotation angle of the PPA ellipse
+    major: float  # major axis of the PPA ellipse
+    minor: float  # minor axis of the PPA ellipse
+    row: Union[int, None] = None  # position of the current point in the attribute table of its EllipseList
+    last_row: Union[int, None] = None  # position of the last point in the attribute table of its EllipseList
+    _el: Union[LinearRing, None] = field(default=None, init=False, eq=False, repr=False)
+    _geom: Union[Polygon, None] = field(default=None, init=False, eq=False, repr=False)
+
+    @property
+    def t1(self) -> pd.Timestamp:
+        return pd.Timestamp(self.t1_ns)
+
+    @property
+    def t0(self) -> Union[pd.Timestamp, None]:
+        return pd.Timestamp(self.t0_ns) if self.t0_ns is not None else None
+
+    @property
+    def center(self) -> Point:
+        # the midpoint of the two points as in STPoint.mid_point
+        return Point((self.lat + self.last_lat) / 2, (self.lon + self.last_lon) / 2)
 
-    def to_dict(self) -> EllipseDictionary:
-        #  return a dict for creating dataframe of intersecting PPA later
+    @property
+    def el(self) -> LinearRing:
+        # a shapeley LinearRing object to delimit the PPA boundary
+        if self._el is None:
+            object.__setattr__(self, "_el",
+                               LinearRing(ellipse_polyline(self.center, self.major, self.minor, self.direction)))
+        return self._el
+
+    @property
+    def geom(self) -> Polygon:
+        # a shapeley Polygon object for PPA (so that we can use geom.within to determine if two PPAs overlap)
+        if self._geom is None:
+            object.__setattr__(self, "_geom", Polygon(self.el))
+        return self._geom
+
+    def to_dict(self, attributes: pd.DataFrame = None) -> EllipseDictionary:
+        """
+        Return a dict for creating dataframe of intersecting PPA later
+        :param attributes: the attribute table of the EllipseList of the PPA (EllipseList.attrs), to resolve the
+            attr_fields of its two points as 'attrs' and 'last_attrs'; these are None if it is not given
+        """
         return {
             "t1": self.t1,
             "t0": self.t0,
@@ -126,11 +437,383 @@ class Ellipse:
             "last_lat": self.last_lat,
             "speed": self.speed,
             "direction": self.direction,
-            "attrs": self.attrs,
-            "last_attrs": self.last_attrs
+            "row": self.row,
+            "last_row": self.last_row,
+            "attrs": point_attributes(attributes, self.row),
+            "last_attrs": point_attributes(attributes, self.last_row)
         }
 
 
+def point_attributes(attributes: Union[pd.DataFrame, None], row: Union[int, None]) -> Union[Dict[str, Any], None]:
+    """
+    The attr_fields of one GPS point
+    :param attributes: attribute table of an EllipseList, or None
+    :param row: position of the point in the table (Ellipse.row or Ellipse.last_row)
+    :return: dict of the attribute values of the point, or None
+    """
+    if attributes is None or row is None:
+        return None
+    return attributes.loc[row].to_dict()
+
+
+def ellipse_parameters(ellipses: List[Ellipse]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collect the parameters of a list of PPAs as arrays, e.g. for ellipse_bounds and ellipses_intersect
+    :param ellipses: list of Ellipse, or an EllipseStore (the arrays are then views of the store)
+    :return: center x, center y, major, minor and angle arrays
+    """
+    if isinstance(ellipses, EllipseStore):
+        return ellipses.parameters()
+    lat, lon, last_lat, last_lon, major, minor, angle = np.array(
+        [[e.lat, e.lon, e.last_lat, e.last_lon, e.major, e.minor, e.direction] for e in ellipses], dtype=float
+    ).reshape(-1, 7).T
+    # the center is the midpoint of the two points as in STPoint.mid_point
+    return (lat + last_lat) / 2, (lon + last_lon) / 2, major, minor, angle
+
+
+def ellipse_times(ellipses: List[Ellipse]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect the start and end times of a list of PPAs as arrays
+    :param ellipses: list of Ellipse, or an EllipseStore (the arrays are then views of the store)
+    :return: t0 and t1 arrays of int64 nanoseconds since epoch
+    """
+    if isinstance(ellipses, EllipseStore):
+        return ellipses.times()
+    t0 = np.array([e.t0_ns for e in ellipses], dtype=np.int64)
+    t1 = np.array([e.t1_ns for e in ellipses], dtype=np.int64)
+    return t0, t1
+
+
+def ellipse_table(ellipses: List[Ellipse]) -> Dict[str, np.ndarray]:
+    """
+    Collect the fields of a list of PPAs (the ones of Ellipse.to_dict but the attributes) as a table of arrays, so that the rows of many
+    PPAs can be gathered at once by index
+    :param ellipses: list of Ellipse, or an EllipseStore
+    :return: dict of arrays; t0 and t1 are int64 nanoseconds since epoch
+    """
+    if isinstance(ellipses, EllipseStore):
+        return ellipses.table()
+    t0, t1 = ellipse_times(ellipses)
+    table = {"t1": t1, "t0": t0}
+    for key in ["pid", "lon", "lat", "last_lon", "last_lat", "speed", "direction", "row", "last_row"]:
+        table[key] = np.array([getattr(e, key) for e in ellipses])
+    return table
+
+
+def ellipse_perimeter(major: np.ndarray, minor: np.ndarray) -> np.ndarray:
+    """
+    Perimeter of ellipses by Ramanujan's second approximation
+    :param major: major axis (full length)
+    :param minor: minor axis (full length)
+    :return: np.ndarray of perimeters
+    """
+    a = np.asarray(major, dtype=float) / 2.0
+    b = np.asarray(minor, dtype=float) / 2.0
+    s = a + b
+    h = np.divide((a - b) ** 2, s ** 2, out=np.zeros_like(s), where=s > 0)
+    return np.pi * s * (1 + 3 * h / (10 + np.sqrt(4 - 3 * h)))
+
+
+def ellipse_metrics(ellipses: List[Ellipse]) -> pd.DataFrame:
+    """
+    Metrics of each PPA computed from its axes in one vectorized pass, without creating any shapely object
+    :param ellipses: list of Ellipse, or an EllipseStore
+    :return: dataframe with one row per PPA and the columns 'pid', 't0', 't1', 'interval' (t1 - t0, in minute),
+        'speed', 'major', 'minor', 'area' (of the ellipse, pi * major * minor / 4) and 'perimeter' (of the ellipse,
+        see ellipse_perimeter)
+    """
+    table = ellipse_table(ellipses)
+    _, _, major, minor, _ = ellipse_parameters(ellipses)
+    t0 = np.asarray(table["t0"], dtype=np.int64)
+    t1 = np.asarray(table["t1"], dtype=np.int64)
+    return pd.DataFrame({
+        "pid": table["pid"],
+        "t0": pd.to_datetime(t0),
+        "t1": pd.to_datetime(t1),
+        "interval": (t1 - t0) / 6e10,
+        "speed": np.asarray(table["speed"], dtype=float),
+        "major": major,
+        "minor": minor,
+        "area": np.pi * major * minor / 4,
+        "perimeter": ellipse_perimeter(major, minor),
+    })
+
+
+# fields of the records of an EllipseStore: the id of the individual (as a position in EllipseStore.ids), the start and
+# end times (int64 nanoseconds since epoch), the two points, the ellipse parameters, the speed and the positions of
+# the two points in the attribute table (-1 if none); the direction is also the rotation angle of the ellipse
+ELLIPSE_DTYPE = np.dtype([
+    ("pid", np.int32),
+    ("t0", np.int64),
+    ("t1", np.int64),
+    ("last_lat", np.float64),
+    ("last_lon", np.float64),
+    ("lat", np.float64),
+    ("lon", np.float64),
+    ("center_x", np.float64),
+    ("center_y", np.float64),
+    ("major", np.float64),
+    ("minor", np.float64),
+    ("speed", np.float64),
+    ("direction", np.float64),
+    ("last_row", np.int64),
+    ("row", np.int64),
+])
+
+
+def ellipse_items(ellipses: List[Ellipse], index: np.ndarray) -> List[Ellipse]:
+    """
+    Select PPAs by position
+    :param ellipses: list of Ellipse, or an EllipseStore
+    :param index: positions of the PPAs
+    :return: list of Ellipse
+    """
+    if isinstance(ellipses, EllipseStore):
+        return ellipses.take(index)
+    return [ellipses[i] for i in np.asarray(index).tolist()]
+
+
+def _allocate_records(n: int, directory: Union[str, None]) -> np.ndarray:
+    # records of an EllipseStore, in memory or in a new memory-mapped .npy file of the directory
+    if directory is None:
+        return np.empty(n, dtype=ELLIPSE_DTYPE)
+    os.makedirs(directory, exist_ok=True)
+    return np.lib.format.open_memmap(os.path.join(directory, "records.npy"), mode="w+", dtype=ELLIPSE_DTYPE,
+                                     shape=(n,))
+
+
+def ppa_records(x: np.ndarray, y: np.ndarray, t: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+    """
+    Records of an EllipseStore of the PPAs of one individual from the output of ppa_parameters, without creating
+    Ellipse objects; the rows of the points are their positions in the input arrays
+    :param x: latitude (or projected y) of each point
+    :param y: longitude (or projected x) of each point
+    :param t: int64 nanosecond timestamps of each point
+    :param params: dict returned by ppa_parameters (or read from a PPACache)
+    :return: structured array of ELLIPSE_DTYPE
+    """
+    index = np.asarray(params["index"], dtype=np.int64)
+    records = np.empty(index.size, dtype=ELLIPSE_DTYPE)
+    records["pid"] = 0
+    records["t0"], records["t1"] = t[index - 1], t[index]
+    records["last_lat"], records["last_lon"] = x[index - 1], y[index - 1]
+    records["lat"], records["lon"] = x[index], y[index]
+    records["center_x"] = (records["lat"] + records["last_lat"]) / 2
+    records["center_y"] = (records["lon"] + records["last_lon"]) / 2
+    records["major"], records["minor"] = params["major"], params["minor"]
+    records["speed"], records["direction"] = params["speed"], params["angle"]
+    records["last_row"], records["row"] = index - 1, index
+    return records
+
+
+class EllipseStore:
+    # the PPAs of one or more individuals as one contiguous NumPy structured array (which can be memory-mapped from
+    # disk), grouped by individual and in the order of time within each individual; the functions taking a list of
+    # Ellipse (ellipse_parameters, ellipse_times, ellipse_table, and so the pairing functions) also take a store and
+    # work on views of its columns, and items are turned into Ellipse objects only when indexed
+    def __init__(self, records: np.ndarray, ids: List[Any], offsets: np.ndarray):
+        """
+        :param records: structured array of ELLIPSE_DTYPE, grouped by individual
+        :param ids: id of each individual, in the order of the groups
+        :param offsets: start of the records of each individual, and the number of records at the end
+        """
+        if records.dtype != ELLIPSE_DTYPE:
+            raise TypeError("Parameter 'records' must be a structured array of ELLIPSE_DTYPE!")
+        self.records = records
+        self.ids = list(ids)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._positions = {pid: k for k, pid in enumerate(self.ids)}
+        self.directory: Union[str, None] = None  # set if the records are memory-mapped from a saved store
+        self._times: Union[Tuple[np.ndarray, np.ndarray], None] = None  # start and end times, see window
+
+    def __reduce__(self):
+        # a memory-mapped store is sent to other processes by its directory instead of by its records
+        if self.directory is not None:
+            return EllipseStore.load, (self.directory,)
+        return EllipseStore, (np.asarray(self.records), self.ids, self.offsets)
+
+    @classmethod
+    def from_ellipses(cls, ellipses: Union[List[Ellipse], Dict[Any, List[Ellipse]]], directory: str = None):
+        """
+        Copy PPAs into a store
+        :param ellipses: list of Ellipse, or lists of Ellipse keyed by id (e.g. ORTEGAGroup.ellipses_lists)
+        :param directory: if given, the store is written to this directory (see save) and memory-mapped from it
+        :return: EllipseStore
+        """
+        if not isinstance(ellipses, dict):
+            groups: Dict[Any, List[Ellipse]] = {}
+            for e in ellipses:
+                groups.setdefault(e.pid, []).append(e)
+            ellipses = groups
+        ids = list(ellipses)
+        counts = [len(ellipses[pid]) for pid in ids]
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        records = _allocate_records(int(offsets[-1]), directory)
+        for k, pid in enumerate(ids):
+            # one individual at a time, so that only one list is converted to arrays at once
+            part = records[offsets[k]:offsets[k + 1]]
+            items = ellipses[pid]
+            part["pid"] = k
+            part["t0"], part["t1"] = ellipse_times(items)
+            for key in ["last_lat", "last_lon", "lat", "lon", "major", "minor", "speed", "direction"]:
+                part[key] = [getattr(e, key) for e in items]
+            for key in ["last_row", "row"]:
+                part[key] = [getattr(e, key) if getattr(e, key) is not None else -1 for e in items]
+            part["center_x"] = (part["lat"] + part["last_lat"]) / 2
+            part["center_y"] = (part["lon"] + part["last_lon"]) / 2
+        store = cls(records, ids, offsets)
+        if directory is not None:
+            records.flush()
+            store.save_index(directory)
+            store.directory = os.fspath(directory)
+        return store
+
+    @classmethod
+    def concat(cls, stores: List["EllipseStore"], directory: str = None):
+        """
+        Combine stores of different individuals into one store
+        :param stores: list of EllipseStore
+        :param directory: if given, the store is written to this directory (see save) and memory-mapped from it
+        :return: EllipseStore
+        """
+        ids = [pid for store in stores for pid in store.ids]
+        if len(set(ids)) != len(ids):
+            raise ValueError("The stores to combine must have different ids!")
+        starts = np.concatenate([[0], np.cumsum([len(store) for store in stores], dtype=np.int64)])
+        offsets = np.concatenate([[0]] + [store.offsets[1:] + start for store, start in zip(stores, starts)])
+        records = _allocate_records(int(starts[-1]), directory)
+        n_ids = 0
+        for k, store in enumerate(stores):
+            # one store at a time, renumbering its individuals after the ones of the previous stores
+            part = records[starts[k]:starts[k + 1]]
+            part[...] = store.records
+            part["pid"] += n_ids
+            n_ids += len(store.ids)
+        store = cls(records, ids, offsets)
+        if directory is not None:
+            records.flush()
+            store.save_index(directory)
+            store.directory = os.fspath(directory)
+        return store
+
+    def save(self, directory: str):
+        """
+        Write the store to a directory as .npy files (records.npy, ids.npy and offsets.npy)
+        :param directory: target directory, created if needed
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "records.npy"), self.records)
+        self.save_index(directory)
+
+    def save_index(self, directory: str):
+        np.save(os.path.join(directory, "ids.npy"), np.asarray(self.ids))
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Union[str, None] = "r"):
+        """
+        Read a store written by save or from_ellipses
+        :param directory: directory of the store
+        :param mmap_mode: memory-map mode of numpy.load ('r' by default, so that the records are read from disk only
+            when accessed); None reads the whole store into memory
+        :return: EllipseStore
+        """
+        records = np.load(os.path.join(directory, "records.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        ids = np.load(os.path.join(directory, "ids.npy"), allow_pickle=False).tolist()
+        offsets = np.load(os.path.join(directory, "offsets.npy"), allow_pickle=False)
+        store = cls(records, ids, offsets)
+        if mmap_mode is not None:
+            store.directory = os.fspath(directory)
+        return store
+
+    def individual(self, pid: Any) -> "EllipseStore":
+        """
+        The PPAs of one individual, as a store viewing the same records (no copy)
+        :param pid: id of the individual
+        :return: EllipseStore
+        """
+        if pid not in self._positions:
+            raise KeyError(f"Id {pid} is not in the store!")
+        k = self._positions[pid]
+        return self[int(self.offsets[k]):int(self.offsets[k + 1])]
+
+    def window(self, pid: Any, start: int = None, end: int = None) -> "EllipseStore":
+        """
+        The PPAs of one individual within a time window, found by binary search on the start and end times (the PPAs
+        of an individual are in the order of time), as a store viewing the same records (no copy)
+        :param pid: id of the individual
+        :param start: the PPAs starting before this time (int64 nanoseconds since epoch) are left out; None for no limit
+        :param end: the PPAs ending after this time (int64 nanoseconds since epoch) are left out; None for no limit
+        :return: EllipseStore
+        """
+        if pid not in self._positions:
+            raise KeyError(f"Id {pid} is not in the store!")
+        if self._times is None:
+            # contiguous copies of the time columns, made once, for the binary searches
+            self._times = (np.ascontiguousarray(self.records["t0"]), np.ascontiguousarray(self.records["t1"]))
+        k = self._positions[pid]
+        first, last = int(self.offsets[k]), int(self.offsets[k + 1])
+        t0, t1 = self._times[0][first:last], self._times[1][first:last]
+        lo = int(np.searchsorted(t0, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(t1, end, side="right")) if end is not None else last - first
+        return self[first + lo:first + max(lo, hi)]
+
+    def __len__(self) -> int:
+        return self.records.shape[0]
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Ellipse, "EllipseStore"]:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("Only contiguous slices of an EllipseStore are supported!")
+            offsets = np.clip(self.offsets - start, 0, stop - start)
+            return EllipseStore(self.records[start:stop], self.ids, offsets)
+        r = self.records[item]
+        pid = self.ids[int(r["pid"])]
+        return Ellipse(float(r["lat"]), float(r["lon"]), float(r["last_lat"]), float(r["last_lon"]), pid, pid,
+                       int(r["t1"]), int(r["t0"]), float(r["speed"]), float(r["direction"]), float(r["major"]),
+                       float(r["minor"]), int(r["row"]) if r["row"] >= 0 else None,
+                       int(r["last_row"]) if r["last_row"] >= 0 else None)
+
+    def __iter__(self) -> Iterator[Ellipse]:
+        for k in range(0, len(self), 10000):
+            yield from self.take(np.arange(k, min(k + 10000, len(self))))
+
+    def take(self, index: np.ndarray) -> List[Ellipse]:
+        """
+        Turn the records at these positions into Ellipse objects, column by column; a position given several times
+        gives the same object, so that its shapely geometry is created once
+        :param index: positions of the records
+        :return: list of Ellipse, aligned with index
+        """
+        unique, inverse = np.unique(np.asarray(index, dtype=np.intp), return_inverse=True)
+        r = self.records[unique]
+        pid = np.asarray(self.ids, dtype=object)[r["pid"]].tolist()
+        row = [v if v >= 0 else None for v in r["row"].tolist()]
+        last_row = [v if v >= 0 else None for v in r["last_row"].tolist()]
+        ellipses = [Ellipse(*values) for values in zip(
+            r["lat"].tolist(), r["lon"].tolist(), r["last_lat"].tolist(), r["last_lon"].tolist(), pid, pid,
+            r["t1"].tolist(), r["t0"].tolist(), r["speed"].tolist(), r["direction"].tolist(), r["major"].tolist(),
+            r["minor"].tolist(), row, last_row)]
+        return [ellipses[k] for k in inverse.ravel().tolist()]
+
+    def parameters(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # the columns of ellipse_parameters
+        return (self.records["center_x"], self.records["center_y"], self.records["major"], self.records["minor"],
+                self.records["direction"])
+
+    def times(self) -> Tuple[np.ndarray, np.ndarray]:
+        # the columns of ellipse_times
+        return self.records["t0"], self.records["t1"]
+
+    def table(self) -> Dict[str, np.ndarray]:
+        # the columns of ellipse_table; the ids are gathered, the other columns are views of the records
+        table = {key: self.records[key] for key in ["t1", "t0", "lon", "lat", "last_lon", "last_lat", "speed",
+                                                    "direction", "row", "last_row"]}
+        table["pid"] = np.asarray(self.ids)[self.records["pid"]]
+        return table
+
+
 class EllipseList:
     # save all PPAs of two moving objects as a EllipseList
     def __init__(
@@ -148,7 +831,14 @@ class EllipseList:
             float, None] = None  # these attributes are not useful anywhere besides initializing Ellipse()
         self.last_id: Union[int, None] = None  # they only save the attributes of the last point of the tracking data
         self.last_ts: Union[pd.Timestamp, None] = None
-        self.last_attrs: Any = None
+        self.last_row: Union[int, None] = None
+        # attr_fields of all points given to generate/generate_batch, in the order of time; the PPAs only keep the
+        # positions (row, last_row) of their two points in this table
+        self.attrs: Union[pd.DataFrame, None] = None
+        self.n_points = 0
+        # recent speeds, kept between calls of generate/generate_batch so that new points appended to the tracking
+        # data continue the speed average of the previous PPAs
+        self.speed_memory = SpeedMemory()
         self.latitude_field = latitude_field
         self.longitude_field = longitude_field
         self.id_field = id_field
@@ -157,53 +847,57 @@ class EllipseList:
 
     def add_ellipse(
             self,
-            el: LinearRing,
             row: Any,
+            row_index: int,
             est_speed: float,
             direction: float,
-            geom: Polygon,
+            major: float,
+            minor: float,
     ):
-        if self.attr_fields is not None:
-            new_ellipse = Ellipse(
-                el,
-                row[self.latitude_field],
-                row[self.longitude_field],
-                self.last_lat,
-                self.last_lon,
-                row[self.id_field],
-                self.last_id,
-                row[self.time_field],
-                self.last_ts,
-                est_speed,
-                direction,
-                geom,
-                row[self.attr_fields].to_dict(),
-                self.last_attrs
-            )
-        else:
-            new_ellipse = Ellipse(
-                el,
-                row[self.latitude_field],
-                row[self.longitude_field],
-                self.last_lat,
-                self.last_lon,
-                row[self.id_field],
-                self.last_id,
-                row[self.time_field],
-                self.last_ts,
-                est_speed,
-                direction,
-                geom,
-            )
+        new_ellipse = Ellipse(
+            row[self.latitude_field],
+            row[self.longitude_field],
+            self.last_lat,
+            self.last_lon,
+            row[self.id_field],
+            self.last_id,
+            pd.Timestamp(row[self.time_field]).value,
+            pd.Timestamp(self.last_ts).value,
+            est_speed,
+            direction,
+            major,
+            minor,
+            row_index,
+            self.last_row,
+        )
         self.list.append(new_ellipse)
 
-    def set_last(self, row: Any):
+    def set_last(self, row: Any, row_index: int):
         self.last_lat = row[self.latitude_field]
         self.last_lon = row[self.longitude_field]
         self.last_id = row[self.id_field]
         self.last_ts = row[self.time_field]
+        self.last_row = row_index
+
+    def add_points(self, sorted_df: pd.DataFrame) -> int:
+        """
+        Add the attributes of new points (sorted by time) to the attribute table
+        :param sorted_df: the new GPS points
+        :return: position of the first new point in the attribute table
+        """
+        first_row = self.n_points
+        self.n_points += sorted_df.shape[0]
         if self.attr_fields is not None:
-            self.last_attrs = row[self.attr_fields].to_dict()
+            # labelled by position, so that the rows stay valid when old rows are dropped (see ORTEGAStream)
+            attrs = sorted_df[self.attr_fields].set_axis(pd.RangeIndex(first_row, self.n_points))
+            self.attrs = attrs if self.attrs is None else pd.concat([self.attrs, attrs])
+        return first_row
+
+    def to_dicts(self) -> List[EllipseDictionary]:
+        """
+        Ellipse.to_dict of all PPAs, with the attr_fields of their points resolved from the attribute table
+        """
+        return [e.to_dict(self.attrs) for e in self.list]
 
     def get_last_to_point(self) -> STPoint:
         return STPoint(self.last_lat, self.last_lon, self.last_ts, self.last_id)
@@ -219,15 +913,15 @@ class EllipseList:
         :return:
         """
 
-        speed_memory = SpeedMemory()
         avg_speed_kern = -1
         sorted_iter = gen_ellipses_for1.sort_values(self.time_field)
-        for _, row in sorted_iter.iterrows():
+        first_row = self.add_points(sorted_iter)
+        for row_index, (_, row) in enumerate(sorted_iter.iterrows(), first_row):
             if row[self.id_field] == self.last_id:  # make sure still looping the same pid
                 if abs(pd.Timedelta(row[self.time_field] - self.last_ts).total_seconds()) > max_el_time_min * 60:
                     # remove large PPAs
-                    self.set_last(row)
-                    speed_memory = SpeedMemory()  # clear speed_memory if ever skip a PPA
+                    self.set_last(row, row_index)
+                    self.speed_memory = SpeedMemory()  # clear speed_memory if ever skip a PPA
                     continue
                 p1: STPoint = STPoint.from_row(row, self.latitude_field, self.longitude_field, self.id_field,
                                                self.time_field)  # create STPoint object for each GPS point
@@ -236,23 +930,136 @@ class EllipseList:
                 est_speed = inst_speed * multi_el
                 # if do not apply multi_el for max speed, the resulted PPA will be a beeline between two points
                 if est_speed <= 0:  # if not moving, skip the step of creating PPA
-                    self.set_last(row)
-                    speed_memory = SpeedMemory()  # clear speed_memory if ever skip a PPA
+                    self.set_last(row, row_index)
+                    self.speed_memory = SpeedMemory()  # clear speed_memory if ever skip a PPA
                     continue
                 if speed_average:
                     # speed averaging to minimize uncertainty and noise effects of movement data
-                    speed_memory.append(est_speed)
-                    avg_speed_kern = speed_memory.get_average()
-
-                if avg_speed_kern > 0:
-                    el, angle = ppa_ellipse(p1, p2, est_speed, avg_speed_kern)
-                else:
-                    el, angle = ppa_ellipse(p1, p2, est_speed, est_speed)
-                geom = Polygon(el)
+                    self.speed_memory.append(est_speed)
+                    avg_speed_kern = self.speed_memory.get_average()
+
+                # avg_speed_kern can be negative value so this step can prevent a negative speed
+                _, major, minor, angle = p1.ellipse(p2, max(est_speed, avg_speed_kern))
                 try:
-                    self.add_ellipse(el, row, inst_speed, angle, geom)  # create Ellipse object
+                    self.add_ellipse(row, row_index, inst_speed, angle, major, minor)  # create Ellipse object
                 except Exception as e:
                     print(e)
                     print("Can't make ellipse class instance")
-            self.set_last(row)
+            self.set_last(row, row_index)
         return self.list
+
+    def generate_batch(self, gen_ellipses_for1: pd.DataFrame, max_el_time_min: float = 100000,
+                       multi_el: float = 1.25, speed_average: bool = False, cache: PPACache = None):
+        """
+        Create PPAs based on the following parameters, computing the PPA parameters of the whole track at once with
+        ppa_parameters instead of looping over rows; the resulted PPAs are the same as the ones of generate
+        :param speed_average: if True, apply speed average to compute max speed for PPA
+        :param gen_ellipses_for1: a pd.DataFrame of list of GPS tracking points of a moving object
+        :param max_el_time_min: remove large PPA if time interval greater than this value
+        :param multi_el: default value is 1.25 to avoid the resulted PPA being a beeline between two points
+        :param cache: a PPACache to read the PPA parameters from, or to store them in if they are not cached yet
+        :return:
+        """
+        sorted_df = gen_ellipses_for1.sort_values(self.time_field)
+        if sorted_df.shape[0] == 0:
+            return self.list
+        lat = sorted_df[self.latitude_field].tolist()
+        lon = sorted_df[self.longitude_field].tolist()
+        pid = sorted_df[self.id_field].tolist()
+        ts = sorted_df[self.time_field].tolist()
+        t = to_epoch_ns(sorted_df[self.time_field]).tolist()
+        first_row = self.add_points(sorted_df)
+        rows = list(range(first_row, self.n_points))
+        if self.last_id is not None:
+            # continue from the last point of the previous call, as generate does
+            lat, lon, pid, ts = [self.last_lat] + lat, [self.last_lon] + lon, [self.last_id] + pid, [self.last_ts] + ts
+            t = to_epoch_ns([self.last_ts]).tolist() + t
+            rows = [self.last_row] + rows
+
+        params, key = None, None
+        if cache is not None:
+            key = cache.key(lat, lon, t, pid, self.speed_memory.speed, max_el_time_min, multi_el, speed_average,
+                            self.speed_memory.kernel)
+            params = cache.load(key)
+        if params is None:
+            params = ppa_parameters(lat, lon, t, pid, max_el_time_min=max_el_time_min, multi_el=multi_el,
+                                    speed_average=speed_average, kernel=self.speed_memory.kernel,
+                                    speed_memory=self.speed_memory.speed)
+            if cache is not None:
+                cache.save(key, params)
+        self.speed_memory.speed = params["speed_memory"]
+        speed, angle = params["speed"].tolist(), params["angle"].tolist()
+        major, minor = params["major"].tolist(), params["minor"].tolist()
+        for k, i in enumerate(params["index"].tolist()):
+            self.list.append(Ellipse(
+                lat[i],
+                lon[i],
+                lat[i - 1],
+                lon[i - 1],
+                pid[i],
+                pid[i - 1],
+                t[i],
+                t[i - 1],
+                speed[k],
+                angle[k],
+                major[k],
+                minor[k],
+                rows[i],
+                rows[i - 1],
+            ))
+
+        self.last_lat, self.last_lon, self.last_id, self.last_ts = lat[-1], lon[-1], pid[-1], ts[-1]
+        self.last_row = rows[-1]
+        return self.list
+
+    def generate_store(self, gen_ellipses_for1: pd.DataFrame, max_el_time_min: float = 100000,
+                       multi_el: float = 1.25, speed_average: bool = False, cache: PPACache = None) -> EllipseStore:
+        """
+        Create the PPAs of the whole track of one individual as an EllipseStore, filled from the arrays of
+        ppa_parameters without creating Ellipse objects (the PPAs are not added to self.list); with a cache, the
+        records are stored too and a hit memory-maps them. The store has the same PPAs as generate_batch, and the
+        next calls of generate_batch continue from the last point.
+        :param speed_average: if True, apply speed average to compute max speed for PPA
+        :param gen_ellipses_for1: a pd.DataFrame of list of GPS tracking points of one moving object
+        :param max_el_time_min: remove large PPA if time interval greater than this value
+        :param multi_el: default value is 1.25 to avoid the resulted PPA being a beeline between two points
+        :param cache: a PPACache to read the PPA records from, or to store them in if they are not cached yet
+        :return: EllipseStore of the individual
+        """
+        if self.n_points != 0:
+            raise ValueError("generate_store creates the PPAs of a whole track, it cannot continue previous PPAs!")
+        sorted_df = gen_ellipses_for1.sort_values(self.time_field)
+        ids = sorted_df[self.id_field].unique().tolist()
+        if len(ids) > 1:
+            raise ValueError(f"generate_store takes the points of one individual but {len(ids)} id are found!")
+        if sorted_df.shape[0] == 0:
+            return EllipseStore(np.empty(0, dtype=ELLIPSE_DTYPE), [], np.zeros(1, dtype=np.int64))
+        x = sorted_df[self.latitude_field].to_numpy(dtype=float)
+        y = sorted_df[self.longitude_field].to_numpy(dtype=float)
+        t = to_epoch_ns(sorted_df[self.time_field])
+        pid = sorted_df[self.id_field].tolist()
+        self.add_points(sorted_df)
+
+        entry, key = None, None
+        if cache is not None:
+            key = cache.key(x, y, t, pid, self.speed_memory.speed, max_el_time_min, multi_el, speed_average,
+                            self.speed_memory.kernel)
+            entry = cache.load_records(key)
+        if entry is not None:
+            records, self.speed_memory.speed = entry
+        else:
+            params = cache.load(key) if cache is not None else None
+            if params is None:
+                params = ppa_parameters(x, y, t, pid, max_el_time_min=max_el_time_min, multi_el=multi_el,
+                                        speed_average=speed_average, kernel=self.speed_memory.kernel,
+                                        speed_memory=self.speed_memory.speed)
+                if cache is not None:
+                    cache.save(key, params)
+            self.speed_memory.speed = params["speed_memory"]
+            records = ppa_records(x, y, t, params)
+            if cache is not None:
+                cache.save_records(key, records)
+
+        last = sorted_df.iloc[-1]
+        self.set_last(last, self.n_points - 1)
+        return EllipseStore(records, ids, np.array([0, records.size], dtype=np.int64))
@@ -0,0 +1,212 @@
+from typing import Any, Callable, Dict
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # mean radius of the earth, in meters
+
+
+def _as_arrays(*arrays: Any, dtype: Any = np.float64):
+    # convert the inputs to arrays of the working dtype (no copy if they already are) and allocate the output once
+    arrays = [np.asarray(a, dtype=dtype) for a in arrays]
+    out = np.empty(np.broadcast_shapes(*[a.shape for a in arrays]), dtype=dtype)
+    return arrays, out
+
+
+def euclidean_distance(lat1: Any, lon1: Any, lat2: Any, lon2: Any, dtype: Any = np.float64) -> np.ndarray:
+    """
+    Planar distance between points in projected coordinates (or in degrees, as the PPAs of unprojected data)
+    :param lat1: latitude (or projected y) of the first points
+    :param lon1: longitude (or projected x) of the first points
+    :param lat2: latitude (or projected y) of the second points
+    :param lon2: longitude (or projected x) of the second points
+    :param dtype: np.float64 or np.float32
+    :return: array of distances, in the units of the coordinates
+    """
+    (lat1, lon1, lat2, lon2), out = _as_arrays(lat1, lon1, lat2, lon2, dtype=dtype)
+    dy = np.subtract(lon2, lon1, out=np.empty_like(out))
+    np.subtract(lat2, lat1, out=out)
+    np.multiply(out, out, out=out)
+    np.multiply(dy, dy, out=dy)
+    out += dy
+    return np.sqrt(out, out=out)[()]
+
+
+def haversine_distance(lat1: Any, lon1: Any, lat2: Any, lon2: Any, dtype: Any = np.float64,
+                       radius: float = EARTH_RADIUS) -> np.ndarray:
+    """
+    Great circle distance between points given in decimal degrees
+    :param lat1: latitude of the first points
+    :param lon1: longitude of the first points
+    :param lat2: latitude of the second points
+    :param lon2: longitude of the second points
+    :param dtype: np.float64 or np.float32
+    :param radius: radius of the earth, in meters
+    :return: array of distances, in meters
+    """
+    (lat1, lon1, lat2, lon2), out = _as_arrays(lat1, lon1, lat2, lon2, dtype=dtype)
+    # sin^2 of half the latitude difference
+    np.subtract(lat2, lat1, out=out)
+    np.deg2rad(out, out=out)
+    out *= 0.5
+    np.sin(out, out=out)
+    np.multiply(out, out, out=out)
+    # cos(lat1) * cos(lat2) * sin^2 of half the longitude difference
+    work = np.subtract(lon2, lon1, out=np.empty_like(out))
+    np.deg2rad(work, out=work)
+    work *= 0.5
+    np.sin(work, out=work)
+    np.multiply(work, work, out=work)
+    work *= np.cos(np.deg2rad(lat1))
+    work *= np.cos(np.deg2rad(lat2))
+    out += work
+    np.sqrt(out, out=out)
+    np.minimum(out, 1, out=out)  # rounding can push antipodal points slightly above 1
+    np.arcsin(out, out=out)
+    out *= 2 * radius
+    return out[()]
+
+
+def equirectangular_distance(lat1: Any, lon1: Any, lat2: Any, lon2: Any, dtype: Any = np.float64,
+                             radius: float = EARTH_RADIUS) -> np.ndarray:
+    """
+    Equirectangular approximation of the great circle distance between points given in decimal degrees; cheaper than
+    haversine_distance and accurate for the short steps between consecutive GPS points
+    :param lat1: latitude of the first points
+    :param lon1: longitude of the first points
+    :param lat2: latitude of the second points
+    :param lon2: longitude of the second points
+    :param dtype: np.float64 or np.float32
+    :param radius: radius of the earth, in meters
+    :return: array of distances, in meters
+    """
+    (lat1, lon1, lat2, lon2), out = _as_arrays(lat1, lon1, lat2, lon2, dtype=dtype)
+    # longitude difference scaled by the cosine of the mean latitude
+    work = np.add(lat1, lat2, out=np.empty_like(out))
+    work *= 0.5
+    np.deg2rad(work, out=work)
+    np.cos(work, out=work)
+    work *= np.subtract(lon2, lon1, dtype=dtype)
+    np.multiply(work, work, out=work)
+    np.subtract(lat2, lat1, out=out)
+    np.multiply(out, out, out=out)
+    out += work
+    np.sqrt(out, out=out)
+    np.deg2rad(out, out=out)
+    out *= radius
+    return out[()]
+
+
+def bearing(lat1: Any, lon1: Any, lat2: Any, lon2: Any, dtype: Any = np.float64) -> np.ndarray:
+    """
+    Initial bearing of the great circle from the first points to the second points given in decimal degrees
+    :param lat1: latitude of the first points
+    :param lon1: longitude of the first points
+    :param lat2: latitude of the second points
+    :param lon2: longitude of the second points
+    :param dtype: np.float64 or np.float32
+    :return: array of bearings, in degree clockwise from north in [0, 360)
+    """
+    (lat1, lon1, lat2, lon2), out = _as_arrays(lat1, lon1, lat2, lon2, dtype=dtype)
+    phi1, phi2 = np.deg2rad(lat1), np.deg2rad(lat2)
+    dlon = np.subtract(lon2, lon1, out=np.empty_like(out))
+    np.deg2rad(dlon, out=dlon)
+    y = np.sin(dlon) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlon)
+    np.arctan2(y, x, out=out)
+    np.rad2deg(out, out=out)
+    np.mod(out, 360, out=out)
+    return out[()]
+
+
+# distance kernels by name, for the functions below that take a 'method'
+DISTANCE_METHODS: Dict[str, Callable[..., np.ndarray]] = {
+    'euclidean': euclidean_distance,
+    'haversine': haversine_distance,
+    'equirectangular': equirectangular_distance,
+}
+
+
+def _distance_method(method: str) -> Callable[..., np.ndarray]:
+    if method not in DISTANCE_METHODS:
+        raise ValueError(f"Parameter 'method' must be one of these: {list(DISTANCE_METHODS)}!")
+    return DISTANCE_METHODS[method]
+
+
+def step_distances(lat: Any, lon: Any, method: str = 'euclidean', dtype: Any = np.float64) -> np.ndarray:
+    """
+    Distances between consecutive points of a track
+    :param lat: latitude (or projected y) of the points, in the order of time
+    :param lon: longitude (or projected x) of the points, in the order of time
+    :param method: 'euclidean' for projected coordinates, 'haversine' or 'equirectangular' for decimal degrees
+    :param dtype: np.float64 or np.float32
+    :return: array of len(lat) - 1 distances
+    """
+    lat = np.asarray(lat, dtype=dtype)
+    lon = np.asarray(lon, dtype=dtype)
+    return _distance_method(method)(lat[:-1], lon[:-1], lat[1:], lon[1:], dtype=dtype)
+
+
+def step_speeds(lat: Any, lon: Any, t: Any, method: str = 'euclidean', dtype: Any = np.float64,
+                div_constant: float = 0.000000000000000000000000000000001) -> np.ndarray:
+    """
+    Speeds between consecutive points of a track
+    :param lat: latitude (or projected y) of the points, in the order of time
+    :param lon: longitude (or projected x) of the points, in the order of time
+    :param t: int64 nanosecond timestamps of the points
+    :param method: 'euclidean' for projected coordinates, 'haversine' or 'equirectangular' for decimal degrees
+    :param dtype: np.float64 or np.float32
+    :param div_constant: small constant preventing a division by zero for simultaneous points
+    :return: array of len(lat) - 1 speeds, in distance unit per second (m/s for 'haversine', 'equirectangular' and
+        metric projections)
+    """
+    t = np.asarray(t, dtype=np.int64)
+    dt = np.abs(t[1:] - t[:-1]) / 1e9  # in seconds
+    dt += div_constant
+    speed = step_distances(lat, lon, method, dtype)
+    speed /= dt
+    return speed
+
+
+def pairwise_distances(lat1: Any, lon1: Any, lat2: Any, lon2: Any, method: str = 'euclidean',
+                       dtype: Any = np.float64) -> np.ndarray:
+    """
+    Distances between every point of the first set and every point of the second set
+    :param lat1: latitude (or projected y) of the first points
+    :param lon1: longitude (or projected x) of the first points
+    :param lat2: latitude (or projected y) of the second points
+    :param lon2: longitude (or projected x) of the second points
+    :param method: 'euclidean' for projected coordinates, 'haversine' or 'equirectangular' for decimal degrees
+    :param dtype: np.float64 or np.float32
+    :return: array of shape (len(lat1), len(lat2))
+    """
+    lat1 = np.asarray(lat1, dtype=dtype).reshape(-1, 1)
+    lon1 = np.asarray(lon1, dtype=dtype).reshape(-1, 1)
+    return _distance_method(method)(lat1, lon1, np.asarray(lat2, dtype=dtype), np.asarray(lon2, dtype=dtype),
+                                    dtype=dtype)
+
+
+def point_to_track_distance(lat: Any, lon: Any, track_lat: Any, track_lon: Any, method: str = 'euclidean',
+                            dtype: Any = np.float64, chunk_size: int = 1024) -> np.ndarray:
+    """
+    Distance from each point to the closest point of a track, computed by chunks of points so that the memory used
+    stays bounded by chunk_size * len(track_lat) distances
+    :param lat: latitude (or projected y) of the points
+    :param lon: longitude (or projected x) of the points
+    :param track_lat: latitude (or projected y) of the points of the track
+    :param track_lon: longitude (or projected x) of the points of the track
+    :param method: 'euclidean' for projected coordinates, 'haversine' or 'equirectangular' for decimal degrees
+    :param dtype: np.float64 or np.float32
+    :param chunk_size: number of points processed at a time
+    :return: array of len(lat) distances
+    """
+    lat = np.asarray(lat, dtype=dtype).ravel()
+    lon = np.asarray(lon, dtype=dtype).ravel()
+    track_lat = np.asarray(track_lat, dtype=dtype).ravel()
+    track_lon = np.asarray(track_lon, dtype=dtype).ravel()
+    if track_lat.size == 0:
+        raise ValueError("The track must have at least one point!")
+    out = np.empty(lat.size, dtype=dtype)
+    for start in range(0, lat.size, chunk_size):
+        stop = start + chunk_size
+        distances = pairwise_distances(lat[start:stop], lon[start:stop], track_lat, track_lon, method, dtype)
+        np.min(distances, axis=1, out=out[start:stop])
+    return out
@@ -0,0 +1,282 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as datetime
+from itertools import combinations
+from typing import Any, Dict, List, Tuple, Union
+import pandas as pd
+from pandas.api.types import is_datetime64_dtype
+from .cache import PPACache
+from .ellipses import Ellipse, EllipseList, EllipseStore, ellipse_metrics
+from .ortega import ORTEGAParameters, pair_interaction_analysis, check_time_lag_and_overlap, ppa_summary
+from .output import ORTEGAResults
+from .instrumentation import Instrumentation, Recorder
+from .projection import get_transformer, project_points
+
+
+def group_pair_analysis(
+        ellipses_lists: Union[Dict[Any, List[Ellipse]], EllipseStore], time_ranges: Dict[Any, Tuple[pd.Timestamp, pd.Timestamp]],
+        id1: Any, id2: Any, minute_min_delay: float, minute_max_delay: float, attr_fields: List[str] = None,
+        brute_force: bool = False, analytic: bool = False, recorder: Recorder = None, tolerance: float = None,
+) -> Union[ORTEGAResults, None]:
+    """
+    Interaction analysis of one pair of entities of a group, skipping the pair if the two entities are too far
+    apart in time
+    :param ellipses_lists: PPAs of each entity, keyed by id, or an EllipseStore of all entities
+    :param time_ranges: first and last timestamps of each entity, keyed by id
+    :param id1: id of the first entity
+    :param id2: id of the second entity
+    :param minute_min_delay: allowable minimum delay for intersecting PPAs, in minute
+    :param minute_max_delay: allowable maximum delay for intersecting PPAs, in minute
+    :param attr_fields: attribute fields stored with the PPAs, if any
+    :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+    :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+    :param recorder: the instrumentation of the pair analysis is the one of this recorder
+    :param tolerance: if not None, the vertex tolerance of the PPA polygons (see vertex_count)
+    :return: ORTEGAResults, or None if no interaction is found
+    """
+    recorder = (recorder if recorder is not None else Recorder()).new_run(pair=(id1, id2))
+    if not check_time_lag_and_overlap(*time_ranges[id1], *time_ranges[id2], minute_max_delay):
+        recorder.message(f"Skipping pair {id1} and {id2} due to time lag greater than {minute_max_delay}!")
+        return None
+    recorder.message(f"Interaction analysis of pair {id1} and {id2}...")
+    if isinstance(ellipses_lists, EllipseStore):
+        ellipses_list_id1, ellipses_list_id2 = ellipses_lists.individual(id1), ellipses_lists.individual(id2)
+    else:
+        ellipses_list_id1, ellipses_list_id2 = ellipses_lists[id1], ellipses_lists[id2]
+    return pair_interaction_analysis(ellipses_list_id1, ellipses_list_id2, id1, id2, minute_min_delay,
+                                     minute_max_delay, attr_fields, brute_force, analytic, recorder, tolerance)
+
+
+_pair_worker_state: Dict[str, Any] = {}
+
+
+def _init_pair_worker(ellipses_lists: Union[Dict[Any, List[Ellipse]], EllipseStore],
+                      time_ranges: Dict[Any, Tuple[pd.Timestamp, pd.Timestamp]],
+                      minute_min_delay: float, minute_max_delay: float, attr_fields: List[str],
+                      recorder: Recorder, tolerance: float = None):
+    # runs once in each worker process so that the PPAs are sent to each worker only once, not with every pair (a
+    # memory-mapped EllipseStore is sent as its directory and mapped again by the worker)
+    _pair_worker_state.update(ellipses_lists=ellipses_lists, time_ranges=time_ranges,
+                              minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay,
+                              attr_fields=attr_fields, recorder=recorder, tolerance=tolerance)
+
+
+def _run_pair_worker(task: Tuple[Any, Any, bool, bool]) -> Union[ORTEGAResults, None]:
+    id1, id2, brute_force, analytic = task
+    return group_pair_analysis(id1=id1, id2=id2, brute_force=brute_force, analytic=analytic, **_pair_worker_state)
+
+
+class ORTEGAGroup(ORTEGAParameters):
+    # ORTEGAGroup runs the interaction analysis for all pairs of a group of moving entities (or for one reference
+    # entity against all others); the PPAs of each entity are created only once and shared by all of its pairs
+    def __init__(
+            self,
+            data: pd.DataFrame,  # movement data of two or more entities
+            minute_min_delay: float = 0,  # allowable minimum delay for intersecting PPAs, in minute
+            minute_max_delay: float = None,  # allowable maximum delay for intersecting PPAs, in minute
+            start_time: str = None,  # use this when users want to select a segment of movement data
+            end_time: str = None,  # use this when users want to select a segment of movement data
+            max_el_time_min: float = 10000,  # PPA's interval greater than this value will be eliminated, in minute
+            latitude_field: str = "latitude",  # specify the latitude field name
+            longitude_field: str = "longitude",  # specify the longitude field name
+            id_field: str = "pid",  # specify the id field name
+            time_field: str = "time_local",  # time_field must include month, day, year, hour, minute, second
+            speed_average: bool = False,
+            attr_fields: List[str] = None,
+            crs: Any = None,  # 'auto' or a projected CRS to project WGS84 latitude/longitude to before creating PPAs
+            instrumentation: Instrumentation = None,  # receives progress messages and stage metrics; silent if None
+            track_memory: bool = False,  # if True, measure the peak memory of each stage (slower)
+            cache: Union[PPACache, str] = None,  # PPACache or directory to reuse the PPAs computed by previous runs
+            store: Union[bool, str] = False,  # keep the PPAs in an EllipseStore, memory-mapped if this is a directory
+            vertex_tolerance: float = None,  # if set, PPA polygons adapt their vertex count to be within this distance
+    ):
+        self.data = data
+        self.start_time = start_time
+        self.end_time = end_time
+        self.latitude_field = latitude_field
+        self.longitude_field = longitude_field
+        self.id_field = id_field
+        self.time_field = time_field
+        self.attr_fields = attr_fields
+        self.minute_min_delay = minute_min_delay
+        self.minute_max_delay = minute_max_delay
+        self.max_el_time_min = max_el_time_min
+        self.speed_average = speed_average
+        self.crs = crs
+        self.instrumentation = instrumentation
+        self.track_memory = track_memory
+        self.cache = cache
+        self.store = store
+        self.vertex_tolerance = vertex_tolerance
+        # metrics of the stages run by the constructor
+        self.recorder = Recorder(self.instrumentation, self.track_memory)
+        self.metrics = self.recorder.metrics
+        self.__validate()
+        self.__start()
+
+    @property
+    def store(self):
+        return self._store
+
+    @store.setter
+    def store(self, value):
+        if not isinstance(value, (bool, str, os.PathLike)):
+            raise TypeError("Parameter 'store' must be a boolean or a directory!")
+        self._store = value
+
+    def __validate(self):
+        """
+        validate the input parameters and select the time window if given;
+        private function, only can be called in side the class
+        """
+        if self.minute_max_delay < self.minute_min_delay:
+            raise ValueError("Parameter 'minute_max_delay' must be greater than 'minute_min_delay'!")
+
+        self.recorder.message('Initializing ORTEGAGroup object...')
+        if not is_datetime64_dtype(self.data[self.time_field]):
+            raise TypeError("Column 'time_field' is not datetime type! Please use "
+                            "pd.to_datetime() to convert it to datetime.")
+
+        self.subset = self.data
+        if self.start_time is not None:
+            start_time = datetime.strptime(self.start_time, '%Y-%m-%d %H:%M:%S')
+            self.subset = self.subset[self.subset[self.time_field] >= start_time]
+        if self.end_time is not None:
+            end_time = datetime.strptime(self.end_time, '%Y-%m-%d %H:%M:%S')
+            self.subset = self.subset[self.subset[self.time_field] <= end_time]
+
+        self.ids = self.subset[self.id_field].unique().tolist()
+        if len(self.ids) < 2:
+            raise ValueError(f'At least two unique id are required but {len(self.ids)} id are found in the given '
+                             f'dataframe!')
+
+        # project all tracks once so that PPAs and speeds are in meters
+        self.transformer = None
+        self.target_crs = None
+        if self.crs is not None:
+            with self.recorder.stage("projection") as counts:
+                self.transformer = get_transformer(self.crs, self.subset[self.longitude_field].to_numpy(),
+                                                   self.subset[self.latitude_field].to_numpy())
+                self.target_crs = self.transformer.target_crs
+                self.subset = project_points(self.subset, self.transformer, self.latitude_field,
+                                             self.longitude_field)
+                counts.update(points=self.subset.shape[0])
+            self.recorder.message(f'Tracks projected to {self.target_crs.name}!')
+
+    def __start(self):
+        """
+        private function, only can be called in side the class;
+        create the PPAs of each moving entity once
+        ellipses_lists: PPAs of each entity, keyed by id, or an EllipseStore of all entities if store is set
+        time_ranges: first and last timestamps of each entity, keyed by id
+        attributes: attribute tables of each entity, keyed by id
+        """
+        self.recorder.message(f"Generate PPA list for {len(self.ids)} moving entities...")
+        self.ellipses_lists: Union[Dict[Any, List[Ellipse]], EllipseStore] = {}
+        self.time_ranges: Dict[Any, Tuple[pd.Timestamp, pd.Timestamp]] = {}
+        self.attributes: Dict[Any, Union[pd.DataFrame, None]] = {}
+        stores: List[EllipseStore] = []
+        with self.recorder.stage("ppa_generation") as counts:
+            for pid, df in self.subset.groupby(self.id_field, sort=False):
+                ellipses_list_gen = EllipseList(self.latitude_field, self.longitude_field, self.id_field,
+                                                self.time_field, self.attr_fields)
+                if self.store is not False:
+                    # only the records are kept, filled from the PPA parameters (or memory-mapped from the cache)
+                    stores.append(ellipses_list_gen.generate_store(df, max_el_time_min=self.max_el_time_min,
+                                                                   speed_average=self.speed_average, cache=self.cache))
+                else:
+                    self.ellipses_lists[pid] = ellipses_list_gen.generate_batch(
+                        df, max_el_time_min=self.max_el_time_min, speed_average=self.speed_average, cache=self.cache)
+                self.time_ranges[pid] = (df[self.time_field].min(), df[self.time_field].max())
+                self.attributes[pid] = ellipses_list_gen.attrs
+            if self.store is not False:
+                self.ellipses_lists = EllipseStore.concat(stores, self.store if self.store is not True else None)
+            n_ppas = len(self.ellipses_lists) if self.store is not False else \
+                sum(len(e) for e in self.ellipses_lists.values())
+            counts.update(points=self.subset.shape[0], ppas=n_ppas, individuals=len(self.time_ranges))
+        self.recorder.message('Initialization success!')
+
+    def ppa_metrics(self, summary: bool = False) -> pd.DataFrame:
+        """
+        Metrics of each PPA of the group, computed from the axes of the ellipses (see ellipse_metrics)
+        :param summary: if True, return the descriptive statistics of the metrics of each entity (see ppa_summary)
+            instead of one row per PPA
+        :return: dataframe with the columns 'pid', 't0', 't1', 'interval' (minute), 'speed', 'major', 'minor',
+            'area' and 'perimeter', in the unit of the coordinates
+        """
+        if isinstance(self.ellipses_lists, EllipseStore):
+            metrics = ellipse_metrics(self.ellipses_lists)
+        else:
+            metrics = pd.concat([ellipse_metrics(ellipses_list) for ellipses_list in self.ellipses_lists.values()],
+                                ignore_index=True)
+        return ppa_summary(metrics) if summary else metrics
+
+    def get_pairs(self, reference: Any = None) -> List[Tuple[Any, Any]]:
+        """
+        List the pairs of entities to analyze
+        :param reference: if given, pair this entity with every other entity; otherwise list all unordered pairs
+        :return: list of (id1, id2)
+        """
+        if reference is None:
+            return list(combinations(self.ids, 2))
+        if reference not in self.ids:
+            raise ValueError(f"Reference id {reference} is not found in the given dataframe!")
+        return [(reference, pid) for pid in self.ids if pid != reference]
+
+    def pair_analysis(self, id1: Any, id2: Any, brute_force: bool = False,
+                      analytic: bool = False) -> Union[ORTEGAResults, None]:
+        """
+        Interaction analysis of one pair of entities using their shared PPAs
+        :param id1: id of the first entity
+        :param id2: id of the second entity
+        :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :return: ORTEGAResults, or None if no interaction is found
+        """
+        results = group_pair_analysis(self.ellipses_lists, self.time_ranges, id1, id2, self.minute_min_delay,
+                                      self.minute_max_delay, self.attr_fields, brute_force, analytic, self.recorder,
+                                      self.vertex_tolerance)
+        if results is not None:
+            results.set_attributes({id1: self.attributes[id1], id2: self.attributes[id2]})
+            results.set_time_dtype(self.subset[self.time_field].dtype)
+        return results
+
+    def interaction_analysis(self, reference: Any = None, pairs: List[Tuple[Any, Any]] = None,
+                             brute_force: bool = False, analytic: bool = False,
+                             n_workers: Union[int, None] = 1, chunksize: int = 1) -> Union[ORTEGAResults, None]:
+        """
+        Interaction analysis of all unordered pairs of entities, or of a reference entity against all others
+        :param reference: if given, only analyze the pairs of this entity with every other entity
+        :param pairs: if given, analyze these pairs of ids instead of the ones from get_pairs(reference)
+        :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :param n_workers: number of worker processes; 1 runs the pairs in this process, None uses all CPUs
+        :param chunksize: number of pairs sent to a worker process at a time
+        :return: ORTEGAResults combining all pairs in the order of the pair list (columns 'p1' and 'p2' identify
+            the pair), or None if no interaction is found
+        """
+        if n_workers is not None and (not isinstance(n_workers, int) or n_workers < 1):
+            raise ValueError("Parameter 'n_workers' must be a positive integer or None!")
+        if not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError("Parameter 'chunksize' must be a positive integer!")
+        if pairs is None:
+            pairs = self.get_pairs(reference)
+
+        if n_workers == 1:
+            results = [self.pair_analysis(id1, id2, brute_force, analytic) for id1, id2 in pairs]
+        else:
+            tasks = [(id1, id2, brute_force, analytic) for id1, id2 in pairs]
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_pair_worker,
+                                     initargs=(self.ellipses_lists, self.time_ranges, self.minute_min_delay,
+                                               self.minute_max_delay, self.attr_fields, self.recorder,
+                                               self.vertex_tolerance)) as executor:
+                # map returns the results in the order of the tasks whichever worker finishes first
+                results = list(executor.map(_run_pair_worker, tasks, chunksize=chunksize))
+        results = ORTEGAResults.concat(results)
+        if results is not None:
+            # the metrics of the combined results start with the PPA generation of the group
+            results.set_recorder(self.recorder.new_run(self.recorder.metrics.stages + results.metrics.stages))
+            # the attribute tables stay in this process, the workers only return the positions of the points
+            results.set_attributes({pid: self.attributes[pid] for pair in pairs for pid in pair})
+            results.set_time_dtype(self.subset[self.time_field].dtype)
+        return results
@@ -0,0 +1,155 @@
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime as datetime
+from typing import Any, Dict, Iterator, List, Tuple, Union
+import pandas as pd
+from attrs import define, field
+
+# peak traced memory of each open stage measured with track_memory, outermost first: tracemalloc has a single peak
+# that each stage resets when it starts, so the peak of a nested stage is folded into the stage around it
+_open_stage_peaks: List[int] = []
+
+
+@define
+class StageMetrics:
+    #  wall time, peak memory and item counts of one stage of an analysis run
+    name: str
+    seconds: float
+    counts: Dict[str, int] = field(factory=dict)  # e.g. PPAs built, candidates tested, pairs kept, events found
+    peak_mb: Union[float, None] = None  # peak of the memory allocated during the stage, if measured
+    pair: Union[Tuple[Any, Any], None] = None  # the two individuals analyzed, if the stage is about a pair
+
+
+class RunMetrics:
+    # the stage metrics of one run of the analysis, in the order the stages were run
+    def __init__(self, stages: List[StageMetrics] = None):
+        self.stages: List[StageMetrics] = list(stages) if stages is not None else []
+
+    def __iter__(self) -> Iterator[StageMetrics]:
+        return iter(self.stages)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def add(self, stage: StageMetrics):
+        self.stages.append(stage)
+
+    @classmethod
+    def concat(cls, metrics: List[Union["RunMetrics", None]]):
+        return cls([stage for m in metrics if m is not None for stage in m.stages])
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(stage.seconds for stage in self.stages)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        One row per stage with the columns 'stage', 'pair', 'seconds', 'peak_mb' and one column per count
+        """
+        return pd.DataFrame([{"stage": stage.name, "pair": stage.pair, "seconds": stage.seconds,
+                              "peak_mb": stage.peak_mb, **stage.counts} for stage in self.stages])
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Total wall time, largest peak memory and total counts of each stage over all pairs, slowest stage first
+        """
+        df = self.to_dataframe()
+        if df.empty:
+            return df
+        aggregations = {column: "sum" for column in df.columns if column not in ["stage", "pair", "peak_mb"]}
+        aggregations["peak_mb"] = "max"
+        return df.groupby("stage", sort=False).agg(aggregations).sort_values("seconds", ascending=False)
+
+
+class Instrumentation:
+    # receives the progress messages and the stage metrics of an analysis; this base class ignores them (the silent
+    # default), subclass it and override on_message and/or on_stage to plug in other reporting
+    def on_message(self, message: str):
+        pass
+
+    def on_stage(self, stage: StageMetrics):
+        pass
+
+
+class PrintInstrumentation(Instrumentation):
+    # print the progress messages to stdout with a timestamp
+    def on_message(self, message: str):
+        print(datetime.now(), message)
+
+
+class LoggingInstrumentation(Instrumentation):
+    # forward the progress messages and the stage metrics to a logger of the logging module
+    def __init__(self, logger: Union[str, logging.Logger] = "ortega", level: int = logging.INFO,
+                 stage_level: int = logging.DEBUG):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+        self.stage_level = stage_level
+
+    def on_message(self, message: str):
+        self.logger.log(self.level, message)
+
+    def on_stage(self, stage: StageMetrics):
+        counts = ", ".join(f"{key}={value}" for key, value in stage.counts.items())
+        peak = f", peak {stage.peak_mb:.1f} MB" if stage.peak_mb is not None else ""
+        pair = f" of pair {stage.pair[0]} and {stage.pair[1]}" if stage.pair is not None else ""
+        self.logger.log(self.stage_level, f"Stage {stage.name}{pair}: {stage.seconds:.3f} s{peak} ({counts})",
+                        extra={"ortega_stage": stage})
+
+
+class Recorder:
+    # sends the messages to an Instrumentation and collects the metrics of the stages of one run
+    def __init__(self, instrumentation: Instrumentation = None, track_memory: bool = False,
+                 metrics: RunMetrics = None, pair: Tuple[Any, Any] = None):
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.track_memory = track_memory
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.pair = pair  # the two individuals analyzed, recorded with the stages
+
+    def new_run(self, stages: List[StageMetrics] = None, pair: Tuple[Any, Any] = None):
+        """
+        A recorder with the same instrumentation for a new run, starting with the given stages
+        :param stages: stages already run, e.g. the PPA generation of the individuals
+        :param pair: the two individuals analyzed in the run; the pair of this recorder by default
+        """
+        return Recorder(self.instrumentation, self.track_memory, RunMetrics(stages),
+                        pair if pair is not None else self.pair)
+
+    def message(self, message: str):
+        self.instrumentation.on_message(message)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """
+        Measure a stage: the block gets a dict to fill with the item counts of the stage
+        :param name: name of the stage
+        """
+        counts = {}
+        started = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            elif hasattr(tracemalloc, "reset_peak"):
+                if _open_stage_peaks:
+                    _open_stage_peaks[-1] = max(_open_stage_peaks[-1], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+            _open_stage_peaks.append(memory_start)
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            seconds = time.perf_counter() - start
+            peak_mb = None
+            if self.track_memory:
+                peak = max(_open_stage_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                peak_mb = (peak - memory_start) / 2 ** 20
+                if _open_stage_peaks:
+                    _open_stage_peaks[-1] = max(_open_stage_peaks[-1], peak)
+                if started:
+                    tracemalloc.stop()
+        stage = StageMetrics(name, seconds, counts, peak_mb, self.pair)
+        self.metrics.add(stage)
+        self.instrumentation.on_stage(stage)
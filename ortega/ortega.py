@@ -1,10 +1,17 @@
 from datetime import datetime as datetime
-from .ellipses import Ellipse, EllipseList
+import os
+from .ellipses import Ellipse, EllipseList, EllipseStore, ellipse_bounds, ellipse_items, ellipse_parameters, ellipse_table, \
+    ellipse_times, ellipses_intersect, ellipse_polygons, ellipse_metrics
 from pandas.api.types import is_datetime64_dtype
-from typing import List, Tuple
-from .common import __timedifcheck
+from pyproj import CRS
+import shapely
+from shapely.strtree import STRtree
+from typing import Any, Dict, List, Tuple, Union
 from .common import *
 from .output import *
+from .projection import get_transformer, project_points
+from .instrumentation import Instrumentation, Recorder
+from .cache import PPACache
 
 
 def __check_spatial_intersect(item: Ellipse, others: Ellipse) -> bool:
@@ -22,174 +29,267 @@ def __check_spatial_intersect(item: Ellipse, others: Ellipse) -> bool:
     )
 
 
-def get_spatial_intersect_pairs(
+def get_spatial_intersect_index(
         ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse],
+        candidates: Tuple[np.ndarray, np.ndarray] = None, analytic: bool = False, tolerance: float = None,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all pairs of spatially intersecting PPAs between two individuals using a spatial index
+    :param ellipses_list_id1: PPAs of individual 1
+    :param ellipses_list_id2: PPAs of individual 2
+    :param candidates: optional index arrays into ellipses_list_id1 and ellipses_list_id2 (e.g. from
+        get_timedelay_candidates); if given, only these pairs are tested
+    :param analytic: if True, test the candidates with ellipses_intersect on the ellipse parameters instead of the
+        shapely predicates on the 100-vertex polygons
+    :param tolerance: if not None, test the polygons with as many vertices as needed to be within this distance of
+        the ellipses (see vertex_count) instead of the 100-vertex polygons; ignored with analytic
+    :return: index arrays into ellipses_list_id1 and ellipses_list_id2, ordered by the first then the second index
+    """
+    if not ellipses_list_id1 or not ellipses_list_id2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    params1 = ellipse_parameters(ellipses_list_id1)
+    params2 = ellipse_parameters(ellipses_list_id2)
+    bounds1 = ellipse_bounds(*params1)
+    bounds2 = ellipse_bounds(*params2)
+    # broad phase: only PPAs whose envelopes overlap are candidates for the exact test
+    if candidates is None:
+        tree = STRtree(shapely.box(*bounds2.T))
+        index1, index2 = tree.query(shapely.box(*bounds1.T))
+    else:
+        index1, index2 = candidates
+        b1, b2 = bounds1[index1], bounds2[index2]
+        overlap = ((b1[:, 0] <= b2[:, 2]) & (b2[:, 0] <= b1[:, 2]) & (b1[:, 1] <= b2[:, 3]) & (b2[:, 1] <= b1[:, 3]))
+        index1, index2 = index1[overlap], index2[overlap]
+    order = np.lexsort((index2, index1))
+    index1, index2 = index1[order], index2[order]
+
+    if analytic:
+        intersect = ellipses_intersect(*[p[index1] for p in params1], *[p[index2] for p in params2])
+    else:
+        # the polygons of the PPAs of the candidate pairs are built once per PPA and all at once; two polygons
+        # intersect if their boundaries intersect or one is within the other, as in __check_spatial_intersect
+        unique1, inverse1 = np.unique(index1, return_inverse=True)
+        unique2, inverse2 = np.unique(index2, return_inverse=True)
+        polygons1 = ellipse_polygons(*[p[unique1] for p in params1], tolerance=tolerance)
+        polygons2 = ellipse_polygons(*[p[unique2] for p in params2], tolerance=tolerance)
+        intersect = shapely.intersects(polygons1[inverse1], polygons2[inverse2])
+    return index1[intersect], index2[intersect]
+
+
+def get_spatial_intersect_pairs(
+        ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse], brute_force: bool = False,
+        candidates: Tuple[np.ndarray, np.ndarray] = None, analytic: bool = False, tolerance: float = None,
         ) -> List[Tuple[Ellipse, Ellipse]]:
+    """
+    Find all pairs of spatially intersecting PPAs between two individuals
+    :param ellipses_list_id1: PPAs of individual 1
+    :param ellipses_list_id2: PPAs of individual 2
+    :param brute_force: if True, test every PPA of id1 against every PPA of id2 with __check_spatial_intersect instead
+        of using a spatial index; only useful to validate the indexed results
+    :param candidates: optional index arrays into ellipses_list_id1 and ellipses_list_id2 (e.g. from
+        get_timedelay_candidates); if given, only these pairs are tested
+    :param analytic: if True, test the candidates with ellipses_intersect on the ellipse parameters instead of the
+        shapely predicates on the 100-vertex polygons
+    :param tolerance: if not None, test the polygons with as many vertices as needed to be within this distance of
+        the ellipses (see vertex_count) instead of the 100-vertex polygons; ignored with analytic
+    :return: list of intersecting pairs ordered by their position in ellipses_list_id1 then ellipses_list_id2
+    """
     intersection_pairs = []
-    # [Aug 22, 2023 Rongxiang:] this step can be improved; maybe swap with temporal intersect
-    for count, item in enumerate(ellipses_list_id1, 1):
-        # spatial intersect
-        for item2 in ellipses_list_id2:
-            if __check_spatial_intersect(item, item2):
-                intersection_pairs.append((item, item2))
-    return intersection_pairs
+    if brute_force:
+        for count, item in enumerate(ellipses_list_id1, 1):
+            # spatial intersect
+            for item2 in ellipses_list_id2:
+                if __check_spatial_intersect(item, item2):
+                    intersection_pairs.append((item, item2))
+        return intersection_pairs
+
+    index1, index2 = get_spatial_intersect_index(ellipses_list_id1, ellipses_list_id2, candidates, analytic,
+                                                 tolerance)
+    return list(zip(ellipse_items(ellipses_list_id1, index1), ellipse_items(ellipses_list_id2, index2)))
+
+
+def get_timedelay_candidates(ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse],
+                             interaction_min_delay: float, interaction_max_delay: float
+                             ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Temporal sweep over the two PPA lists keeping only the pairs whose end times are within the allowable delay,
+    i.e. the pairs get_timedelay_pairs would keep, without building or testing any geometry
+    :param ellipses_list_id1: PPAs of individual 1
+    :param ellipses_list_id2: PPAs of individual 2
+    :param interaction_min_delay: allowable minimum delay, in minute
+    :param interaction_max_delay: allowable maximum delay, in minute
+    :return: index arrays into ellipses_list_id1 and ellipses_list_id2, ordered by the first then the second index
+    """
+    _, t1 = ellipse_times(ellipses_list_id1)
+    _, t2 = ellipse_times(ellipses_list_id2)
+    order2 = np.argsort(t2, kind="stable")
+    t2_sorted = t2[order2]
+    min_ns = int(math.floor(interaction_min_delay * 60 * 1e9))
+    max_ns = int(math.ceil(interaction_max_delay * 60 * 1e9))
+
+    # two windows around each end time of id1: [t - max, t - min] before and [t + min, t + max] after
+    lo_before = np.searchsorted(t2_sorted, t1 - max_ns, side="left")
+    hi_before = np.searchsorted(t2_sorted, t1 - min_ns, side="right")
+    lo_after = np.maximum(np.searchsorted(t2_sorted, t1 + min_ns, side="left"), hi_before)
+    hi_after = np.maximum(np.searchsorted(t2_sorted, t1 + max_ns, side="right"), lo_after)
+    lo = np.concatenate([lo_before, lo_after])
+    hi = np.concatenate([hi_before, hi_after])
+
+    counts = hi - lo
+    index1 = np.repeat(np.tile(np.arange(t1.size), 2), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    index2 = order2[np.repeat(lo, counts) + offsets]
+
+    # exact delay check on the candidates, as in get_timedelay_pairs
+    keep = timedelay_mask(t1[index1], t2[index2], interaction_min_delay, interaction_max_delay)
+    index1, index2 = index1[keep], index2[keep]
+    order = np.lexsort((index2, index1))
+    return index1[order], index2[order]
 
 
 def get_timedelay_pairs(intersection_df: List[Tuple[Ellipse, Ellipse]],
                         interaction_min_delay: float, interaction_max_delay: float):
-    intersection_pair = []
-    for pair in intersection_df:
-        if (__timedifcheck(pair[0].t1, pair[1].t1) >= interaction_min_delay * 60) & (
-                __timedifcheck(pair[0].t1, pair[1].t1) <= interaction_max_delay * 60):
-            intersection_pair.append(pair)
-    return intersection_pair
+    """
+    Keep the pairs of PPAs whose end times are within the allowable delay
+    :param intersection_df: list of pairs of PPAs
+    :param interaction_min_delay: allowable minimum delay, in minute
+    :param interaction_max_delay: allowable maximum delay, in minute
+    :return: list of pairs of PPAs
+    """
+    _, t1 = ellipse_times([pair[0] for pair in intersection_df])
+    _, t2 = ellipse_times([pair[1] for pair in intersection_df])
+    keep = timedelay_mask(t1, t2, interaction_min_delay, interaction_max_delay)
+    return [pair for pair, k in zip(intersection_df, keep.tolist()) if k]
 
 
-def intersect_ellipse_todataframe(intersection_df: List[Tuple[Ellipse, Ellipse]], attrs_fields: List[str]):
+def intersection_table(table1: Dict[str, np.ndarray], table2: Dict[str, np.ndarray], index1: np.ndarray,
+                       index2: np.ndarray, attrs_fields: List[str] = None) -> pd.DataFrame:
     """
+    Build the dataframe of intersecting PPA pairs by gathering rows of the columnar PPA tables of the two individuals
+    :param table1: PPA table of individual 1 (from ellipse_table)
+    :param table2: PPA table of individual 2 (from ellipse_table)
+    :param index1: row of table1 of each pair
+    :param index2: row of table2 of each pair
+    :param attrs_fields: attribute fields stored with the PPAs, if any
+    :return: dataframe with one row per pair
+    """
+    names = {
+        "pid": "p{num}",
+        "t0": "p{num}_t_start",
+        "t1": "p{num}_t_end",
+        "last_lat": "p{num}_startlat",
+        "last_lon": "p{num}_startlon",
+        "lat": "p{num}_endlat",
+        "lon": "p{num}_endlon",
+        "speed": "p{num}_speed",
+        "direction": "p{num}_direction",
+    }
+    if attrs_fields is not None:
+        # positions of the two points of the PPAs in the attribute tables, see ORTEGAResults.attach_attributes
+        names.update({"last_row": "p{num}_start_row", "row": "p{num}_end_row"})
+    columns = {}
+    for num, table, index in [(1, table1, index1), (2, table2, index2)]:
+        for key, name in names.items():
+            values = table[key][index]
+            if key in ("t0", "t1"):
+                values = pd.to_datetime(values)
+            columns[name.format(num=num)] = values
+    return pd.DataFrame(columns)
+
 
+def intersect_ellipse_todataframe(intersection_df: List[Tuple[Ellipse, Ellipse]], attrs_fields: List[str]):
+    """
+    Build the dataframe of a list of intersecting PPA pairs
     :param attrs_fields:
     :param intersection_df:
     :return:
     """
+    index = np.arange(len(intersection_df))
+    return intersection_table(ellipse_table([pair[0] for pair in intersection_df]),
+                              ellipse_table([pair[1] for pair in intersection_df]),
+                              index, index, attrs_fields)
+
+
+def segment_starts(df: pd.DataFrame) -> np.ndarray:
+    """
+    Find the pairs that start a new segment of id1 in check_continuous: a pair continues the previous segment if both
+    its PPAs are the same as or follow the PPAs of the previous pair
+    :param df: dataframe of intersecting PPA pairs with the columns p1_t_start, p1_t_end, p2_t_start and p2_t_end
+    :return: np.ndarray of bool, True for the first pair of each segment
+    """
+    if df.shape[0] == 0:
+        return np.zeros(0, dtype=bool)
+    p1s, p1e, p2s, p2e = (to_epoch_ns(df[column].to_numpy())
+                          for column in ['p1_t_start', 'p1_t_end', 'p2_t_start', 'p2_t_end'])
+    p1_continued = (p1s[1:] == p1s[:-1]) | (p1e[:-1] == p1s[1:])
+    p2_continued = (p2s[1:] == p2s[:-1]) | (p2e[:-1] == p2s[1:]) | (p2s[:-1] == p2e[1:])
+    return np.r_[True, ~(p1_continued & p2_continued)]
 
-    def columns_names(e: Ellipse, num: int):
-        as_dict = e.to_dict()
-
-        if attrs_fields is not None:
-            return {
-                f"p{num}": as_dict["pid"],
-                f"p{num}_t_start": as_dict["t0"],
-                f"p{num}_t_end": as_dict["t1"],
-                f"p{num}_startlat": as_dict["last_lat"],
-                f"p{num}_startlon": as_dict["last_lon"],
-                f"p{num}_endlat": as_dict["lat"],
-                f"p{num}_endlon": as_dict["lon"],
-                f"p{num}_speed": as_dict["speed"],
-                f"p{num}_direction": as_dict["direction"],
-                f"p{num}_start_attrs": as_dict["last_attrs"],
-                f"p{num}_end_attrs": as_dict["attrs"]
-            }
-        else:
-            return {
-                f"p{num}": as_dict["pid"],
-                f"p{num}_t_start": as_dict["t0"],
-                f"p{num}_t_end": as_dict["t1"],
-                f"p{num}_startlat": as_dict["last_lat"],
-                f"p{num}_startlon": as_dict["last_lon"],
-                f"p{num}_endlat": as_dict["lat"],
-                f"p{num}_endlon": as_dict["lon"],
-                f"p{num}_speed": as_dict["speed"],
-                f"p{num}_direction": as_dict["direction"]
-            }
-
-    return pd.DataFrame(
-        [
-            {**columns_names(item, 1), **columns_names(item2, 2)}
-            for item, item2 in intersection_df
-        ]
-    )
 
 
+def last_segment_start(df: pd.DataFrame, stop: int) -> int:
+    """
+    Find the first pair of the segment of id1 (see segment_starts) containing the pair before stop, reading back
+    from stop in growing windows so that only about the last segment is compared
+    :param df: dataframe of intersecting PPA pairs with the columns p1_t_start, p1_t_end, p2_t_start and p2_t_end
+    :param stop: position of the pair following the segment; 0 for none
+    :return: position of the first pair of the segment, 0 if stop is 0
+    """
+    size = 64
+    while stop > 0:
+        start = max(stop - size, 0)
+        starts = np.flatnonzero(segment_starts(df.iloc[start:stop]))
+        # the first pair of a window always starts a segment, but only the first pair of df is known to start one
+        if start == 0 or starts[-1] > 0:
+            return start + int(starts[-1])
+        size *= 2
+    return 0
+
 def check_continuous(df: pd.DataFrame, id1: int, id2: int):
-    p1start = df['p1_t_start'].tolist()
-    p1end = df['p1_t_end'].tolist()
-    p2start = df['p2_t_start'].tolist()
-    p2end = df['p2_t_end'].tolist()
-    p1_start_time, p1_end_time, p2_start_time, p2_end_time = [], [], [], []
-    p1_start_index, p1_end_index = [], []
-    p1_start_time.append(p1start[0])
-    p1_start_index.append(0)
-    for i in range(1, len(p1start)):
-        if datetime.strptime(str(p1start[i]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p1start[i - 1]),
-                                                                                        '%Y-%m-%d %H:%M:%S'):
-            if datetime.strptime(str(p2start[i]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p2start[i - 1]),
-                                                                                            '%Y-%m-%d %H:%M:%S'):
-                continue
-            elif datetime.strptime(str(p2end[i - 1]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(
-                    str(p2start[i]),'%Y-%m-%d %H:%M:%S') or datetime.strptime(
-                    str(p2start[i - 1]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p2end[i]), '%Y-%m-%d %H:%M:%S'):
-                continue
-            else:
-                p1_end_time.append(p1end[i - 1])
-                p1_end_index.append(i - 1)
-                p1_start_time.append(p1start[i])
-                p1_start_index.append(i)
-        elif datetime.strptime(str(p1end[i - 1]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p1start[i]),
-                                                                                        '%Y-%m-%d %H:%M:%S'):
-            if datetime.strptime(str(p2start[i]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p2start[i - 1]),
-                                                                                            '%Y-%m-%d %H:%M:%S'):
-                continue
-            elif datetime.strptime(str(p2end[i - 1]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(
-                    str(p2start[i]), '%Y-%m-%d %H:%M:%S') or datetime.strptime(
-                    str(p2start[i - 1]), '%Y-%m-%d %H:%M:%S') == datetime.strptime(str(p2end[i]), '%Y-%m-%d %H:%M:%S'):
-                continue
-            else:
-                p1_end_time.append(p1end[i - 1])
-                p1_end_index.append(i - 1)
-                p1_start_time.append(p1start[i])
-                p1_start_index.append(i)
-        else:
-            p1_end_time.append(p1end[i - 1])
-            p1_end_index.append(i - 1)
-            p1_start_time.append(p1start[i])
-            p1_start_index.append(i)
-    p1_end_time.append(p1end[len(p1end) - 1])
-    p1_end_index.append(len(p1end) - 1)
-    
-    p2_start_pool, p2_end_pool = [], []
-    p2_start_pool_list, p2_end_pool_list = [], []
-    
-    i = 0
-    for j in p1_end_index:
-        while i <= j:
-            p2_start_pool.append(p2start[i])
-            p2_end_pool.append(p2end[i])
-            i += 1
-        p2_start_pool.sort()
-        p2_end_pool.sort()
-        p2_start_pool_list.append(p2_start_pool)
-        p2_end_pool_list.append(p2_end_pool)
-        p2_start_pool, p2_end_pool = [], []
-
-    p2_start_time_list, p2_end_time_list = [], []
-    for k in range(0, len(p2_start_pool_list)):
-        p2_start_time.append((p2_start_pool_list[k])[0])
-        for m in range(1, len(p2_start_pool_list[k])):
-            if datetime.strptime(str((p2_start_pool_list[k])[m]), '%Y-%m-%d %H:%M:%S') \
-                    == datetime.strptime(str((p2_start_pool_list[k])[m - 1]), '%Y-%m-%d %H:%M:%S'):
-                continue
-            elif datetime.strptime(str((p2_end_pool_list[k])[m - 1]), '%Y-%m-%d %H:%M:%S') \
-                    == datetime.strptime(str((p2_start_pool_list[k])[m]), '%Y-%m-%d %H:%M:%S'):
-                continue
-            else:
-                p2_end_time.append((p2_end_pool_list[k])[m - 1])
-                p2_start_time.append((p2_start_pool_list[k])[m])
-        p2_end_time.append((p2_end_pool_list[k])[len((p2_end_pool_list[k])) - 1])
-        p2_start_time_list.append(p2_start_time)
-        p2_end_time_list.append(p2_end_time)
-        p2_start_time = []
-        p2_end_time = []
-
-    p1_start_column, p1_end_column, p2_start_column, p2_end_column = [], [], [], []
-    for i in range(0, len(p2_start_time_list)):
-        for j in range(0, len(p2_start_time_list[i])):
-            p1_start_column.append(p1_start_time[i])
-            p1_end_column.append(p1_end_time[i])
-            p2_start_column.append((p2_start_time_list[i])[j])
-            p2_end_column.append((p2_end_time_list[i])[j])
-
-    d = {'p1_start': p1_start_column, 'p1_end': p1_end_column,
-         'p2_start': p2_start_column, 'p2_end': p2_end_column}
-    df_new = pd.DataFrame(d)
-    diff_list = []
-    for i in range(0, len(p1_start_column)):
-        diff = pd.Timedelta(p2_start_column[i] - p1_start_column[i]).total_seconds()/60
-        diff_list.append(diff)
-    df_new['difference'] = diff_list
+    """
+    Group the intersecting PPA pairs into continuous interaction events. Consecutive pairs (in the order of
+    df_all_intersection_pairs) belong to the same segment of id1 when their id1 PPAs are the same or follow each other
+    and their id2 PPAs are the same or follow each other; within each segment of id1, the id2 PPAs (start and end
+    times sorted) are merged into segments of id2 the same way. Each pair of segments is one event.
+    :param df: dataframe of intersecting PPA pairs with the columns p1_t_start, p1_t_end, p2_t_start and p2_t_end
+    :param id1: id of the first individual
+    :param id2: id of the second individual
+    :return: dataframe of interaction events with the columns p1, p2, p1_start, p1_end, p2_start, p2_end and
+        difference (delay from p1_start to p2_start, in minute)
+    """
+    columns = ['p1', 'p2', 'p1_start', 'p1_end', 'p2_start', 'p2_end', 'difference']
+    if df.shape[0] == 0:
+        return pd.DataFrame(columns=columns)
+    p1start, p1end = df['p1_t_start'].to_numpy(), df['p1_t_end'].to_numpy()
+    p2start, p2end = df['p2_t_start'].to_numpy(), df['p2_t_end'].to_numpy()
+    p1s, p1e, p2s, p2e = (to_epoch_ns(t) for t in [p1start, p1end, p2start, p2end])
+
+    # segments of id1: a pair continues the previous segment if both its PPAs continue the previous pair's PPAs
+    p1_new = segment_starts(df)
+    p1_group = np.cumsum(p1_new) - 1
+    p1_start_index = np.flatnonzero(p1_new)
+    p1_end_index = np.r_[p1_start_index[1:] - 1, p1s.size - 1]
+
+    # segments of id2 within each segment of id1, from the sorted start times and the sorted end times of id2 PPAs
+    start_order = np.lexsort((p2s, p1_group))
+    end_order = np.lexsort((p2e, p1_group))
+    pool_start, pool_end = p2s[start_order], p2e[end_order]
+    p2_new = np.r_[True, (p1_group[1:] != p1_group[:-1])
+                   | ~((pool_start[1:] == pool_start[:-1]) | (pool_end[:-1] == pool_start[1:]))]
+    p2_start_index = np.flatnonzero(p2_new)
+    p2_end_index = np.r_[p2_start_index[1:] - 1, p2s.size - 1]
+    event_group = p1_group[p2_start_index]
+
+    df_new = pd.DataFrame({
+        'p1_start': p1start[p1_start_index[event_group]],
+        'p1_end': p1end[p1_end_index[event_group]],
+        'p2_start': p2start[start_order[p2_start_index]],
+        'p2_end': p2end[end_order[p2_end_index]],
+    })
+    df_new['difference'] = (pool_start[p2_start_index] - p1s[p1_start_index[event_group]]) / 1e9 / 60
     df_new['p1'] = id1
     df_new['p2'] = id2
-    return df_new[['p1', 'p2', 'p1_start', 'p1_end', 'p2_start', 'p2_end', 'difference']]
+    return df_new[columns]
 
 
 def interaction_compute_speed_diff(df: pd.DataFrame):
@@ -212,8 +312,7 @@ def interaction_compute_direction_diff(df: pd.DataFrame):
     :param df:
     :return:
     """
-    df['diff_direction'] = df['p2_direction'] - df['p1_direction']
-    df['diff_direction'] = df['diff_direction'].apply(math.cos)
+    df['diff_direction'] = np.cos(df['p2_direction'] - df['p1_direction'])
     return df
 
 
@@ -227,40 +326,235 @@ def interaction_compute_time_diff(df: pd.DataFrame):
     return df
 
 
-class ORTEGA:
-    # ORTEGA is the main class for interaction analysis, users need to initialize this object at the very beginning
-    def __init__(
-            self,
-            data: pd.DataFrame,  # movement data of two entities
-            minute_min_delay: float = 0,  # allowable minimum delay for intersecting PPAs, in minute
-            minute_max_delay: float = None,  # allowable maximum delay for intersecting PPAs, in minute
-            start_time: str = None,  # use this when users want to select a segment of movement data
-            end_time: str = None,  # use this when users want to select a segment of movement data
-            max_el_time_min: float = 10000,  # PPA's interval greater than this value will be eliminated, in minute
-            latitude_field: str = "latitude",  # specify the latitude field name
-            longitude_field: str = "longitude",  # specify the longitude field name
-            id_field: str = "pid",  # specify the id field name
-            time_field: str = "time_local",  # time_field must include month, day, year, hour, minute, second
-            speed_average: bool = False,
-            attr_fields: List[str] = None
-            # kernel: List[int] = None,  # define a kernel for averaging speed when creating PPA (e.g., [1, 1, 2, 5])
-    ):
-        self.data = data
-        self.start_time = start_time
-        self.end_time = end_time
-        self.latitude_field = latitude_field
-        self.longitude_field = longitude_field
-        self.id_field = id_field
-        self.time_field = time_field
-        self.attr_fields = attr_fields
-        self.minute_min_delay = minute_min_delay
-        self.minute_max_delay = minute_max_delay
-        self.max_el_time_min = max_el_time_min
-        self.speed_average = speed_average
-        # self.kernel = kernel
-        self.__validate()
-        self.__start()
+def get_intersection_index(
+        ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse], minute_min_delay: float,
+        minute_max_delay: float, brute_force: bool = False, analytic: bool = False, recorder: Recorder = None,
+        tolerance: float = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the pairs of PPAs of two individuals that intersect in space within the allowable delay
+    :param ellipses_list_id1: PPAs of individual id1
+    :param ellipses_list_id2: PPAs of individual id2
+    :param minute_min_delay: allowable minimum delay for intersecting PPAs, in minute
+    :param minute_max_delay: allowable maximum delay for intersecting PPAs, in minute
+    :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+    :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+    :param recorder: records the metrics of the delay filtering and spatial pairing stages
+    :param tolerance: if not None, test the polygons with as many vertices as needed to be within this distance of
+        the ellipses (see vertex_count) instead of the 100-vertex polygons; ignored with analytic
+    :return: index arrays into ellipses_list_id1 and ellipses_list_id2, ordered by the first then the second index
+    """
+    recorder = recorder if recorder is not None else Recorder()
+    if brute_force:
+        with recorder.stage("spatial_pairing") as counts:
+            spatial_pairs = get_spatial_intersect_pairs(ellipses_list_id1, ellipses_list_id2, brute_force)
+            counts.update(candidates=len(ellipses_list_id1) * len(ellipses_list_id2), pairs=len(spatial_pairs))
+        with recorder.stage("delay_filtering") as counts:
+            pairs = get_timedelay_pairs(spatial_pairs, minute_min_delay, minute_max_delay)
+            counts.update(candidates=len(spatial_pairs), pairs=len(pairs))
+        position1 = {id(e): k for k, e in enumerate(ellipses_list_id1)}
+        position2 = {id(e): k for k, e in enumerate(ellipses_list_id2)}
+        return (np.array([position1[id(pair[0])] for pair in pairs], dtype=np.intp),
+                np.array([position2[id(pair[1])] for pair in pairs], dtype=np.intp))
+    # temporal sweep first so that only the pairs within the allowable delay are tested spatially
+    with recorder.stage("delay_filtering") as counts:
+        candidates = get_timedelay_candidates(ellipses_list_id1, ellipses_list_id2, minute_min_delay,
+                                              minute_max_delay)
+        counts.update(ppas=len(ellipses_list_id1) + len(ellipses_list_id2), candidates=len(candidates[0]))
+    with recorder.stage("spatial_pairing") as counts:
+        index1, index2 = get_spatial_intersect_index(ellipses_list_id1, ellipses_list_id2, candidates, analytic,
+                                                     tolerance)
+        counts.update(candidates=len(candidates[0]), pairs=len(index1))
+    return index1, index2
+
+
+def interaction_results(ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse], index1: np.ndarray,
+                        index2: np.ndarray, id1: Any, id2: Any, attr_fields: List[str] = None,
+                        recorder: Recorder = None) -> Union[ORTEGAResults, None]:
+    """
+    Compute the attributes of the intersecting PPA pairs and the continuous interaction events they form
+    :param ellipses_list_id1: PPAs of individual id1
+    :param ellipses_list_id2: PPAs of individual id2
+    :param index1: index into ellipses_list_id1 of each intersecting pair, e.g. from get_intersection_index
+    :param index2: index into ellipses_list_id2 of each intersecting pair
+    :param id1: id of the first individual
+    :param id2: id of the second individual
+    :param attr_fields: attribute fields stored with the PPAs, if any
+    :param recorder: records the progress and the metrics of the stages; its metrics are attached to the results
+    :return: ORTEGAResults, or None if no interaction is found
+    """
+    recorder = recorder if recorder is not None else Recorder()
+    if len(index1) == 0:
+        recorder.message('Complete! No interaction found!')
+        return None
+    else:
+        results = ORTEGAResults(recorder=recorder)
+        results.set_intersection_ellipse_pair(list(zip(ellipse_items(ellipses_list_id1, index1),
+                                                       ellipse_items(ellipses_list_id2, index2))))
+        recorder.message(f'Complete! {len(index1)} pairs of intersecting PPAs found!')
+
+        # gather the intersecting pairs from the PPA tables of the two individuals - df_all_intersection_pairs
+        with recorder.stage("pair_table") as counts:
+            df_all_intersection_pairs = intersection_table(ellipse_table(ellipses_list_id1),
+                                                           ellipse_table(ellipses_list_id2), index1, index2,
+                                                           attr_fields)
+            df_all_intersection_pairs = interaction_compute_speed_diff(df_all_intersection_pairs)
+            df_all_intersection_pairs = interaction_compute_direction_diff(df_all_intersection_pairs)
+            df_all_intersection_pairs = interaction_compute_time_diff(df_all_intersection_pairs)
+            counts.update(pairs=len(df_all_intersection_pairs))
+        results.set_df_all_intersection_pairs(df_all_intersection_pairs)
+
+        # compute duration of interaction and output as a dataframe - df_duration
+        recorder.message('Compute continuous interaction events...')
+        with recorder.stage("check_continuous") as counts:
+            df_continues = check_continuous(df_all_intersection_pairs, id1, id2)
+            counts.update(pairs=len(df_all_intersection_pairs), events=len(df_continues))
+        recorder.message(f'Complete! {df_continues.shape[0]} continuous interaction events identified!')
+        if df_continues.shape[0] != 0:
+            results.set_df_interaction_events(df_continues)
+            return results
+        else:
+            return None
+
+
+def pair_interaction_analysis(
+        ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse], id1: Any, id2: Any,
+        minute_min_delay: float, minute_max_delay: float, attr_fields: List[str] = None,
+        brute_force: bool = False, analytic: bool = False, recorder: Recorder = None, tolerance: float = None,
+) -> Union[ORTEGAResults, None]:
+    """
+    Identify intersecting PPAs of two individuals and the continuous interaction events they form
+    :param ellipses_list_id1: PPAs of individual id1
+    :param ellipses_list_id2: PPAs of individual id2
+    :param id1: id of the first individual
+    :param id2: id of the second individual
+    :param minute_min_delay: allowable minimum delay for intersecting PPAs, in minute
+    :param minute_max_delay: allowable maximum delay for intersecting PPAs, in minute
+    :param attr_fields: attribute fields stored with the PPAs, if any
+    :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+    :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+    :param recorder: records the progress and the metrics of the stages; its metrics are attached to the results
+    :param tolerance: if not None, test the polygons with as many vertices as needed to be within this distance of
+        the ellipses (see vertex_count) instead of the 100-vertex polygons; ignored with analytic
+    :return: ORTEGAResults, or None if no interaction is found
+    """
+    index1, index2 = get_intersection_index(ellipses_list_id1, ellipses_list_id2, minute_min_delay,
+                                            minute_max_delay, brute_force, analytic, recorder, tolerance)
+    return interaction_results(ellipses_list_id1, ellipses_list_id2, index1, index2, id1, id2, attr_fields,
+                               recorder)
 
+
+def ppa_summary(metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Descriptive statistics of the PPA metrics of each individual
+    :param metrics: dataframe from ellipse_metrics
+    :return: dataframe indexed by (pid, metric) for the metrics 'interval', 'speed', 'area' and 'perimeter', with the
+        columns of pd.Series.describe
+    """
+    columns = ["interval", "speed", "area", "perimeter"]
+    if metrics.empty:
+        return metrics[columns].describe().T.iloc[:0]
+    return pd.concat({pid: df[columns].describe().T for pid, df in metrics.groupby("pid", sort=False)},
+                     names=["pid", "metric"])
+
+
+def delay_sweep(
+        ellipses_list_id1: List[Ellipse], ellipses_list_id2: List[Ellipse], id1: Any, id2: Any,
+        windows: List[Tuple[float, float]], attr_fields: List[str] = None, analytic: bool = False,
+        recorder: Recorder = None, tolerance: float = None,
+) -> Tuple[pd.DataFrame, Dict[Tuple[float, float], Union[ORTEGAResults, None]]]:
+    """
+    Interaction analysis of two individuals for several delay windows at the cost of about one run: the intersecting
+    PPA pairs are found once for the widest window, then each window only masks the pairs by their delay and groups
+    the remaining pairs into interaction events
+    :param ellipses_list_id1: PPAs of individual id1
+    :param ellipses_list_id2: PPAs of individual id2
+    :param id1: id of the first individual
+    :param id2: id of the second individual
+    :param windows: list of (minute_min_delay, minute_max_delay)
+    :param attr_fields: attribute fields stored with the PPAs, if any
+    :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+    :param recorder: records the progress and the metrics of the stages; its metrics are attached to the results
+    :param tolerance: if not None, test the polygons with as many vertices as needed to be within this distance of
+        the ellipses (see vertex_count) instead of the 100-vertex polygons; ignored with analytic
+    :return: dataframe with one row per window (columns 'minute_min_delay', 'minute_max_delay', 'pairs', 'events'
+        and 'duration', the total duration of the events in minute), and the ORTEGAResults of each window (None if
+        no interaction is found), the same as the ones of pair_interaction_analysis with the window
+    """
+    windows = [tuple(window) for window in windows]
+    if not windows:
+        raise ValueError("Parameter 'windows' must contain at least one (minute_min_delay, minute_max_delay)!")
+    for minute_min_delay, minute_max_delay in windows:
+        if minute_min_delay < 0 or minute_max_delay < minute_min_delay:
+            raise ValueError(f"Invalid delay window ({minute_min_delay}, {minute_max_delay})! Delays must be "
+                             f"positive and 'minute_max_delay' must be greater than 'minute_min_delay'.")
+    recorder = recorder if recorder is not None else Recorder()
+    index1, index2 = get_intersection_index(ellipses_list_id1, ellipses_list_id2,
+                                            min(window[0] for window in windows),
+                                            max(window[1] for window in windows), analytic=analytic,
+                                            recorder=recorder, tolerance=tolerance)
+    recorder.message(f'{len(index1)} pairs of intersecting PPAs found for the widest delay window!')
+
+    # the pair table of the widest window, sliced by each window below
+    with recorder.stage("pair_table") as counts:
+        table1, table2 = ellipse_table(ellipses_list_id1), ellipse_table(ellipses_list_id2)
+        df_pairs = intersection_table(table1, table2, index1, index2, attr_fields)
+        df_pairs = interaction_compute_speed_diff(df_pairs)
+        df_pairs = interaction_compute_direction_diff(df_pairs)
+        df_pairs = interaction_compute_time_diff(df_pairs)
+        counts.update(pairs=len(df_pairs))
+    t1, t2 = table1["t1"][index1], table2["t1"][index2]
+
+    rows = []
+    results = {}
+    with recorder.stage("delay_sweep") as counts:
+        for window in windows:
+            keep = np.flatnonzero(timedelay_mask(t1, t2, *window))
+            df_window = df_pairs.iloc[keep].reset_index(drop=True)
+            df_events = check_continuous(df_window, id1, id2)
+            duration = 0.0
+            if len(df_events) != 0:
+                # as ORTEGAResults.compute_interaction_duration
+                duration = (df_events[["p1_end", "p2_end"]].max(axis=1) -
+                            df_events[["p1_start", "p2_start"]].min(axis=1)).dt.total_seconds().div(60).sum()
+            rows.append({"minute_min_delay": window[0], "minute_max_delay": window[1], "pairs": len(df_window),
+                         "events": len(df_events), "duration": duration})
+            results[window] = None
+            if len(df_events) != 0:
+                results[window] = ORTEGAResults(
+                    list(zip(ellipse_items(ellipses_list_id1, index1[keep]),
+                             ellipse_items(ellipses_list_id2, index2[keep]))),
+                    df_window, df_events, recorder=recorder)
+        counts.update(windows=len(windows), pairs=len(df_pairs), events=sum(row["events"] for row in rows))
+    recorder.message(f'Complete! {len(windows)} delay windows analyzed!')
+    return pd.DataFrame(rows, columns=["minute_min_delay", "minute_max_delay", "pairs", "events", "duration"]), \
+        results
+
+
+def check_time_lag_and_overlap(start1: pd.Timestamp, end1: pd.Timestamp, start2: pd.Timestamp, end2: pd.Timestamp,
+                               minute_max_delay: float) -> bool:
+    """
+    Author: Yifei Liu
+    Check time overlap and time lag between the movements of two individuals given their first and last timestamps.
+    Returns a boolean value indicating whether the time lag is less than or equal to the allowable maximum delay (True) or not (False).
+    """
+    # Calculate the time overlap
+    overlap_start = max(start1, start2)
+    overlap_end = min(end1, end2)
+    overlap_duration = (overlap_end - overlap_start).total_seconds() / 60
+
+    # Check if there is no overlap
+    if overlap_duration <= 0:
+        # Calculate the time lag
+        time_lag = abs((start2 - end1).total_seconds() / 60) if end1 < start2 else abs((start1 - end2).total_seconds() / 60)
+        # Check if time lag is greater than the max delay
+        if time_lag > minute_max_delay:
+            return False
+    return True
+
+
+class ORTEGAParameters:
+    # shared input parameters (with validation) of the interaction analysis classes ORTEGA and ORTEGAGroup
     @property
     def minute_min_delay(self):
         return self._minute_min_delay
@@ -319,7 +613,7 @@ class ORTEGA:
     def latitude_field(self, value):
         if not isinstance(value, str):
             raise TypeError("Parameter 'latitude_field' must be a string!")
-        if value not in self.data.columns:
+        if self.data is not None and value not in self.data.columns:
             raise KeyError("Column 'latitude_field' does not exist!")
         self._latitude_field = value
 
@@ -331,7 +625,7 @@ class ORTEGA:
     def longitude_field(self, value):
         if not isinstance(value, str):
             raise TypeError("Parameter 'longitude_field' must be a string!")
-        if value not in self.data.columns:
+        if self.data is not None and value not in self.data.columns:
             raise KeyError("Column 'longitude_field' does not exist!")
         self._longitude_field = value
 
@@ -343,7 +637,7 @@ class ORTEGA:
     def id_field(self, value):
         if not isinstance(value, str):
             raise TypeError("Parameter 'id_field' must be a string!")
-        if value not in self.data.columns:
+        if self.data is not None and value not in self.data.columns:
             raise KeyError("Column 'id_field' does not exist!")
         self._id_field = value
 
@@ -355,10 +649,68 @@ class ORTEGA:
     def time_field(self, value):
         if not isinstance(value, str):
             raise TypeError("Parameter 'time_field' must be a string!")
-        if value not in self.data.columns:
+        if self.data is not None and value not in self.data.columns:
             raise KeyError("Column 'time_field' does not exist!")
         self._time_field = value
 
+    @property
+    def crs(self):
+        return self._crs
+
+    @crs.setter
+    def crs(self, value):
+        if value is not None and not (isinstance(value, str) and value == "auto"):
+            try:
+                crs = CRS.from_user_input(value)
+            except Exception:
+                raise ValueError("Parameter 'crs' must be None, 'auto' or a CRS accepted by pyproj!")
+            if not crs.is_projected:
+                raise ValueError("Parameter 'crs' must be a projected CRS!")
+        self._crs = value
+
+    @property
+    def instrumentation(self):
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, value):
+        if value is not None and not isinstance(value, Instrumentation):
+            raise TypeError("Parameter 'instrumentation' must be an Instrumentation object (e.g. "
+                            "PrintInstrumentation() or LoggingInstrumentation()) or None!")
+        self._instrumentation = value
+
+    @property
+    def track_memory(self):
+        return self._track_memory
+
+    @track_memory.setter
+    def track_memory(self, value):
+        if not isinstance(value, bool):
+            raise TypeError("Parameter 'track_memory' must be a boolean!")
+        self._track_memory = value
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        if value is not None and not isinstance(value, PPACache):
+            if not isinstance(value, (str, os.PathLike)):
+                raise TypeError("Parameter 'cache' must be a PPACache object, a directory or None!")
+            value = PPACache(value)
+        self._cache = value
+
+    @property
+    def vertex_tolerance(self):
+        return self._vertex_tolerance
+
+    @vertex_tolerance.setter
+    def vertex_tolerance(self, value):
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0):
+            raise ValueError("Parameter 'vertex_tolerance' must be a positive number or None!")
+        self._vertex_tolerance = value
+
     @property
     def start_time(self):
         return self._start_time
@@ -385,6 +737,54 @@ class ORTEGA:
                 raise ValueError("Incorrect 'end_time' format! Please use YYYY-MM-DD HH:MM:SS.")
         self._end_time = value
 
+
+class ORTEGA(ORTEGAParameters):
+    # ORTEGA is the main class for interaction analysis, users need to initialize this object at the very beginning
+    def __init__(
+            self,
+            data: pd.DataFrame,  # movement data of two entities
+            minute_min_delay: float = 0,  # allowable minimum delay for intersecting PPAs, in minute
+            minute_max_delay: float = None,  # allowable maximum delay for intersecting PPAs, in minute
+            start_time: str = None,  # use this when users want to select a segment of movement data
+            end_time: str = None,  # use this when users want to select a segment of movement data
+            max_el_time_min: float = 10000,  # PPA's interval greater than this value will be eliminated, in minute
+            latitude_field: str = "latitude",  # specify the latitude field name
+            longitude_field: str = "longitude",  # specify the longitude field name
+            id_field: str = "pid",  # specify the id field name
+            time_field: str = "time_local",  # time_field must include month, day, year, hour, minute, second
+            speed_average: bool = False,
+            attr_fields: List[str] = None,
+            crs: Any = None,  # 'auto' or a projected CRS to project WGS84 latitude/longitude to before creating PPAs
+            instrumentation: Instrumentation = None,  # receives progress messages and stage metrics; silent if None
+            track_memory: bool = False,  # if True, measure the peak memory of each stage (slower)
+            cache: Union[PPACache, str] = None,  # PPACache or directory to reuse the PPAs computed by previous runs
+            vertex_tolerance: float = None,  # if set, PPA polygons adapt their vertex count to be within this distance
+            # kernel: List[int] = None,  # define a kernel for averaging speed when creating PPA (e.g., [1, 1, 2, 5])
+    ):
+        self.data = data
+        self.start_time = start_time
+        self.end_time = end_time
+        self.latitude_field = latitude_field
+        self.longitude_field = longitude_field
+        self.id_field = id_field
+        self.time_field = time_field
+        self.attr_fields = attr_fields
+        self.minute_min_delay = minute_min_delay
+        self.minute_max_delay = minute_max_delay
+        self.max_el_time_min = max_el_time_min
+        self.speed_average = speed_average
+        self.crs = crs
+        self.instrumentation = instrumentation
+        self.track_memory = track_memory
+        self.cache = cache
+        self.vertex_tolerance = vertex_tolerance
+        # metrics of the stages run by the constructor; each interaction analysis starts from a copy of them
+        self.recorder = Recorder(self.instrumentation, self.track_memory)
+        self.metrics = self.recorder.metrics
+        # self.kernel = kernel
+        self.__validate()
+        self.__start()
+
     def __validate(self):
         """
         validate the input parameters;
@@ -393,7 +793,7 @@ class ORTEGA:
         if self.minute_max_delay < self.minute_min_delay:
             raise ValueError("Parameter 'minute_max_delay' must be greater than 'minute_min_delay'!")
 
-        print(datetime.now(), 'Initializing ORTEGA object...')
+        self.recorder.message('Initializing ORTEGA object...')
         if not is_datetime64_dtype(self.data[self.time_field]):
             raise TypeError("Column 'time_field' is not datetime type! Please use "
                             "pd.to_datetime() to convert it to datetime.")
@@ -403,15 +803,16 @@ class ORTEGA:
             raise ValueError(f'Only two unique id is allowed but {len(id_list)} id are found in the given dataframe!')
         else:
             self.id1, self.id2 = id_list[0], id_list[1]
+            self.recorder.pair = (self.id1, self.id2)
             # split the dataframe according to id and filter by the time window if given
             if self.start_time is not None and self.end_time is None:
                 start_time = datetime.strptime(self.start_time, '%Y-%m-%d %H:%M:%S')
-                self.subset = self.data[[self.data[self.time_field] >= start_time]]
+                self.subset = self.data[self.data[self.time_field] >= start_time]
                 self.df1 = self.subset[self.subset[self.id_field] == self.id1]
                 self.df2 = self.subset[self.subset[self.id_field] == self.id2]
             elif self.start_time is None and self.end_time is not None:
                 end_time = datetime.strptime(self.end_time, '%Y-%m-%d %H:%M:%S')
-                self.subset = self.data[[self.data[self.time_field] <= end_time]]
+                self.subset = self.data[self.data[self.time_field] <= end_time]
                 self.df1 = self.subset[self.subset[self.id_field] == self.id1]
                 self.df2 = self.subset[self.subset[self.id_field] == self.id2]
             elif self.start_time is not None and self.end_time is not None:
@@ -425,6 +826,20 @@ class ORTEGA:
                 self.df1 = self.data[self.data[self.id_field] == self.id1]
                 self.df2 = self.data[self.data[self.id_field] == self.id2]
 
+            # project both tracks once so that PPAs and speeds are in meters; the transformer is kept for append()
+            self.transformer = None
+            self.target_crs = None
+            if self.crs is not None:
+                with self.recorder.stage("projection") as counts:
+                    df = pd.concat([self.df1, self.df2])
+                    self.transformer = get_transformer(self.crs, df[self.longitude_field].to_numpy(),
+                                                       df[self.latitude_field].to_numpy())
+                    self.target_crs = self.transformer.target_crs
+                    self.df1 = project_points(self.df1, self.transformer, self.latitude_field, self.longitude_field)
+                    self.df2 = project_points(self.df2, self.transformer, self.latitude_field, self.longitude_field)
+                    counts.update(points=df.shape[0])
+                self.recorder.message(f'Tracks projected to {self.target_crs.name}!')
+
             # Check if two individuals overlap in time given the allowable time lag; terminate if no overlap found
             if not self.__precheck_time_lag_and_overlap(self.minute_max_delay):
                 raise ValueError(f"Skipping pair {self.id1} and {self.id2} due to time lag greater than {self.minute_max_delay}!")
@@ -440,39 +855,252 @@ class ORTEGA:
         # create all ellipses for two objects
         self.ellipses_list = self.__get_ellipse_list(self.df1, self.df2, self.max_el_time_min, self.speed_average)
 
-        # split ellipses by id
-        self.ellipses_list_id1 = [i for i in self.ellipses_list if i.pid == self.id1]
-        self.ellipses_list_id2 = [i for i in self.ellipses_list if i.pid == self.id2]
-        print(datetime.now(), 'Initialization success!')
+        # the PPAs of each object are kept by their own EllipseList so that they can be extended by append()
+        self.ellipses_list_id1 = self.ellipses_list_gen_id1.list
+        self.ellipses_list_id2 = self.ellipses_list_gen_id2.list
+        # positions of the intersecting PPAs in ellipses_list_id1 and ellipses_list_id2, set by interaction_analysis
+        self.intersection_index: Union[Tuple[np.ndarray, np.ndarray], None] = None
+        self.results: Union[ORTEGAResults, None] = None
+        # results of each delay window of delay_sweep
+        self.sweep_results: Dict[Tuple[float, float], Union[ORTEGAResults, None]] = {}
+        self._ppa_index: Union[EllipseStore, None] = None
+        self.recorder.message('Initialization success!')
 
-    def interaction_analysis(self):
-        spatial_pairs = self.__get_spatial_intersect_pairs()
-        all_intersection_pairs = get_timedelay_pairs(spatial_pairs, self.minute_min_delay, self.minute_max_delay)
-
-        if not all_intersection_pairs:
-            print(datetime.now(), 'Complete! No interaction found!')
-            return None
+    @property
+    def ppa_index(self) -> EllipseStore:
+        # the PPAs of the two individuals as a time-sorted EllipseStore, built once on first use by window_analysis
+        if self._ppa_index is None:
+            self._ppa_index = EllipseStore.from_ellipses({self.id1: self.ellipses_list_id1,
+                                                          self.id2: self.ellipses_list_id2})
+        return self._ppa_index
+
+    def window_analysis(self, start_time: Any = None, end_time: Any = None, brute_force: bool = False,
+                        analytic: bool = False) -> Union[ORTEGAResults, None]:
+        """
+        Interaction analysis of the PPAs within a time window, selected by binary search in ppa_index instead of
+        creating a new ORTEGA object with start_time and end_time, so that many windows can be analyzed quickly; the
+        PPAs are the ones of the whole tracks (with speed_average, the speed average is not restarted at the start
+        of the window)
+        :param start_time: only the PPAs starting at or after this time are used, e.g. '2013-10-01 00:00:00'; None
+            for no limit
+        :param end_time: only the PPAs ending at or before this time are used; None for no limit
+        :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :return: ORTEGAResults, or None if no interaction is found
+        """
+        start = int(to_epoch_ns([start_time])[0]) if start_time is not None else None
+        end = int(to_epoch_ns([end_time])[0]) if end_time is not None else None
+        if start is not None and end is not None and end < start:
+            raise ValueError("Parameter 'end_time' must be later than 'start_time'!")
+        recorder = self.recorder.new_run(self.recorder.metrics.stages)
+        self.metrics = recorder.metrics
+        with recorder.stage("window_selection") as counts:
+            ellipses_list_id1 = self.ppa_index.window(self.id1, start, end)
+            ellipses_list_id2 = self.ppa_index.window(self.id2, start, end)
+            counts.update(ppas=len(ellipses_list_id1) + len(ellipses_list_id2))
+        results = pair_interaction_analysis(ellipses_list_id1, ellipses_list_id2, self.id1, self.id2,
+                                            self.minute_min_delay, self.minute_max_delay, self.attr_fields,
+                                            brute_force, analytic, recorder, self.vertex_tolerance)
+        if results is not None:
+            results.set_attributes(self.__get_attributes())
+            results.set_time_dtype(self.data[self.time_field].dtype)
+        return results
+
+    def interaction_analysis(self, brute_force: bool = False, analytic: bool = False):
+        """
+        Identify intersecting PPAs of the two individuals and the continuous interaction events they form
+        :param brute_force: if True, skip the spatial index and test every pair of PPAs (for validation)
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :return: ORTEGAResults, or None if no interaction is found; its metrics (also kept as self.metrics) hold the
+            wall time and item counts of each stage
+        """
+        recorder = self.recorder.new_run(self.recorder.metrics.stages)
+        self.metrics = recorder.metrics
+        self.intersection_index = get_intersection_index(self.ellipses_list_id1, self.ellipses_list_id2,
+                                                         self.minute_min_delay, self.minute_max_delay,
+                                                         brute_force, analytic, recorder, self.vertex_tolerance)
+        self.results = interaction_results(self.ellipses_list_id1, self.ellipses_list_id2, *self.intersection_index,
+                                           self.id1, self.id2, self.attr_fields, recorder)
+        if self.results is not None:
+            self.results.set_attributes(self.__get_attributes())
+            self.results.set_time_dtype(self.data[self.time_field].dtype)
+        return self.results
+
+    def delay_sweep(self, windows: List[Tuple[float, float]], analytic: bool = False) -> pd.DataFrame:
+        """
+        Interaction analysis for several delay windows (e.g. a sensitivity analysis of the delay), finding the
+        intersecting PPAs only once for the widest window; the results of each window are kept in self.sweep_results
+        :param windows: list of (minute_min_delay, minute_max_delay)
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :return: dataframe with one row per window and the columns 'minute_min_delay', 'minute_max_delay', 'pairs'
+            (number of intersecting PPA pairs), 'events' (number of interaction events) and 'duration' (total
+            duration of the events, in minute)
+        """
+        recorder = self.recorder.new_run(self.recorder.metrics.stages)
+        self.metrics = recorder.metrics
+        summary, self.sweep_results = delay_sweep(self.ellipses_list_id1, self.ellipses_list_id2, self.id1,
+                                                  self.id2, windows, self.attr_fields, analytic, recorder,
+                                                  self.vertex_tolerance)
+        for results in self.sweep_results.values():
+            if results is not None:
+                results.set_attributes(self.__get_attributes())
+                results.set_time_dtype(self.data[self.time_field].dtype)
+            results.set_time_dtype(self.data[self.time_field].dtype)
+        return summary
+
+    def append(self, data: pd.DataFrame, analytic: bool = False):
+        """
+        Add new GPS points of either or both individuals, e.g. the latest upload of a live tracking feed. The PPAs of
+        each individual are extended from its last stored point. If interaction_analysis has been run, only the new
+        PPAs are tested against the PPAs of the other individual within the allowable delay, then the intersection
+        pairs and the continuous interaction events are updated; columns added by compute_interaction_duration or
+        attach_attributes need to be computed again.
+        :param data: new GPS points with the same fields as the initial data; the points of each individual must be
+            later than its last stored point
+        :param analytic: if True, test PPA overlap on the exact ellipses instead of their 100-vertex polygons
+        :return: the updated ORTEGAResults (the object returned by interaction_analysis is updated in place), or None
+            if no interaction is found
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError("Parameter 'data' must be a dataframe!")
+        for field_name in [self.latitude_field, self.longitude_field, self.id_field, self.time_field]:
+            if field_name not in data.columns:
+                raise KeyError(f"Column '{field_name}' does not exist!")
+        if not is_datetime64_dtype(data[self.time_field]):
+            raise TypeError("Column 'time_field' is not datetime type! Please use "
+                            "pd.to_datetime() to convert it to datetime.")
+        unknown_ids = set(data[self.id_field].unique().tolist()) - {self.id1, self.id2}
+        if unknown_ids:
+            raise ValueError(f"Only points of id {self.id1} and {self.id2} can be appended but {unknown_ids} found!")
+
+        # select the time window if given
+        if self.start_time is not None:
+            data = data[data[self.time_field] >= datetime.strptime(self.start_time, '%Y-%m-%d %H:%M:%S')]
+        if self.end_time is not None:
+            data = data[data[self.time_field] <= datetime.strptime(self.end_time, '%Y-%m-%d %H:%M:%S')]
+        new_points = data
+        if self.transformer is not None:
+            new_points = project_points(data, self.transformer, self.latitude_field, self.longitude_field)
+        new_df1 = new_points[new_points[self.id_field] == self.id1]
+        new_df2 = new_points[new_points[self.id_field] == self.id2]
+        for new_df, ellipses_list_gen in [(new_df1, self.ellipses_list_gen_id1), (new_df2, self.ellipses_list_gen_id2)]:
+            if new_df.shape[0] != 0 and ellipses_list_gen.last_ts is not None \
+                    and new_df[self.time_field].min() <= ellipses_list_gen.last_ts:
+                raise ValueError(f"New points of id {ellipses_list_gen.last_id} must be later than its last point "
+                                 f"{ellipses_list_gen.last_ts}!")
+
+        recorder = self.recorder.new_run()
+        self.metrics = recorder.metrics
+        n1, n2 = len(self.ellipses_list_id1), len(self.ellipses_list_id2)
+        with recorder.stage("ppa_generation") as counts:
+            self.ellipses_list_gen_id1.generate_batch(new_df1, max_el_time_min=self.max_el_time_min,
+                                                      speed_average=self.speed_average, cache=self.cache)
+            self.ellipses_list_gen_id2.generate_batch(new_df2, max_el_time_min=self.max_el_time_min,
+                                                      speed_average=self.speed_average, cache=self.cache)
+            counts.update(points=new_df1.shape[0] + new_df2.shape[0],
+                          ppas=len(self.ellipses_list_id1) - n1 + len(self.ellipses_list_id2) - n2)
+        self.data = pd.concat([self.data, data])
+        self.df1 = pd.concat([self.df1, new_df1])
+        self.df2 = pd.concat([self.df2, new_df2])
+        self.ellipses_list = self.ellipses_list_id1 + self.ellipses_list_id2
+        self._ppa_index = None  # built again with the new PPAs when needed
+        recorder.message(f'{len(self.ellipses_list_id1) - n1} and {len(self.ellipses_list_id2) - n2} new PPAs '
+                         f'for id {self.id1} and {self.id2}!')
+        if self.intersection_index is None:
+            return self.results
+
+        # only the pairs involving a new PPA are tested: new PPAs of id1 against all PPAs of id2, and the previous
+        # PPAs of id1 against the new PPAs of id2
+        with recorder.stage("delay_filtering") as counts:
+            index1_new, index2_all = get_timedelay_candidates(self.ellipses_list_id1[n1:], self.ellipses_list_id2,
+                                                              self.minute_min_delay, self.minute_max_delay)
+            index1_old, index2_new = get_timedelay_candidates(self.ellipses_list_id1[:n1],
+                                                              self.ellipses_list_id2[n2:],
+                                                              self.minute_min_delay, self.minute_max_delay)
+            candidates = (np.concatenate([index1_new + n1, index1_old]),
+                          np.concatenate([index2_all, index2_new + n2]))
+            counts.update(ppas=len(self.ellipses_list_id1) - n1 + len(self.ellipses_list_id2) - n2,
+                          candidates=len(candidates[0]))
+        with recorder.stage("spatial_pairing") as counts:
+            new_index1, new_index2 = get_spatial_intersect_index(self.ellipses_list_id1, self.ellipses_list_id2,
+                                                                 candidates=candidates, analytic=analytic,
+                                                                 tolerance=self.vertex_tolerance)
+            counts.update(candidates=len(candidates[0]), pairs=len(new_index1))
+
+        # keep the pairs in the order a full interaction_analysis would give
+        index1 = np.concatenate([self.intersection_index[0], new_index1])
+        index2 = np.concatenate([self.intersection_index[1], new_index2])
+        order = np.lexsort((index2, index1))
+        self.intersection_index = (index1[order], index2[order])
+        if self.results is None:
+            self.results = interaction_results(self.ellipses_list_id1, self.ellipses_list_id2,
+                                               *self.intersection_index, self.id1, self.id2, self.attr_fields,
+                                               recorder)
+        elif len(new_index1) != 0:
+            self.__update_results(new_index1, new_index2, order, recorder)
         else:
-            results = ORTEGAResults()
-            results.set_intersection_ellipse_pair(all_intersection_pairs)
-            print(datetime.now(), f'Complete! {len(all_intersection_pairs)} pairs of intersecting PPAs found!')
-
-            # convert the list of intersecting ellipses to dataframe format - df_all_intersection_pairs
-            df_all_intersection_pairs = intersect_ellipse_todataframe(all_intersection_pairs, self.attr_fields)
-            df_all_intersection_pairs = interaction_compute_speed_diff(df_all_intersection_pairs)
-            df_all_intersection_pairs = interaction_compute_direction_diff(df_all_intersection_pairs)
-            df_all_intersection_pairs = interaction_compute_time_diff(df_all_intersection_pairs)
-            results.set_df_all_intersection_pairs(df_all_intersection_pairs)
-
-            # compute duration of interaction and output as a dataframe - df_duration
-            print(datetime.now(), 'Compute continuous interaction events...')
-            df_continues = check_continuous(df_all_intersection_pairs, self.id1, self.id2)
-            print(datetime.now(), f'Complete! {df_continues.shape[0]} continuous interaction events identified!')
-            if df_continues.shape[0] != 0:
-                results.set_df_interaction_events(df_continues)
-                return results
-            else:
-                return None
+            self.results.set_recorder(recorder)
+        if self.results is not None:
+            self.results.set_attributes(self.__get_attributes())
+            self.results.set_time_dtype(self.data[self.time_field].dtype)
+        return self.results
+
+    def __update_results(self, new_index1: np.ndarray, new_index2: np.ndarray, order: np.ndarray,
+                         recorder: Recorder):
+        """
+        private function, only can be called in side the class;
+        insert the new intersecting pairs into self.results and update the interaction events in place: the pairs
+        before the first new pair are kept, and the events are only computed again from the segment of id1 (see
+        segment_starts) containing the first new pair
+        :param new_index1: index into ellipses_list_id1 of each new intersecting pair
+        :param new_index2: index into ellipses_list_id2 of each new intersecting pair
+        :param order: order of the previous pairs followed by the new pairs in the updated intersection_index
+        :param recorder: records the progress and the metrics of the stages
+        """
+        n_old = len(order) - len(new_index1)
+        # the previous pairs before the first new pair keep their position
+        first_new = int(np.argmax(order >= n_old))
+        tail_order = order[first_new:] - first_new
+        with recorder.stage("pair_table") as counts:
+            new_pairs = list(zip(ellipse_items(self.ellipses_list_id1, new_index1),
+                                 ellipse_items(self.ellipses_list_id2, new_index2)))
+            positions = np.arange(len(new_pairs))
+            df_new = intersection_table(ellipse_table([p1 for p1, _ in new_pairs]),
+                                        ellipse_table([p2 for _, p2 in new_pairs]), positions, positions,
+                                        self.attr_fields)
+            df_new = interaction_compute_speed_diff(df_new)
+            df_new = interaction_compute_direction_diff(df_new)
+            df_new = interaction_compute_time_diff(df_new)
+            # columns added by compute_interaction_duration or attach_attributes are dropped
+            df_old = self.results.df_all_intersection_pairs[df_new.columns]
+            tail = pd.concat([df_old.iloc[first_new:], df_new], ignore_index=True)
+            df_pairs = pd.concat([df_old.iloc[:first_new], tail.iloc[tail_order]], ignore_index=True)
+            tail_pairs = self.results.intersection_ellipse_pair[first_new:] + new_pairs
+            intersection_pairs = self.results.intersection_ellipse_pair[:first_new] + \
+                [tail_pairs[k] for k in tail_order.tolist()]
+            counts.update(pairs=len(df_new))
+        recorder.message(f'{len(df_new)} new pairs of intersecting PPAs found!')
+
+        with recorder.stage("check_continuous") as counts:
+            split = last_segment_start(df_old, first_new)
+            df_events = self.results.df_interaction_events
+            n_replaced = len(check_continuous(df_old.iloc[split:], self.id1, self.id2))
+            df_continues = check_continuous(df_pairs.iloc[split:], self.id1, self.id2)
+            df_events = pd.concat([df_events[df_continues.columns].iloc[:len(df_events) - n_replaced], df_continues],
+                                  ignore_index=True)
+            counts.update(pairs=len(df_pairs) - split, events=len(df_continues))
+        recorder.message(f'Complete! {df_events.shape[0]} continuous interaction events identified!')
+        self.results.set_intersection_ellipse_pair(intersection_pairs)
+        self.results.set_df_all_intersection_pairs(df_pairs)
+        self.results.set_df_interaction_events(df_events)
+        self.results.set_recorder(recorder)
+
+    def __get_attributes(self) -> Dict[Any, Union[pd.DataFrame, None]]:
+        """
+        private function, only can be called in side the class;
+        attribute tables of the two individuals, keyed by id, for ORTEGAResults.attach_attributes
+        """
+        return {self.id1: self.ellipses_list_gen_id1.attrs, self.id2: self.ellipses_list_gen_id2.attrs}
 
     def __precheck_time_lag_and_overlap(self, minute_max_delay: float):
         """
@@ -485,19 +1113,7 @@ class ORTEGA:
         start1, end1 = self.df1[self.time_field].min(), self.df1[self.time_field].max()
         start2, end2 = self.df2[self.time_field].min(), self.df2[self.time_field].max()
 
-        # Calculate the time overlap
-        overlap_start = max(start1, start2)
-        overlap_end = min(end1, end2)
-        overlap_duration = (overlap_end - overlap_start).total_seconds() / 60
-
-        # Check if there is no overlap
-        if overlap_duration <= 0:
-            # Calculate the time lag
-            time_lag = abs((start2 - end1).total_seconds() / 60) if end1 < start2 else abs((start1 - end2).total_seconds() / 60)
-            # Check if time lag is greater than the max delay
-            if time_lag > minute_max_delay:
-                return False
-        return True
+        return check_time_lag_and_overlap(start1, end1, start2, end2, minute_max_delay)
 
     def __get_ellipse_list(self, df1: pd.DataFrame, df2: pd.DataFrame, max_el_time_min: float, speed_average: bool):
         """
@@ -507,25 +1123,45 @@ class ORTEGA:
         :param df2: a pandas dataframe of GPS points of individual id2
         :return:
         """
-        print(datetime.now(), "Generate PPA list for the two moving entities...")
-        ellipses_list_gen = EllipseList(self.latitude_field, self.longitude_field, self.id_field, self.time_field, self.attr_fields)
-
-        # create PPA for df1, skip PPAs with large time interval
-        ellipses_list_gen.generate(df1, max_el_time_min=max_el_time_min, speed_average=speed_average)
-        # append PPA based on df2 to the above ellipses_list_gen object
-        allPPAlist = ellipses_list_gen.generate(df2, max_el_time_min=max_el_time_min,
-                                                speed_average=speed_average)
-        print(datetime.now(), "Generating PPA list completed!")
+        self.recorder.message("Generate PPA list for the two moving entities...")
+        self.ellipses_list_gen_id1 = EllipseList(self.latitude_field, self.longitude_field, self.id_field,
+                                                 self.time_field, self.attr_fields)
+        self.ellipses_list_gen_id2 = EllipseList(self.latitude_field, self.longitude_field, self.id_field,
+                                                 self.time_field, self.attr_fields)
+
+        # create PPA for df1 and df2, skip PPAs with large time interval
+        with self.recorder.stage("ppa_generation") as counts:
+            self.ellipses_list_gen_id1.generate_batch(df1, max_el_time_min=max_el_time_min,
+                                                      speed_average=speed_average, cache=self.cache)
+            self.ellipses_list_gen_id2.generate_batch(df2, max_el_time_min=max_el_time_min,
+                                                      speed_average=speed_average, cache=self.cache)
+            allPPAlist = self.ellipses_list_gen_id1.list + self.ellipses_list_gen_id2.list
+            counts.update(points=df1.shape[0] + df2.shape[0], ppas=len(allPPAlist))
+        self.recorder.message("Generating PPA list completed!")
 
         return allPPAlist  # return the whole list of PPAs
 
-    def __get_spatial_intersect_pairs(self):
+    def ppa_metrics(self, summary: bool = False) -> pd.DataFrame:
+        """
+        Metrics of each PPA of the two individuals, computed from the axes of the ellipses (see ellipse_metrics)
+        :param summary: if True, return the descriptive statistics of the metrics of each individual (see
+            ppa_summary) instead of one row per PPA
+        :return: dataframe with the columns 'pid', 't0', 't1', 'interval' (minute), 'speed', 'major', 'minor',
+            'area' and 'perimeter', in the unit of the coordinates
+        """
+        metrics = pd.concat([ellipse_metrics(self.ellipses_list_id1), ellipse_metrics(self.ellipses_list_id2)],
+                            ignore_index=True)
+        return ppa_summary(metrics) if summary else metrics
+
+    def __report_statistics(self, quantity: str, values: List[Any]):
         """
         private function, only can be called in side the class;
-        :return:
+        send the descriptive statistics of a PPA quantity of the two individuals to the instrumentation
+        :param quantity: name and unit of the quantity, e.g. 'speed (m/s)'
+        :param values: the values of id1 and of id2
         """
-        intersection_pairs = get_spatial_intersect_pairs(self.ellipses_list_id1, self.ellipses_list_id2)
-        return intersection_pairs
+        for pid, v in zip([self.id1, self.id2], values):
+            self.recorder.message(f"Descriptive statistics of PPA {quantity} for id {pid}:\n{pd.Series(v).describe()}")
 
     def compute_ppa_speed(self, lim: List[float] = [0, 0]):
         if len(lim) != 2:
@@ -534,59 +1170,41 @@ class ORTEGA:
             [e.speed for e in self.ellipses_list_id1 if e.speed > lim[0]],
             [e.speed for e in self.ellipses_list_id2 if e.speed > lim[1]]
         ]
-        print(f"Descriptive statistics of PPA speed (m/s) for id {self.id1}:")
-        print(pd.Series(speed_list[0]).describe())
-        print(f"Descriptive statistics of PPA speed (m/s) for id {self.id2}:")
-        print(pd.Series(speed_list[1]).describe())
+        self.__report_statistics("speed (m/s)", speed_list)
         return speed_list
 
     def compute_ppa_perimeter(self, lim: List[float] = [0, 0]):
 
         if len(lim) != 2:
             raise ValueError("Parameter 'lim' must be a list of two floats (unit: meter)!")
-        size_list = [
-            [e.el.length for e in self.ellipses_list_id1 if e.el.length > lim[0]],
-            [e.el.length for e in self.ellipses_list_id2 if e.el.length > lim[1]]
-        ]
+        perimeters = [ellipse_metrics(self.ellipses_list_id1)["perimeter"],
+                      ellipse_metrics(self.ellipses_list_id2)["perimeter"]]
+        size_list = [perimeters[0][perimeters[0] > lim[0]].tolist(), perimeters[1][perimeters[1] > lim[1]].tolist()]
         if mean(size_list[0]) < 1000:
-            print(f"Descriptive statistics of PPA perimeter (meter) for id {self.id1}:")
-            print(pd.Series(size_list[0]).describe())
-            print(f"Descriptive statistics of PPA perimeter (meter) for id {self.id2}:")
-            print(pd.Series(size_list[1]).describe())
+            self.__report_statistics("perimeter (meter)", size_list)
             return size_list
         else:
             size_list_update = [
                 [e / 1000 for e in size_list[0]],
                 [e / 1000 for e in size_list[1]]
             ]
-            print(f"Descriptive statistics of PPA perimeter (kilometer) for id {self.id1}:")
-            print(pd.Series(size_list_update[0]).describe())
-            print(f"Descriptive statistics of PPA perimeter (kilometer) for id {self.id2}:")
-            print(pd.Series(size_list_update[1]).describe())
+            self.__report_statistics("perimeter (kilometer)", size_list_update)
             return size_list_update
 
     def compute_ppa_area(self, lim: List[float] = [0, 0]):
         if len(lim) != 2:
             raise ValueError("Parameter 'lim' must be a list of two floats (unit: square meter)!")
-        size_list = [
-            [e.geom.area for e in self.ellipses_list_id1 if e.geom.area > lim[0]],
-            [e.geom.area for e in self.ellipses_list_id2 if e.geom.area > lim[1]]
-        ]
+        areas = [ellipse_metrics(self.ellipses_list_id1)["area"], ellipse_metrics(self.ellipses_list_id2)["area"]]
+        size_list = [areas[0][areas[0] > lim[0]].tolist(), areas[1][areas[1] > lim[1]].tolist()]
         if mean(size_list[0]) < 1000:
-            print(f"Descriptive statistics of PPA area (square meter) for id {self.id1}:")
-            print(pd.Series(size_list[0]).describe())
-            print(f"Descriptive statistics of PPA area (square meter) for id {self.id2}:")
-            print(pd.Series(size_list[1]).describe())
+            self.__report_statistics("area (square meter)", size_list)
             return size_list
         else:
             size_list_update = [
                 [e / 1000000 for e in size_list[0]],
                 [e / 1000000 for e in size_list[1]]
             ]
-            print(f"Descriptive statistics of PPA perimeter (square kilometer) for id {self.id1}:")
-            print(pd.Series(size_list_update[0]).describe())
-            print(f"Descriptive statistics of PPA perimeter (square kilometer) for id {self.id2}:")
-            print(pd.Series(size_list_update[1]).describe())
+            self.__report_statistics("area (square kilometer)", size_list_update)
             return size_list_update
 
     def compute_ppa_interval(self):
@@ -596,8 +1214,5 @@ class ORTEGA:
             self.df2[self.time_field].diff().dt.total_seconds().div(60).dropna().loc[
                 lambda x: x <= self.max_el_time_min]
         ]
-        print(f"Descriptive statistics of PPA time interval (minutes) for id {self.id1}:")
-        print(time_diff[0].describe())
-        print(f"Descriptive statistics of PPA time interval (minutes) for id {self.id2}:")
-        print(time_diff[1].describe())
+        self.__report_statistics("time interval (minutes)", time_diff)
         return time_diff
@@ -1,39 +1,118 @@
 from .ellipses import Ellipse
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 from .common import *
+from .instrumentation import Recorder, RunMetrics
 
 
-def extract_attributes(df: pd.DataFrame, col: str, method: str):
-    def mean(row):
-        row['p1_attrs_' + col] = (row['p1_start_attrs'][col] + row['p1_end_attrs'][col]) / 2
-        row['p2_attrs_' + col] = (row['p2_start_attrs'][col] + row['p2_end_attrs'][col]) / 2
-        row['attrs_mean_' + col] = (row['p1_attrs_' + col] + row['p2_attrs_' + col])/2
-        return row
+# how the attribute values of the two individuals in a pair are combined by attach_attributes: method name -> (column
+# name prefix, function of the arrays of the two individuals)
+ATTRIBUTE_METHODS = {
+    'mean': ('attrs_mean_', lambda a, b: (a + b) / 2),
+    'difference': ('attrs_diff_', lambda a, b: a - b),
+    'min': ('attrs_min_', np.minimum),
+    'max': ('attrs_max_', np.maximum),
+}
 
-    def difference(row):
-        row['p1_attrs_' + col] = (row['p1_start_attrs'][col] + row['p1_end_attrs'][col]) / 2
-        row['p2_attrs_' + col] = (row['p2_start_attrs'][col] + row['p2_end_attrs'][col]) / 2
-        row['attrs_diff_' + col] = row['p1_attrs_' + col] - row['p2_attrs_' + col]
-        return row
 
-    if method == 'mean':
-        df = df.apply(lambda row: mean(row), axis=1)
-    if method == 'difference':
-        df = df.apply(lambda row: difference(row), axis=1)
+def gather_attribute(df: pd.DataFrame, attributes: Dict[Any, pd.DataFrame], col: str, num: int,
+                     point: str) -> np.ndarray:
+    """
+    Look up an attribute of the start or end points of the PPAs of individual p1 or p2 of each intersecting pair
+    :param df: dataframe of intersecting pairs with the p{num} and p{num}_{point}_row columns
+    :param attributes: attribute tables of the individuals, keyed by id
+    :param col: attribute field
+    :param num: 1 or 2
+    :param point: 'start' or 'end'
+    :return: array of the attribute values, aligned with the rows of df
+    """
+    rows = df[f'p{num}_{point}_row'].to_numpy()
+    groups = df.groupby(f'p{num}', sort=False).indices
+    # rows are labels of the attribute tables (their positions, unless old rows were dropped by ORTEGAStream)
+    gathered = {pid: attributes[pid][col].loc[rows[index]].to_numpy() for pid, index in groups.items()}
+    values = np.empty(len(df), dtype=np.result_type(*gathered.values()))
+    for pid, index in groups.items():
+        values[index] = gathered[pid]
+    return values
+
+
+def extract_attributes(df: pd.DataFrame, col: str, method: str, attributes: Dict[Any, pd.DataFrame]):
+    prefix, combine = ATTRIBUTE_METHODS[method]
+    df = df.copy()
+    for num in [1, 2]:
+        df[f'p{num}_attrs_' + col] = (gather_attribute(df, attributes, col, num, 'start') +
+                                      gather_attribute(df, attributes, col, num, 'end')) / 2
+    df[prefix + col] = combine(df['p1_attrs_' + col].to_numpy(), df['p2_attrs_' + col].to_numpy())
     return df
 
 
+def merge_attributes(tables: List[Union[pd.DataFrame, None]]) -> Union[pd.DataFrame, None]:
+    """
+    Merge the attribute tables of one individual from several results (e.g. the results released by ORTEGAStream,
+    each holding the rows still kept at its release), keeping each row label once
+    :param tables: attribute tables of the individual, None if no attributes are stored
+    :return: attribute table with the rows of all tables, sorted by row label, or None
+    """
+    tables = [t for t in tables if t is not None]
+    if not tables:
+        return None
+    unique = list({id(t): t for t in tables}.values())
+    if len(unique) == 1:
+        return unique[0]
+    merged = pd.concat(unique)
+    return merged[~merged.index.duplicated()].sort_index()
+
+
 class ORTEGAResults:
     def __init__(
             self,
             intersection_ellipse_pair: List[Tuple[Ellipse, Ellipse]] = None,
             df_all_intersection_pairs: pd.DataFrame = None,
-            df_interaction_events: pd.DataFrame = None
+            df_interaction_events: pd.DataFrame = None,
+            attributes: Dict[Any, pd.DataFrame] = None,
+            recorder: Recorder = None
 
     ):
         self.df_all_intersection_pairs = df_all_intersection_pairs
         self.intersection_ellipse_pair = intersection_ellipse_pair
         self.df_interaction_events = df_interaction_events
+        # attr_fields of the GPS points of each individual, keyed by id; the pairs only keep the positions of the
+        # points in these tables (columns p1_start_row, p1_end_row, p2_start_row and p2_end_row)
+        self.attributes = attributes
+        # reports the progress and keeps the metrics of the stages of the run that produced these results
+        self.recorder = recorder if recorder is not None else Recorder()
+
+    @property
+    def metrics(self) -> RunMetrics:
+        return self.recorder.metrics
+
+    @classmethod
+    def concat(cls, results: List[Union["ORTEGAResults", None]]):
+        """
+        Combine the results of several pairs of individuals into one ORTEGAResults, skipping None results
+        :param results: list of ORTEGAResults (or None)
+        :return: ORTEGAResults, or None if no result is given
+        """
+        results = [r for r in results if r is not None]
+        if not results:
+            return None
+        metrics = RunMetrics.concat([r.metrics for r in results])
+        return cls(
+            [pair for r in results for pair in r.intersection_ellipse_pair],
+            pd.concat([r.df_all_intersection_pairs for r in results], ignore_index=True),
+            pd.concat([r.df_interaction_events for r in results], ignore_index=True),
+            cls.__merge_attributes(results),
+            Recorder(results[0].recorder.instrumentation, results[0].recorder.track_memory, metrics),
+        )
+
+    @staticmethod
+    def __merge_attributes(results: List["ORTEGAResults"]) -> Dict[Any, pd.DataFrame]:
+        # the attribute tables of each individual in all results, merged so that the rows of every result are kept
+        tables: Dict[Any, List[pd.DataFrame]] = {}
+        for r in results:
+            if r.attributes is not None:
+                for pid, attrs in r.attributes.items():
+                    tables.setdefault(pid, []).append(attrs)
+        return {pid: merge_attributes(attrs) for pid, attrs in tables.items()}
 
     def set_intersection_ellipse_pair(self, row: List[Tuple[Ellipse, Ellipse]]):
         self.intersection_ellipse_pair = row
@@ -44,18 +123,47 @@ class ORTEGAResults:
     def set_df_interaction_events(self, row: pd.DataFrame):
         self.df_interaction_events = row
 
+    def set_attributes(self, row: Dict[Any, pd.DataFrame]):
+        self.attributes = row
+
+    def set_recorder(self, row: Recorder):
+        self.recorder = row
+
+    def set_time_dtype(self, dtype: Any):
+        """
+        Cast the times of the pairs and of the events to the datetime dtype of the time field of the input data; the
+        tables are built from the int64 nanosecond times of the PPAs, so in datetime64[ns]
+        :param dtype: datetime dtype, e.g. datetime64[us]
+        """
+        for df, columns in [(self.df_all_intersection_pairs, ['p1_t_start', 'p1_t_end', 'p2_t_start', 'p2_t_end']),
+                            (self.df_interaction_events, ['p1_start', 'p1_end', 'p2_start', 'p2_end'])]:
+            if df is not None and len(df.columns) != 0:
+                for column in columns:
+                    df[column] = df[column].astype(dtype)
+
     def compute_interaction_duration(self):
-        self.df_interaction_events['duration'] = self.df_interaction_events[["p1_end", "p2_end"]].max(axis=1) - self.df_interaction_events[["p1_start", "p2_start"]].min(axis=1)
-        self.df_interaction_events['duration'] = self.df_interaction_events['duration'].dt.total_seconds().div(60)
-        print(datetime.now(), f'Computing interaction duration complete!')
+        with self.recorder.stage("interaction_duration") as counts:
+            self.df_interaction_events['duration'] = self.df_interaction_events[["p1_end", "p2_end"]].max(axis=1) - self.df_interaction_events[["p1_start", "p2_start"]].min(axis=1)
+            self.df_interaction_events['duration'] = self.df_interaction_events['duration'].dt.total_seconds().div(60)
+            counts.update(events=len(self.df_interaction_events))
+        self.recorder.message(f'Computing interaction duration complete!')
 
     def attach_attributes(self, col, method: str):
-        if method not in ['mean', 'difference']:
-            raise ValueError("Parameter 'method' must be one of these: ['mean','difference']!")
+        if method not in ATTRIBUTE_METHODS:
+            raise ValueError(f"Parameter 'method' must be one of these: {list(ATTRIBUTE_METHODS)}!")
         if isinstance(col, str):
-            self.df_all_intersection_pairs = extract_attributes(self.df_all_intersection_pairs, col, method)
-        elif isinstance(col, list):
-            for c in col:
-                self.df_all_intersection_pairs = extract_attributes(self.df_all_intersection_pairs, c, method)
-        else:
+            col = [col]
+        elif not isinstance(col, list):
             raise TypeError("Parameter 'col' must be either a string or a list of strings!")
+        if self.attributes is None or 'p1_start_row' not in self.df_all_intersection_pairs.columns:
+            raise ValueError("No attributes are stored with the PPAs! Please set 'attr_fields' when creating the "
+                             "ORTEGA object.")
+        for c in col:
+            for attrs in self.attributes.values():
+                if attrs is None or c not in attrs.columns:
+                    raise KeyError(f"Attribute '{c}' is not in 'attr_fields'!")
+        with self.recorder.stage("attach_attributes") as counts:
+            for c in col:
+                self.df_all_intersection_pairs = extract_attributes(self.df_all_intersection_pairs, c, method,
+                                                                    self.attributes)
+            counts.update(pairs=len(self.df_all_intersection_pairs), attributes=len(col))
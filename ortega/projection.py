@@ -0,0 +1,65 @@
+from typing import Any
+import numpy as np
+import pandas as pd
+from pyproj import CRS, Transformer
+from pyproj.aoi import AreaOfInterest
+from pyproj.crs import ProjectedCRS
+from pyproj.crs.coordinate_operation import LambertAzimuthalEqualAreaConversion
+from pyproj.database import query_utm_crs_info
+
+# coordinates of the input data when a projection is requested
+SOURCE_CRS = "EPSG:4326"
+
+
+def local_crs(longitude: np.ndarray, latitude: np.ndarray) -> CRS:
+    """
+    Pick a local metric CRS for points given in WGS84 longitude/latitude: the UTM zone of the points if they all fall
+    in one zone, otherwise a Lambert azimuthal equal-area projection centered on the points
+    :param longitude: longitude of the points, in degree
+    :param latitude: latitude of the points, in degree
+    :return: pyproj CRS
+    """
+    west, east = float(np.nanmin(longitude)), float(np.nanmax(longitude))
+    south, north = float(np.nanmin(latitude)), float(np.nanmax(latitude))
+    utm_crs_list = query_utm_crs_info(
+        datum_name="WGS 84",
+        area_of_interest=AreaOfInterest(west, south, east, north),
+        contains=True,
+    )
+    if utm_crs_list:
+        return CRS.from_epsg(utm_crs_list[0].code)
+    lat_0, lon_0 = (south + north) / 2, (west + east) / 2
+    return ProjectedCRS(LambertAzimuthalEqualAreaConversion(lat_0, lon_0),
+                        name=f"WGS 84 / Lambert azimuthal equal-area ({lat_0:.2f}, {lon_0:.2f})")
+
+
+def get_transformer(crs: Any, longitude: np.ndarray, latitude: np.ndarray) -> Transformer:
+    """
+    Create the transformer from WGS84 longitude/latitude to the target CRS
+    :param crs: 'auto' to pick a local CRS with local_crs, or any projected CRS accepted by pyproj
+    :param longitude: longitude of the points, in degree, used to pick the local CRS
+    :param latitude: latitude of the points, in degree, used to pick the local CRS
+    :return: pyproj Transformer (x is easting and y is northing)
+    """
+    if isinstance(crs, str) and crs == "auto":
+        crs = local_crs(longitude, latitude)
+    return Transformer.from_crs(SOURCE_CRS, crs, always_xy=True)
+
+
+def project_points(df: pd.DataFrame, transformer: Transformer, latitude_field: str,
+                   longitude_field: str) -> pd.DataFrame:
+    """
+    Project the points of a dataframe in one batched transform; the latitude field of the returned copy holds the
+    northing and the longitude field the easting, in meters
+    :param df: GPS points with WGS84 latitude and longitude
+    :param transformer: transformer from get_transformer
+    :param latitude_field: latitude field name
+    :param longitude_field: longitude field name
+    :return: a copy of df with the projected coordinates
+    """
+    x, y = transformer.transform(df[longitude_field].to_numpy(dtype=float), df[latitude_field].to_numpy(dtype=float))
+    df = df.copy()
+    df[latitude_field] = y
+    df[longitude_field] = x
+    return df
+
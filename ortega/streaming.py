@@ -0,0 +1,333 @@
+import math
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_dtype
+from .cache import PPACache
+from .common import to_epoch_ns
+from .ellipses import Ellipse, EllipseList, ellipse_table, ellipse_times
+from .instrumentation import Instrumentation, Recorder
+from .ortega import ORTEGAParameters, get_intersection_index, intersection_table, interaction_compute_speed_diff, \
+    interaction_compute_direction_diff, interaction_compute_time_diff, check_continuous, segment_starts
+from .output import ORTEGAResults
+from .projection import get_transformer, project_points
+
+
+def read_chunks(source: Union[str, Iterable[pd.DataFrame]], chunksize: int = 100000,
+                columns: List[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read tracking data by chunks of rows
+    :param source: path of a .csv or .parquet file, or an iterable of dataframes (returned as they are)
+    :param chunksize: number of rows of each chunk read from a file
+    :param columns: columns to read from the file; all columns if None
+    :return: iterator of dataframes
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield from source
+        return
+    path = os.fspath(source)
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow! Please install it with 'pip install pyarrow'.")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+
+
+class ORTEGAStream(ORTEGAParameters):
+    # interaction analysis of two individuals whose tracking data are read by chunks in the order of time, e.g. tracks
+    # too long to be held in memory; only the PPAs that can still intersect the PPAs of the next chunks (within
+    # minute_max_delay) are kept between chunks, and the pairs and events are returned as soon as they are final; the
+    # pairs of an interaction event that is still going on are kept until it ends, since its events depend on all of
+    # its pairs, so the memory is bounded by the window and by the longest continuous interaction
+    def __init__(
+            self,
+            minute_min_delay: float = 0,  # allowable minimum delay for intersecting PPAs, in minute
+            minute_max_delay: float = None,  # allowable maximum delay for intersecting PPAs, in minute
+            max_el_time_min: float = 10000,  # PPA's interval greater than this value will be eliminated, in minute
+            latitude_field: str = "latitude",  # specify the latitude field name
+            longitude_field: str = "longitude",  # specify the longitude field name
+            id_field: str = "pid",  # specify the id field name
+            time_field: str = "time_local",  # time_field must include month, day, year, hour, minute, second
+            speed_average: bool = False,
+            attr_fields: List[str] = None,
+            crs: Any = None,  # 'auto' (chosen from the first chunk) or a projected CRS to project latitude/longitude to
+            analytic: bool = False,  # if True, test PPA overlap on the exact ellipses instead of their polygons
+            instrumentation: Instrumentation = None,  # receives progress messages and stage metrics; silent if None
+            track_memory: bool = False,  # if True, measure the peak memory of each stage (slower)
+            cache: Union[PPACache, str] = None,  # PPACache or directory to reuse the PPAs computed by previous runs
+            vertex_tolerance: float = None,  # if set, PPA polygons adapt their vertex count to be within this distance
+    ):
+        self._data = None  # no dataframe, the fields are checked on each chunk
+        self.latitude_field = latitude_field
+        self.longitude_field = longitude_field
+        self.id_field = id_field
+        self.time_field = time_field
+        self.attr_fields = attr_fields
+        self.minute_min_delay = minute_min_delay
+        self.minute_max_delay = minute_max_delay
+        if self.minute_max_delay < self.minute_min_delay:
+            raise ValueError("Parameter 'minute_max_delay' must be greater than 'minute_min_delay'!")
+        self.max_el_time_min = max_el_time_min
+        self.speed_average = speed_average
+        self.crs = crs
+        self.analytic = analytic
+        self.instrumentation = instrumentation
+        self.track_memory = track_memory
+        self.cache = cache
+        self.vertex_tolerance = vertex_tolerance
+        self.recorder = Recorder(self.instrumentation, self.track_memory)
+        self.metrics = self.recorder.metrics
+        self.transformer = None
+        self.target_crs = None
+        # ids of the two individuals in the order they first appear, and their PPA generators
+        self.ids: List[Any] = []
+        self.generators: Dict[Any, EllipseList] = {}
+        # PPAs that can still intersect PPAs of the next chunks, and the number of PPAs created before the first one
+        self.buffers: Dict[Any, List[Ellipse]] = {}
+        self.buffer_start: Dict[Any, int] = {}
+        # latest time of the chunks read so far, in int64 nanoseconds; the next chunks must not be earlier
+        self.watermark: Union[int, None] = None
+        # datetime dtype of the time field of the first chunk, for the times of the released pairs and events
+        self.time_dtype: Any = None
+        # pairs that may still be preceded by new pairs (sorted by PPA numbers when released)
+        self.pending: Union[Tuple[pd.DataFrame, List[Tuple[Ellipse, Ellipse]], np.ndarray], None] = None
+        # released pairs of the last segment of id1, which may be continued by the next pairs, as parts appended in the
+        # order of release and concatenated once when the segment is closed, and the smallest attribute row of p1 and
+        # p2 they reference
+        self.held: List[Tuple[pd.DataFrame, List[Tuple[Ellipse, Ellipse]], np.ndarray]] = []
+        self.held_rows: Dict[int, int] = {}
+        self.run_recorder = self.recorder.new_run()
+
+    def run(self, source: Union[str, Iterable[pd.DataFrame]], chunksize: int = 100000) -> Iterator[ORTEGAResults]:
+        """
+        Read the tracking data by chunks and yield the intersecting pairs and the interaction events as they are found
+        :param source: path of a .csv or .parquet file, or an iterable of dataframes, in the order of time
+        :param chunksize: number of rows of each chunk read from a file
+        :return: iterator of ORTEGAResults; ORTEGAResults.concat of all of them equals the results of ORTEGA on the
+            whole data
+        """
+        columns = [self.id_field, self.time_field, self.latitude_field, self.longitude_field] + \
+                  (self.attr_fields if self.attr_fields is not None else [])
+        for chunk in read_chunks(source, chunksize, columns):
+            results = self.process(chunk)
+            if results is not None:
+                yield results
+        results = self.finish()
+        if results is not None:
+            yield results
+
+    def process(self, chunk: pd.DataFrame) -> Union[ORTEGAResults, None]:
+        """
+        Create the PPAs of a chunk of tracking data and find their intersections with the PPAs kept from the previous
+        chunks
+        :param chunk: GPS points of one or both individuals, not earlier than the points of the previous chunks
+        :return: ORTEGAResults of the pairs and events that the next chunks cannot change, or None if there is none
+        """
+        chunk = self.__validate(chunk)
+        if chunk.shape[0] == 0:
+            return None
+        recorder = self.run_recorder
+        new: Dict[Any, List[Ellipse]] = {}
+        with recorder.stage("ppa_generation") as counts:
+            for pid in self.ids:
+                df = chunk[chunk[self.id_field] == pid]
+                generator = self.generators[pid]
+                generator.list = []  # the PPAs of the previous chunks are in the buffers
+                new[pid] = generator.generate_batch(df, max_el_time_min=self.max_el_time_min,
+                                                    speed_average=self.speed_average, cache=self.cache)
+            counts.update(points=chunk.shape[0], ppas=sum(len(ppas) for ppas in new.values()))
+
+        if len(self.ids) == 2:
+            self.__add_pairs(new, recorder)
+        for pid in self.ids:
+            self.buffers[pid] += new[pid]
+        self.watermark = max(self.watermark, int(to_epoch_ns(chunk[self.time_field]).max())) \
+            if self.watermark is not None else int(to_epoch_ns(chunk[self.time_field]).max())
+
+        # the PPAs ending more than minute_max_delay before the watermark cannot intersect the PPAs of the next chunks
+        cutoff = self.watermark - int(math.ceil(self.minute_max_delay * 60 * 1e9))
+        results = self.__release(cutoff, recorder)
+        self.__trim(cutoff)
+        return results
+
+    def finish(self) -> Union[ORTEGAResults, None]:
+        """
+        Release the pairs and events still kept at the end of the data
+        :return: ORTEGAResults, or None if there is none
+        """
+        results = self.__release(None, self.run_recorder, final=True)
+        self.recorder.message('Streaming complete!')
+        return results
+
+    def __validate(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        for name in ["latitude_field", "longitude_field", "id_field", "time_field"]:
+            if getattr(self, name) not in chunk.columns:
+                raise KeyError(f"Column '{name}' does not exist!")
+        if chunk.shape[0] == 0:
+            return chunk
+        if not is_datetime64_dtype(chunk[self.time_field]):
+            chunk = chunk.assign(**{self.time_field: pd.to_datetime(chunk[self.time_field])})
+        chunk = chunk.sort_values(self.time_field, kind="stable")
+        if self.time_dtype is None:
+            self.time_dtype = chunk[self.time_field].dtype
+        if self.watermark is not None and int(to_epoch_ns(chunk[self.time_field].iloc[:1])[0]) < self.watermark:
+            raise ValueError("The chunks must be in the order of time! A chunk starts before the end of the previous "
+                             "chunk.")
+        for pid in chunk[self.id_field].unique().tolist():
+            if pid not in self.ids:
+                if len(self.ids) == 2:
+                    raise ValueError(f"Only two unique id is allowed but a third id {pid} is found!")
+                self.ids.append(pid)
+                self.generators[pid] = EllipseList(self.latitude_field, self.longitude_field, self.id_field,
+                                                   self.time_field, self.attr_fields)
+                self.buffers[pid] = []
+                self.buffer_start[pid] = 0
+                if len(self.ids) == 2:
+                    self.recorder.pair = tuple(self.ids)
+                    self.run_recorder.pair = tuple(self.ids)
+        if self.crs is not None:
+            if self.transformer is None:
+                # the transformer is chosen once, from the first chunk, so that all PPAs are in the same CRS
+                self.transformer = get_transformer(self.crs, chunk[self.longitude_field].to_numpy(),
+                                                   chunk[self.latitude_field].to_numpy())
+                self.target_crs = self.transformer.target_crs
+                self.recorder.message(f'Tracks projected to {self.target_crs.name}!')
+            chunk = project_points(chunk, self.transformer, self.latitude_field, self.longitude_field)
+        return chunk
+
+    def __add_pairs(self, new: Dict[Any, List[Ellipse]], recorder: Recorder):
+        """
+        Find the intersecting pairs of the new PPAs with the new and the kept PPAs of the other individual and add
+        them to the pending pairs
+        """
+        id1, id2 = self.ids
+        old1, old2 = self.buffers[id1], self.buffers[id2]
+        all1, all2 = old1 + new[id1], old2 + new[id2]
+        # new PPAs of id2 with all PPAs of id1, then new PPAs of id1 with the kept PPAs of id2
+        index1_new2, index2_new2 = get_intersection_index(all1, new[id2], self.minute_min_delay,
+                                                          self.minute_max_delay, analytic=self.analytic,
+                                                          recorder=recorder, tolerance=self.vertex_tolerance)
+        index1_old2, index2_old2 = get_intersection_index(new[id1], old2, self.minute_min_delay,
+                                                          self.minute_max_delay, analytic=self.analytic,
+                                                          recorder=recorder, tolerance=self.vertex_tolerance)
+        index1 = np.concatenate([index1_new2, index1_old2 + len(old1)])
+        index2 = np.concatenate([index2_new2 + len(old2), index2_old2])
+        if index1.size == 0:
+            return
+        with recorder.stage("pair_table") as counts:
+            df = intersection_table(ellipse_table(all1), ellipse_table(all2), index1, index2, self.attr_fields)
+            df = interaction_compute_speed_diff(df)
+            df = interaction_compute_direction_diff(df)
+            df = interaction_compute_time_diff(df)
+            counts.update(pairs=len(df))
+        pairs = [(all1[i], all2[j]) for i, j in zip(index1.tolist(), index2.tolist())]
+        # numbers of the PPAs since the start of the data, to order the pairs as ORTEGA does
+        numbers = np.column_stack([index1 + self.buffer_start[id1], index2 + self.buffer_start[id2]])
+        if self.pending is not None:
+            df = pd.concat([self.pending[0], df], ignore_index=True)
+            pairs = self.pending[1] + pairs
+            numbers = np.concatenate([self.pending[2], numbers])
+        self.pending = (df, pairs, numbers)
+
+    def __release(self, cutoff: Union[int, None], recorder: Recorder, final: bool = False) -> Union[ORTEGAResults,
+                                                                                                        None]:
+        """
+        Release the pending pairs whose PPA of id1 ends before the cutoff (all of them if final), then group the
+        released pairs into events, keeping the last segment of id1 unless final
+        """
+        n_released = 0
+        if self.pending is not None:
+            df, pairs, numbers = self.pending
+            order = np.lexsort((numbers[:, 1], numbers[:, 0]))
+            df, numbers = df.iloc[order].reset_index(drop=True), numbers[order]
+            pairs = [pairs[k] for k in order.tolist()]
+            n_released = len(df)
+            if not final:
+                n_released = int(np.searchsorted(to_epoch_ns(df['p1_t_end'].to_numpy()), cutoff, side="left"))
+            self.pending = (df.iloc[n_released:].reset_index(drop=True), pairs[n_released:], numbers[n_released:]) \
+                if n_released < len(df) else None
+        closed = []
+        if n_released > 0:
+            closed = self.__hold((df.iloc[:n_released].reset_index(drop=True), pairs[:n_released],
+                                  numbers[:n_released]))
+        if self.held and (final or self.__segment_closed(int(self.held[-1][2][-1, 0]), cutoff)):
+            closed += self.held
+            self.held, self.held_rows = [], {}
+        if not closed:
+            return None
+        df = pd.concat([part[0] for part in closed], ignore_index=True)
+        pairs = [pair for part in closed for pair in part[1]]
+
+        id1, id2 = self.ids
+        with recorder.stage("check_continuous") as counts:
+            df_events = check_continuous(df, id1, id2)
+            counts.update(pairs=len(df), events=len(df_events))
+        recorder.message(f'{len(df)} pairs of intersecting PPAs and {len(df_events)} continuous interaction events '
+                         f'released!')
+        attributes = None
+        if self.attr_fields is not None:
+            attributes = {pid: self.generators[pid].attrs for pid in self.ids}
+        results = ORTEGAResults(pairs, df, df_events, attributes, recorder)
+        results.set_time_dtype(self.time_dtype)
+        # the metrics of the next results start from here
+        self.run_recorder = self.recorder.new_run()
+        return results
+
+    def __hold(self, part: Tuple[pd.DataFrame, List[Tuple[Ellipse, Ellipse]], np.ndarray]
+               ) -> List[Tuple[pd.DataFrame, List[Tuple[Ellipse, Ellipse]], np.ndarray]]:
+        """
+        Add released pairs to the held pairs of the last segment of id1; the held pairs and the new pairs before the
+        last segment start among the new pairs are closed segments, returned as parts to release
+        """
+        df, pairs, numbers = part
+        previous = self.held[-1][0].iloc[-1:] if self.held else df.iloc[:0]
+        # only the last held pair is needed to know if the first new pair continues the segment
+        starts = np.flatnonzero(segment_starts(pd.concat([previous, df], ignore_index=True))[len(previous):])
+        closed = []
+        if starts.size > 0:
+            last = int(starts[-1])
+            closed = self.held + ([(df.iloc[:last], pairs[:last], numbers[:last])] if last > 0 else [])
+            self.held, self.held_rows = [], {}
+            part = (df.iloc[last:].reset_index(drop=True), pairs[last:], numbers[last:])
+        self.held.append(part)
+        for num in [1, 2]:
+            if f'p{num}_start_row' in part[0].columns:
+                row = int(part[0][f'p{num}_start_row'].min())
+                self.held_rows[num] = min(self.held_rows.get(num, row), row)
+        return closed
+
+    def __segment_closed(self, number: int, cutoff: int) -> bool:
+        """
+        Check if the segment of id1 ending with the PPA of this number can no longer be continued: a pair continues it
+        only with this PPA or the next one, and the PPAs ending before the cutoff get no new pairs
+        """
+        id1 = self.ids[0]
+        following = number + 1 - self.buffer_start[id1]
+        if following < 0:
+            return True
+        buffer = self.buffers[id1]
+        return following < len(buffer) and buffer[following].t1_ns < cutoff
+
+    def __trim(self, cutoff: int):
+        """
+        Drop the kept PPAs ending before the cutoff and the attributes of the points no longer referenced
+        """
+        for num, pid in enumerate(self.ids, 1):
+            buffer = self.buffers[pid]
+            n_dropped = int(np.searchsorted(ellipse_times(buffer)[1], cutoff, side="left"))
+            self.buffers[pid] = buffer[n_dropped:]
+            self.buffer_start[pid] += n_dropped
+            generator = self.generators[pid]
+            if generator.attrs is None:
+                continue
+            rows = [generator.last_row] + [e.last_row for e in self.buffers[pid]]
+            if self.pending is not None and len(self.pending[0]) > 0:
+                rows.append(int(self.pending[0][f'p{num}_start_row'].min()))
+            if num in self.held_rows:
+                rows.append(self.held_rows[num])
+            generator.attrs = generator.attrs.loc[min(rows):]
@@ -2,33 +2,114 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 from .ortega import ORTEGA
-from .ellipses import Ellipse
-from typing import List, Tuple
+from .ellipses import Ellipse, ellipse_parameters, ellipse_table, ellipse_polylines, ellipse_bounds
+from typing import Any, List, Tuple, Union
 import matplotlib.patches as mpatches
-import contextily as cx
+from matplotlib.collections import LineCollection
+from .basemap import add_basemap
 
 
-def plot_original_tracks(interation: ORTEGA, save_plot: bool = False, colors=["red", "blue"]):
+def decimate(n: int, max_items: Union[int, None]) -> np.ndarray:
+    """
+    Positions of at most max_items of n items, evenly spaced, for plotting a subset of many PPAs
+    :param n: number of items
+    :param max_items: maximum number of items to keep; None to keep all
+    :return: sorted positions of the kept items
+    """
+    if max_items is not None and (not isinstance(max_items, int) or max_items <= 0):
+        raise ValueError("Parameter 'max_ppas' must be a positive integer!")
+    if max_items is None or n <= max_items:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_items).round().astype(int))
+
+
+def pixel_size(ax, bounds: np.ndarray) -> float:
+    """
+    Size of one pixel of the axes in data units once it shows the given bounding boxes
+    :param ax: matplotlib axes
+    :param bounds: np.ndarray of shape (n, 4) with columns xmin, ymin, xmax, ymax in plot coordinates
+    :return: the larger of the horizontal and vertical pixel sizes
+    """
+    if len(bounds) == 0:
+        return 0.0
+    width = bounds[:, 2].max() - bounds[:, 0].min()
+    height = bounds[:, 3].max() - bounds[:, 1].min()
+    extent = ax.get_window_extent()
+    return max(width / max(extent.width, 1), height / max(extent.height, 1))
+
+
+def plot_ppas(ax, collections: List[List[Ellipse]], colors: List[str], max_ppas: int = None,
+              min_ppa_pixels: float = 0, segments: bool = True):
+    """
+    Draw the PPAs of several individuals as one LineCollection of ellipses per individual (and one of the segments
+    between the two points of each PPA), instead of one Line2D per PPA
+    :param ax: matplotlib axes
+    :param collections: list of Ellipse (or EllipseStore) of each individual
+    :param colors: color of the ellipses of each individual
+    :param max_ppas: if not None, draw at most this many evenly spaced PPAs of each individual
+    :param min_ppa_pixels: ellipses with a major axis shorter than this many pixels are not drawn, since they cannot
+        be told apart from their segment at the resolution of the figure
+    :param segments: if True, also draw the segments and the points used to make the ellipses
+    """
+    selected = []
+    for collection in collections:
+        index = decimate(len(collection), max_ppas)
+        params = [values[index] for values in ellipse_parameters(collection)]
+        # the ellipses are drawn with the longitude (y) on the horizontal axis, as the basemap
+        bounds = ellipse_bounds(*params)[:, [1, 0, 3, 2]]
+        selected.append((collection, index, params, bounds))
+    if min_ppa_pixels > 0:
+        min_major = min_ppa_pixels * pixel_size(ax, np.concatenate([s[3] for s in selected]))
+    else:
+        min_major = 0.0
+    for (collection, index, params, bounds), color in zip(selected, colors):
+        visible = params[2] >= min_major
+        rings = ellipse_polylines(*[values[visible] for values in params])[:, :, ::-1]
+        ax.add_collection(LineCollection(rings, colors=color, alpha=0.5, linewidths=1, capstyle="round"))
+        ax.update_datalim(bounds.reshape(-1, 2))
+        if segments and len(index) > 0:
+            table = ellipse_table(collection)
+            lines = np.stack([np.column_stack([table["lon"][index], table["lat"][index]]),
+                              np.column_stack([table["last_lon"][index], table["last_lat"][index]])],
+                             axis=1).astype(float)
+            ax.add_collection(LineCollection(lines, colors="grey", alpha=0.5, linewidths=0.5))
+            points = lines.reshape(-1, 2)
+            ax.plot(points[:, 0], points[:, 1], "o", linestyle="none", color="grey", alpha=0.5, markersize=1)
+    ax.autoscale_view()
+
+
+def draw_basemap(ax, crs: Any, basemap: Any):
+    """
+    Add the basemap of a plot
+    :param ax: matplotlib axes
+    :param crs: crs of the plotted coordinates
+    :param basemap: "contextily" to fetch the default contextily tiles over the network, None for no basemap, or a
+        local or cached tile source (see basemap.tile_source), e.g. an .mbtiles file, a tile directory or a CachedTiles
+    """
+    if basemap is None:
+        return
+    if isinstance(basemap, str) and basemap == "contextily":
+        import contextily as cx  # optional, only needed to fetch the tiles over the network
+        cx.add_basemap(ax, crs=crs)
+    else:
+        add_basemap(ax, crs, basemap)
+
+
+def plot_original_tracks(interation: ORTEGA, save_plot: bool = False, colors=["red", "blue"], max_ppas: int = None,
+                         min_ppa_pixels: float = 0, basemap: Any = "contextily"):
     """
     Visualize the original movement data with PPAs
-    :param figsize:
     :param colors:
     :param interation:
     :param save_plot:
+    :param max_ppas: if not None, draw at most this many evenly spaced PPAs of each individual
+    :param min_ppa_pixels: skip the ellipses smaller than this many pixels (their segment is still drawn)
+    :param basemap: see draw_basemap; None to plot without basemap
     :return:
     """
     fig, ax = plt.subplots(1)
-    for i, collection in enumerate([interation.ellipses_list_id1, interation.ellipses_list_id2]):
-        for item in collection:
-            # if throw_out_big_ellipses and item.el[0].length > max_val:
-            #     continue
-            x, y = item.el.xy
-            # PLOT THE ELLIPSES
-            plt.plot(y, x, color=colors[i], alpha=0.5, linewidth=1, solid_capstyle="round")
-            # PLOT THE POINTS USED TO MAKE THE ELLIPSES, TOO
-            plt.plot([item.lon, item.last_lon], [item.lat, item.last_lat], "o-", color="grey", linewidth=0.5,
-                     alpha=0.5, markersize=1)
-    cx.add_basemap(ax)
+    plot_ppas(ax, [interation.ellipses_list_id1, interation.ellipses_list_id2], colors, max_ppas, min_ppa_pixels)
+    draw_basemap(ax, interation.target_crs, basemap)
     plt.legend(handles=[mpatches.Patch(color=colors[0], label=interation.id1),
                         mpatches.Patch(color=colors[1], label=interation.id2)])
     if save_plot:
@@ -37,7 +118,8 @@ def plot_original_tracks(interation: ORTEGA, save_plot: bool = False, colors=["r
 
 
 def plot_interaction(interation: ORTEGA, all_intersection_pairs: List[Tuple[Ellipse, Ellipse]],
-                     save_plot: bool = False, colors=["red", "blue", "yellow"]):
+                     save_plot: bool = False, colors=["red", "blue", "yellow"], max_ppas: int = None,
+                     min_ppa_pixels: float = 0, basemap: Any = "contextily"):
     """
     Visualize interaction. The PPAs of two moving individuals are shown using red and blue ellipses, respectively.
     PPA intersections marking potential interactions are highlighted using yellow ellipses.
@@ -45,25 +127,16 @@ def plot_interaction(interation: ORTEGA, all_intersection_pairs: List[Tuple[Elli
     :param interation:
     :param all_intersection_pairs:
     :param save_plot:
+    :param max_ppas: if not None, draw at most this many evenly spaced PPAs of each individual (and of the highlights)
+    :param min_ppa_pixels: skip the ellipses smaller than this many pixels (their segment is still drawn)
+    :param basemap: see draw_basemap; None to plot without basemap
     :return:
     """
-    # interaction_color = "yellow"
     fig, ax = plt.subplots(1)
-    for i, collection in enumerate([interation.ellipses_list_id1, interation.ellipses_list_id2]):
-        for item in collection:
-            # if throw_out_big_ellipses and item.el[0].length > max_val:
-            #     continue
-            x, y = item.el.xy
-            # PLOT THE ELLIPSES
-            plt.plot(y, x, color=colors[i], alpha=0.5, linewidth=1, solid_capstyle="round")
-            # PLOT THE POINTS USED TO MAKE THE ELLIPSES, TOO
-            plt.plot([item.lon, item.last_lon], [item.lat, item.last_lat], "o-", color="grey", linewidth=0.5,
-                     alpha=0.5, markersize=1)
-    for two_item in all_intersection_pairs:
-        for item in two_item:
-            x1, y1 = item.el.xy
-            plt.plot(y1, x1, color=colors[-1], alpha=0.5, linewidth=1, solid_capstyle="round")
-    cx.add_basemap(ax)
+    plot_ppas(ax, [interation.ellipses_list_id1, interation.ellipses_list_id2], colors, max_ppas, min_ppa_pixels)
+    highlights = [item for two_item in all_intersection_pairs for item in two_item]
+    plot_ppas(ax, [highlights], colors[-1:], max_ppas, min_ppa_pixels, segments=False)
+    draw_basemap(ax, interation.target_crs, basemap)
     plt.legend(handles=[mpatches.Patch(color=colors[0], label=interation.id1),
                         mpatches.Patch(color=colors[1], label=interation.id2)])
     if save_plot:
@@ -13,9 +13,10 @@ if __name__ == "__main__":
         install_requires=[
             "numpy",
             "pandas",
-            "shapely",
+            "shapely>=2.0",
             "attrs",
             "matplotlib",
+            "pyproj",
             "typing_extensions",
         ],
     )
@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_tracks
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "examples", "data", "two_turkey_vultures_fallmigration.csv")
+
+
+@pytest.fixture(scope="session")
+def vultures() -> pd.DataFrame:
+    # the two turkey vultures of the example notebook, sorted by time
+    df = pd.read_csv(DATA)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+@pytest.fixture(scope="session")
+def vulture_fields() -> dict:
+    return dict(id_field="individual_local_identifier", time_field="timestamp")
+
+
+@pytest.fixture(scope="session")
+def synthetic() -> pd.DataFrame:
+    # two seeded co-moving tracks in meters, with tracking gaps and different sampling intervals
+    return synthetic_tracks(4000, n_individuals=2, seed=0)
+
+
+@pytest.fixture(scope="session")
+def group() -> pd.DataFrame:
+    # three seeded co-moving tracks in meters, sorted by pid
+    return synthetic_tracks(3000, n_individuals=3, seed=1)
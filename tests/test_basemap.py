@@ -0,0 +1,32 @@
+import pytest
+from ortega.basemap import CachedTiles, TileDirectory, TileSource
+
+
+def test_tile_source_is_abstract():
+    with pytest.raises(TypeError):
+        TileSource()
+
+
+def test_cached_tiles_saves_fetched_tiles(tmp_path):
+    server = tmp_path / "server"
+    (server / "3" / "2").mkdir(parents=True)
+    (server / "3" / "2" / "1.png").write_bytes(b"tile")
+    cache = tmp_path / "cache"
+
+    tiles = CachedTiles(server.as_uri() + "/{z}/{x}/{y}.png", str(cache))
+    assert tiles.tile(3, 2, 1) == b"tile"
+    assert TileDirectory(str(cache)).tile(3, 2, 1) == b"tile"
+    # once saved, the tile is read from the cache without fetching it again
+    (server / "3" / "2" / "1.png").unlink()
+    assert tiles.tile(3, 2, 1) == b"tile"
+
+
+def test_cached_tiles_offline(tmp_path):
+    tiles = CachedTiles("https://tiles.invalid/{z}/{x}/{y}.png", str(tmp_path), offline=True)
+    assert tiles.tile(3, 2, 1) is None
+
+
+def test_cached_tiles_unreachable(tmp_path):
+    tiles = CachedTiles((tmp_path / "missing").as_uri() + "/{z}/{x}/{y}.png", str(tmp_path / "cache"))
+    with pytest.raises(ConnectionError, match="offline=True"):
+        tiles.tile(3, 2, 1)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ortega import ORTEGAGroup
+from ortega.cache import PPACache
+from ortega.ellipses import EllipseList, EllipseStore
+
+
+@pytest.mark.parametrize("speed_average", [False, True])
+def test_generate_store_equals_generate_batch(synthetic, tmp_path, speed_average):
+    track = synthetic[synthetic["pid"] == 1]
+    fields = ("latitude", "longitude", "pid", "time_local", ["speed"])
+    kwargs = dict(max_el_time_min=30, speed_average=speed_average)
+    ellipses = EllipseList(*fields)
+    expected = EllipseStore.from_ellipses({1: ellipses.generate_batch(track.iloc[:1500], **kwargs)})
+    expected_next = ellipses.generate_batch(track.iloc[1500:], **kwargs)[len(expected):]
+
+    cache = PPACache(str(tmp_path))
+    for hits in [0, 1]:
+        store_ellipses = EllipseList(*fields)
+        store = store_ellipses.generate_store(track.iloc[:1500], cache=cache, **kwargs)
+        assert cache.hits == hits
+        assert isinstance(store.records, np.memmap) == bool(hits)
+        assert store.ids == [1]
+        np.testing.assert_array_equal(np.asarray(store.records), expected.records)
+        pd.testing.assert_frame_equal(store_ellipses.attrs, ellipses.attrs.iloc[:1500])
+        # the next points continue from the last point of the store
+        assert store_ellipses.generate_batch(track.iloc[1500:], **kwargs) == expected_next
+
+
+def test_group_store_with_cache(synthetic, tmp_path):
+    kwargs = dict(minute_min_delay=0, minute_max_delay=10, max_el_time_min=30)
+    expected = ORTEGAGroup(synthetic, **kwargs).interaction_analysis()
+    cache = PPACache(str(tmp_path))
+    for hits in [0, 2]:
+        results = ORTEGAGroup(synthetic, cache=cache, store=True, **kwargs).interaction_analysis()
+        assert cache.hits == hits
+        pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+        pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
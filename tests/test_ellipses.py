@@ -0,0 +1,259 @@
+import pickle
+import numpy as np
+import shapely
+import pandas as pd
+import pytest
+from ortega import ORTEGA
+from shapely.geometry import Point
+from ortega.ellipses import EllipseList, EllipseStore, ellipse_parameters, ellipse_polygons, ellipse_polyline, \
+    ellipse_polylines, vertex_count
+from ortega.ortega import get_intersection_index, get_spatial_intersect_pairs
+
+
+def assert_same_ellipses(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert (a.pid, a.last_pid, a.t0, a.t1, a.row, a.last_row) == (e.pid, e.last_pid, e.t0, e.t1, e.row, e.last_row)
+        np.testing.assert_allclose([a.lat, a.lon, a.last_lat, a.last_lon, a.speed, a.direction, a.geom.area],
+                                   [e.lat, e.lon, e.last_lat, e.last_lon, e.speed, e.direction, e.geom.area],
+                                   rtol=1e-10)
+
+
+def generate_in_parts(method: str, df: pd.DataFrame, split: int, fields: tuple, **kwargs):
+    # the second call continues the PPAs from the last point of the first one
+    ellipses = EllipseList(*fields)
+    getattr(ellipses, method)(df.iloc[:split], **kwargs)
+    return getattr(ellipses, method)(df.iloc[split:], **kwargs)
+
+
+@pytest.mark.parametrize("speed_average", [False, True])
+@pytest.mark.parametrize("split", [None, 1, 400])
+def test_generate_batch_equals_generate_vultures(vultures, vulture_fields, speed_average, split):
+    df = vultures[vultures[vulture_fields["id_field"]] == vultures[vulture_fields["id_field"]].iloc[0]]
+    split = len(df) if split is None else split
+    fields = ("latitude", "longitude", vulture_fields["id_field"], vulture_fields["time_field"], ["speed"])
+    kwargs = dict(max_el_time_min=120, speed_average=speed_average)
+    assert_same_ellipses(generate_in_parts("generate_batch", df, split, fields, **kwargs),
+                         generate_in_parts("generate", df, split, fields, **kwargs))
+
+
+@pytest.mark.parametrize("speed_average", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_generate_batch_equals_generate_synthetic(speed_average, seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 300))
+    steps = rng.choice([60, 120, 5 * 3600], n, p=[0.7, 0.2, 0.1])
+    df = pd.DataFrame({
+        "lat": np.cumsum(rng.choice([0, 1], n) * rng.normal(size=n)),  # with repeated points
+        "lon": np.cumsum(rng.normal(size=n)),
+        "t": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.cumsum(steps), unit="s"),
+        "pid": rng.choice(["a", "b"], n, p=[0.9, 0.1]),
+        "v": rng.normal(size=n),
+    })
+    split = int(rng.integers(0, n))
+    fields = ("lat", "lon", "pid", "t", ["v"])
+    kwargs = dict(max_el_time_min=100, speed_average=speed_average)
+    assert_same_ellipses(generate_in_parts("generate_batch", df, split, fields, **kwargs),
+                         generate_in_parts("generate", df, split, fields, **kwargs))
+
+
+@pytest.mark.parametrize("analytic", [False, True])
+def test_append_equals_ortega(synthetic, analytic):
+    kwargs = dict(minute_min_delay=0, minute_max_delay=10, max_el_time_min=30, attr_fields=["speed"])
+    full = ORTEGA(synthetic, **kwargs)
+    expected = full.interaction_analysis(analytic=analytic)
+
+    split = synthetic["time_local"].iloc[len(synthetic) * 2 // 3]
+    interaction = ORTEGA(synthetic[synthetic["time_local"] < split], **kwargs)
+    interaction.interaction_analysis(analytic=analytic)
+    results = interaction.append(synthetic[synthetic["time_local"] >= split], analytic=analytic)
+    assert_same_ellipses(interaction.ellipses_list, full.ellipses_list)
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+
+@pytest.mark.parametrize("n_chunks", [3, 20])
+def test_append_in_chunks_equals_ortega(vultures, vulture_fields, n_chunks):
+    # each append inserts new pairs among the previous ones and continues the events across the chunks
+    kwargs = dict(minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857, attr_fields=["speed"],
+                  **vulture_fields)
+    expected = ORTEGA(vultures, **kwargs).interaction_analysis()
+    first = int((vultures[vulture_fields["time_field"]] < "2013-10-09").sum())  # after the first interactions
+    interaction = ORTEGA(vultures.iloc[:first], **kwargs)
+    results = interaction.interaction_analysis()
+    results.compute_interaction_duration()
+    for chunk in np.array_split(np.arange(first, len(vultures)), n_chunks):
+        updated = interaction.append(vultures.iloc[chunk])
+        assert results is None or updated is results
+        results = updated
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+    assert results.intersection_ellipse_pair == expected.intersection_ellipse_pair
+    results.attach_attributes("speed", "mean")
+    expected.attach_attributes("speed", "mean")
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+
+def test_to_dict_resolves_attributes(vultures, vulture_fields):
+    df = vultures[vultures[vulture_fields["id_field"]] == vultures[vulture_fields["id_field"]].iloc[0]]
+    ellipses = EllipseList("latitude", "longitude", vulture_fields["id_field"], vulture_fields["time_field"],
+                           ["speed", "stepLength"])
+    ellipses.generate_batch(df.iloc[:100], max_el_time_min=120)
+    ellipses.generate_batch(df.iloc[100:], max_el_time_min=120)
+    for e, as_dict in zip(ellipses.list, ellipses.to_dicts()):
+        assert as_dict["attrs"] == df[["speed", "stepLength"]].iloc[e.row].to_dict()
+        assert as_dict["last_attrs"] == df[["speed", "stepLength"]].iloc[e.last_row].to_dict()
+        assert e.to_dict()["attrs"] is None
+
+
+@pytest.fixture(scope="module")
+def vulture_ppas(vultures, vulture_fields):
+    interaction = ORTEGA(vultures, minute_max_delay=60, max_el_time_min=120, crs=3857, **vulture_fields)
+    return {interaction.id1: interaction.ellipses_list_id1, interaction.id2: interaction.ellipses_list_id2}
+
+
+def test_store_from_ellipses(vulture_ppas):
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    flat = [e for ellipses in vulture_ppas.values() for e in ellipses]
+    assert store.ids == list(vulture_ppas)
+    assert store.directory is None
+    assert len(store) == len(flat)
+    assert list(store) == flat
+    assert_same_ellipses(list(store), flat)
+    # a flat list is grouped by id
+    assert list(EllipseStore.from_ellipses(flat)) == flat
+    np.testing.assert_array_equal(EllipseStore.from_ellipses(flat).records, store.records)
+
+
+def test_store_individual_and_slices_are_views(vulture_ppas):
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    for pid, ellipses in vulture_ppas.items():
+        individual = store.individual(pid)
+        assert np.shares_memory(individual.records, store.records)
+        assert individual.records.base is store.records
+        assert list(individual) == ellipses
+    part = store[3:50]
+    assert np.shares_memory(part.records, store.records)
+    assert list(part) == list(store)[3:50]
+    assert store[7] == list(store)[7]
+    with pytest.raises(ValueError, match="contiguous"):
+        store[::2]
+    with pytest.raises(KeyError):
+        store.individual("unknown")
+
+
+def test_store_take(vulture_ppas):
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    flat = list(store)
+    taken = store.take(np.array([5, 2, len(store) - 1, 5]))
+    assert taken == [flat[5], flat[2], flat[-1], flat[5]]
+    # a position given twice gives the same object
+    assert taken[0] is taken[3]
+    assert store.take(np.array([], dtype=int)) == []
+
+
+def test_store_save_and_load(vulture_ppas, tmp_path):
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    store.save(str(tmp_path / "saved"))
+    loaded = EllipseStore.load(str(tmp_path / "saved"))
+    assert isinstance(loaded.records, np.memmap)
+    assert loaded.directory == str(tmp_path / "saved")
+    assert loaded.ids == store.ids
+    np.testing.assert_array_equal(loaded.offsets, store.offsets)
+    np.testing.assert_array_equal(loaded.records, store.records)
+    assert list(loaded.individual(store.ids[1])) == list(store.individual(store.ids[1]))
+    in_memory = EllipseStore.load(str(tmp_path / "saved"), mmap_mode=None)
+    assert not isinstance(in_memory.records, np.memmap) and in_memory.directory is None
+    np.testing.assert_array_equal(in_memory.records, store.records)
+    # a store created in a directory is memory-mapped from it
+    mapped = EllipseStore.from_ellipses(vulture_ppas, directory=str(tmp_path / "mapped"))
+    assert isinstance(mapped.records, np.memmap)
+    np.testing.assert_array_equal(EllipseStore.load(str(tmp_path / "mapped")).records, store.records)
+
+
+def test_store_pickles_by_directory(vulture_ppas, tmp_path):
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    mapped = EllipseStore.from_ellipses(vulture_ppas, directory=str(tmp_path))
+    mapped_bytes, store_bytes = pickle.dumps(mapped), pickle.dumps(store)
+    assert len(mapped_bytes) < 1000 < store.records.nbytes <= len(store_bytes)
+    for restored in [pickle.loads(mapped_bytes), pickle.loads(store_bytes)]:
+        assert restored.ids == store.ids
+        np.testing.assert_array_equal(restored.records, store.records)
+    assert isinstance(pickle.loads(mapped_bytes).records, np.memmap)
+    assert pickle.loads(mapped_bytes).directory == str(tmp_path)
+
+
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", [(0, 60), (0, 5000), (1000, 5000)])
+@pytest.mark.parametrize("analytic", [False, True])
+def test_intersection_index_of_store_equals_lists(vulture_ppas, minute_min_delay, minute_max_delay, analytic):
+    (id1, ellipses1), (id2, ellipses2) = vulture_ppas.items()
+    store = EllipseStore.from_ellipses(vulture_ppas)
+    expected = get_intersection_index(ellipses1, ellipses2, minute_min_delay, minute_max_delay, analytic=analytic)
+    index1, index2 = get_intersection_index(store.individual(id1), store.individual(id2), minute_min_delay,
+                                            minute_max_delay, analytic=analytic)
+    assert len(expected[0]) > 0
+    np.testing.assert_array_equal(index1, expected[0])
+    np.testing.assert_array_equal(index2, expected[1])
+
+
+@pytest.mark.parametrize("n", [8, 100, 1024])
+def test_ellipse_polylines_equal_ellipse_polyline(vulture_ppas, n):
+    ellipses = [e for ellipses in vulture_ppas.values() for e in ellipses][:300]
+    cx, cy, major, minor, angle = ellipse_parameters(ellipses)
+    polylines = ellipse_polylines(cx, cy, major, minor, angle, n)
+    assert polylines.shape == (len(ellipses), n + 1, 2)
+    for polyline, e in zip(polylines, ellipses):
+        expected = ellipse_polyline(Point((e.lat + e.last_lat) / 2, (e.lon + e.last_lon) / 2), e.major, e.minor,
+                                    e.direction, n)
+        np.testing.assert_array_equal(polyline[:-1], expected)
+        np.testing.assert_array_equal(polyline[-1], expected[0])
+    # without a tolerance the polygons are the ones of Ellipse.geom
+    if n == 100:
+        polygons = ellipse_polygons(cx, cy, major, minor, angle)
+        assert all(shapely.equals_exact(polygons, [e.geom for e in ellipses], tolerance=0))
+
+
+def test_vertex_count_clamps():
+    major = np.array([0, 1e-9, 2, 10, 1e3, 1e6, 1e12])
+    np.testing.assert_array_equal(vertex_count(major), np.full(major.shape, 100))
+    # a tolerance larger than the semi-major axis needs the fewest vertices, a tiny one the most
+    np.testing.assert_array_equal(vertex_count(major[:-1], tolerance=1e9), np.full(6, 8))
+    np.testing.assert_array_equal(vertex_count(major[2:], tolerance=0), np.full(5, 1024))
+    # a * (1 - cos(pi / n)) <= 1 needs n >= 49.7 for a = 500 and n >= 496.7 for a = 5e4
+    np.testing.assert_array_equal(vertex_count(np.array([2, 1e3, 1e5, 1e6]), tolerance=1), [8, 56, 504, 1024])
+    np.testing.assert_array_equal(vertex_count(np.array([0.0]), tolerance=0), [8])
+
+
+def test_vertex_count_is_the_fewest_multiple_of_8_within_tolerance():
+    rng = np.random.default_rng(0)
+    major = rng.uniform(1, 1e5, 1000)
+    tolerance = 5.0
+    n = vertex_count(major, tolerance)
+    assert (n % 8 == 0).all() and n.min() >= 8 and n.max() <= 1024
+    error = major / 2 * (1 - np.cos(np.pi / n))  # largest distance between the ellipse and its polygon
+    inside = n < 1024
+    assert (error[inside] <= tolerance * (1 + 1e-12)).all()
+    fewer = n[inside] > 8
+    assert (major[inside][fewer] / 2 * (1 - np.cos(np.pi / (n[inside][fewer] - 8))) > tolerance).all()
+    # the polygons are within the tolerance of the ellipses
+    cx, cy, angle = np.zeros(20), np.zeros(20), rng.uniform(0, 180, 20)
+    minor = major[:20] * rng.uniform(0.1, 1, 20)
+    fine = ellipse_polygons(cx, cy, major[:20], minor, angle, tolerance=1e-6)
+    coarse = ellipse_polygons(cx, cy, major[:20], minor, angle, tolerance=tolerance)
+    assert (shapely.hausdorff_distance(fine, coarse) <= tolerance + 1e-3).all()
+
+
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", [(0, 60), (0, 5000), (1000, 5000)])
+def test_default_vertex_tolerance_keeps_pairs(vultures, vulture_fields, minute_min_delay, minute_max_delay):
+    kwargs = dict(minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay, max_el_time_min=120,
+                  crs=3857, **vulture_fields)
+    interaction = ORTEGA(vultures, vertex_tolerance=None, **kwargs)
+    results = interaction.interaction_analysis()
+    # the pairs of the 100-vertex polygons of Ellipse.geom
+    expected = get_spatial_intersect_pairs(interaction.ellipses_list_id1, interaction.ellipses_list_id2,
+                                           brute_force=True)
+    expected = {(p1.t0, p2.t0) for p1, p2 in expected if minute_min_delay * 60 <= abs((p2.t1 - p1.t1).total_seconds())
+                <= minute_max_delay * 60}
+    assert {(p1.t0, p2.t0) for p1, p2 in results.intersection_ellipse_pair} == expected
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs,
+                                  ORTEGA(vultures, **kwargs).interaction_analysis().df_all_intersection_pairs)
@@ -0,0 +1,121 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from ortega.STPoint import STPoint
+from ortega.common import haversine
+from ortega.geodesic import bearing, equirectangular_distance, euclidean_distance, haversine_distance, \
+    pairwise_distances, point_to_track_distance, step_distances, step_speeds
+
+
+def scalar_haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # the scalar formula common.haversine used before it took arrays
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * 6371 * 1000
+
+
+def scalar_equirectangular(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(x, math.radians(lat2 - lat1)) * 6371 * 1000
+
+
+def scalar_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    y = math.sin(lon2 - lon1) * math.cos(lat2)
+    x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(lon2 - lon1)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def random_points(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-89, 89, n), rng.uniform(-180, 180, n), rng.uniform(-89, 89, n), rng.uniform(-180, 180, n)
+
+
+def test_haversine_distance_equals_scalar_formula():
+    lat1, lon1, lat2, lon2 = random_points(1000)
+    expected = [scalar_haversine(*p) for p in zip(lat1, lon1, lat2, lon2)]
+    np.testing.assert_allclose(haversine_distance(lat1, lon1, lat2, lon2), expected, rtol=1e-12, atol=1e-6)
+    np.testing.assert_allclose(haversine(lat1, lon1, lat2, lon2), expected, rtol=1e-12, atol=1e-6)
+    assert math.isclose(haversine(lat1[0], lon1[0], lat2[0], lon2[0]), expected[0], rel_tol=1e-12)
+    # antipodal points are half the circumference apart
+    assert math.isclose(haversine_distance(0, 0, 0, 180), math.pi * 6371000)
+
+
+def test_euclidean_distance_equals_stpoint():
+    lat1, lon1, lat2, lon2 = random_points(1000, seed=1)
+    expected = [STPoint(a, b, None, 0).euclidean_distance(STPoint(c, d, None, 0))
+                for a, b, c, d in zip(lat1, lon1, lat2, lon2)]
+    np.testing.assert_allclose(euclidean_distance(lat1, lon1, lat2, lon2), expected, rtol=1e-14)
+
+
+def test_step_distances_equal_stpoint(synthetic):
+    track = synthetic[synthetic["pid"] == 0]
+    lat, lon = track["latitude"].to_numpy(), track["longitude"].to_numpy()
+    points = [STPoint(a, b, pd.NaT, 0) for a, b in zip(lat, lon)]
+    expected = [p2.euclidean_distance(p1) for p1, p2 in zip(points[:-1], points[1:])]
+    np.testing.assert_allclose(step_distances(lat, lon), expected, rtol=1e-14)
+    assert step_distances(lat[:1], lon[:1]).shape == (0,)
+
+
+def test_equirectangular_distance_equals_scalar_formula():
+    lat1, lon1, lat2, lon2 = random_points(1000, seed=2)
+    expected = [scalar_equirectangular(*p) for p in zip(lat1, lon1, lat2, lon2)]
+    np.testing.assert_allclose(equirectangular_distance(lat1, lon1, lat2, lon2), expected, rtol=1e-12)
+    # close to the great circle distance over short steps
+    lat2, lon2 = lat1 + 0.01, lon1 + 0.01
+    np.testing.assert_allclose(equirectangular_distance(lat1, lon1, lat2, lon2),
+                               haversine_distance(lat1, lon1, lat2, lon2), rtol=1e-4)
+
+
+def test_bearing_equals_scalar_formula():
+    lat1, lon1, lat2, lon2 = random_points(1000, seed=3)
+    expected = [scalar_bearing(*p) for p in zip(lat1, lon1, lat2, lon2)]
+    actual = bearing(lat1, lon1, lat2, lon2)
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
+    assert ((actual >= 0) & (actual < 360)).all()
+    assert [float(bearing(0, 0, 1, 0)), float(bearing(0, 0, 0, 1)), float(bearing(0, 0, -1, 0)),
+            float(bearing(0, 0, 0, -1))] == pytest.approx([0, 90, 180, 270])
+
+
+def test_step_speeds_equal_scalar_speeds(synthetic):
+    track = synthetic[synthetic["pid"] == 0]
+    lat, lon = track["latitude"].to_numpy(), track["longitude"].to_numpy()
+    t = track["time_local"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    points = [STPoint(a, b, time, 0) for a, b, time in zip(lat, lon, track["time_local"])]
+    expected = [p2.average_speed(p1) for p1, p2 in zip(points[:-1], points[1:])]
+    np.testing.assert_allclose(step_speeds(lat, lon, t), expected, rtol=1e-12)
+    lat, lon = lat / 1e5, lon / 1e5  # as degrees
+    expected = [scalar_haversine(lat[i], lon[i], lat[i + 1], lon[i + 1]) / ((t[i + 1] - t[i]) / 1e9)
+                for i in range(len(lat) - 1)]
+    np.testing.assert_allclose(step_speeds(lat, lon, t, method="haversine"), expected, rtol=1e-9)
+
+
+def test_pairwise_and_point_to_track_distances_equal_scalar_loops():
+    lat1, lon1, lat2, lon2 = random_points(300, seed=4)
+    track_lat, track_lon = lat2[:70], lon2[:70]
+    expected = np.array([[scalar_haversine(a, b, c, d) for c, d in zip(track_lat, track_lon)]
+                         for a, b in zip(lat1, lon1)])
+    np.testing.assert_allclose(pairwise_distances(lat1, lon1, track_lat, track_lon, method="haversine"), expected,
+                               rtol=1e-12, atol=1e-6)
+    # the chunks of point_to_track_distance do not change the result
+    for chunk_size in [1, 7, 1024]:
+        np.testing.assert_allclose(point_to_track_distance(lat1, lon1, track_lat, track_lon, method="haversine",
+                                                           chunk_size=chunk_size),
+                                   expected.min(axis=1), rtol=1e-12, atol=1e-6)
+    with pytest.raises(ValueError, match="Parameter 'method' must be one of these"):
+        pairwise_distances(lat1, lon1, track_lat, track_lon, method="vincenty")
+    with pytest.raises(ValueError, match="at least one point"):
+        point_to_track_distance(lat1, lon1, [], [])
+
+
+@pytest.mark.parametrize("kernel", [euclidean_distance, haversine_distance, equirectangular_distance, bearing])
+def test_float32_kernels_stay_float32(kernel):
+    lat1, lon1, lat2, lon2 = random_points(1000, seed=5)
+    expected = kernel(lat1, lon1, lat2, lon2)
+    actual = kernel(*(a.astype(np.float32) for a in [lat1, lon1, lat2, lon2]), dtype=np.float32)
+    assert actual.dtype == np.float32 and expected.dtype == np.float64
+    # bearings of nearly antipodal points are ill-conditioned: compare the distances only
+    if kernel is not bearing:
+        np.testing.assert_allclose(actual, expected, rtol=1e-3, atol=1)
+    assert step_distances(lat1, lon1, method="haversine", dtype=np.float32).dtype == np.float32
@@ -0,0 +1,82 @@
+import pickle
+import pandas as pd
+import pytest
+from ortega import ORTEGA, ORTEGAGroup, ORTEGAResults
+
+KWARGS = dict(minute_min_delay=0, minute_max_delay=10, max_el_time_min=30, attr_fields=["speed"])
+
+
+def assert_same_results(results, expected):
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+    assert results.attributes.keys() == expected.attributes.keys()
+    for pid, attrs in expected.attributes.items():
+        pd.testing.assert_frame_equal(results.attributes[pid], attrs)
+
+
+@pytest.mark.parametrize("store", [False, True, "directory"])
+def test_workers_equal_one_process(group, tmp_path, store):
+    # with a directory the store is memory-mapped and pickled to the workers by its directory
+    store = str(tmp_path) if store == "directory" else store
+    interaction = ORTEGAGroup(group, store=store, **KWARGS)
+    if store == str(tmp_path):
+        assert interaction.ellipses_lists.directory == store
+        assert len(pickle.dumps(interaction.ellipses_lists)) < 1000
+    expected = interaction.interaction_analysis(n_workers=1)
+    assert expected.df_all_intersection_pairs.shape[0] > 0
+    for chunksize in [1, 2]:
+        results = interaction.interaction_analysis(n_workers=2, chunksize=chunksize)
+        assert_same_results(results, expected)
+        assert [(p1.t0, p2.t0) for p1, p2 in results.intersection_ellipse_pair] == \
+               [(p1.t0, p2.t0) for p1, p2 in expected.intersection_ellipse_pair]
+        results.attach_attributes("speed", "mean")
+        expected_attached = interaction.interaction_analysis(n_workers=1)
+        expected_attached.attach_attributes("speed", "mean")
+        pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected_attached.df_all_intersection_pairs)
+
+
+def pair_slice(df: pd.DataFrame, id1, id2) -> pd.DataFrame:
+    return df[(df["p1"] == id1) & (df["p2"] == id2)].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("reference", [None, 2])
+def test_pairs_equal_standalone_ortega(group, reference):
+    interaction = ORTEGAGroup(group, **KWARGS)
+    results = interaction.interaction_analysis(reference=reference)
+    pairs = interaction.get_pairs(reference)
+    assert pairs == ([(0, 1), (0, 2), (1, 2)] if reference is None else [(2, 0), (2, 1)])
+    for id1, id2 in pairs:
+        # the first id of the data is id1 of ORTEGA
+        data = pd.concat([group[group["pid"] == id1], group[group["pid"] == id2]])
+        expected = ORTEGA(data, **KWARGS).interaction_analysis()
+        pd.testing.assert_frame_equal(pair_slice(results.df_all_intersection_pairs, id1, id2),
+                                      expected.df_all_intersection_pairs)
+        pd.testing.assert_frame_equal(pair_slice(results.df_interaction_events, id1, id2),
+                                      expected.df_interaction_events)
+        for pid in [id1, id2]:
+            pd.testing.assert_frame_equal(results.attributes[pid], expected.attributes[pid])
+    assert sorted(results.df_all_intersection_pairs[["p1", "p2"]].drop_duplicates().itertuples(index=False)) == \
+           sorted(pairs)
+
+
+def test_concat_keeps_ids_and_attributes(group):
+    interaction = ORTEGAGroup(group, **KWARGS)
+    parts = [interaction.pair_analysis(id1, id2) for id1, id2 in interaction.get_pairs()]
+    results = ORTEGAResults.concat(parts + [None])
+    assert results.df_all_intersection_pairs.shape[0] == sum(p.df_all_intersection_pairs.shape[0] for p in parts)
+    assert list(results.df_all_intersection_pairs[["p1", "p2"]].drop_duplicates().itertuples(index=False, name=None)) == \
+           interaction.get_pairs()
+    assert list(results.df_interaction_events[["p1", "p2"]].drop_duplicates().itertuples(index=False, name=None)) == \
+           interaction.get_pairs()
+    assert len(results.intersection_ellipse_pair) == results.df_all_intersection_pairs.shape[0]
+    assert sorted(results.attributes) == [0, 1, 2]
+    for pid, attrs in results.attributes.items():
+        pd.testing.assert_frame_equal(attrs, interaction.attributes[pid])
+    # the attributes of every pair are found in the combined tables
+    results.attach_attributes("speed", "max")
+    attached = []
+    for part in parts:
+        part.attach_attributes("speed", "max")
+        attached.append(part.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, pd.concat(attached, ignore_index=True))
+    assert ORTEGAResults.concat([None, None]) is None
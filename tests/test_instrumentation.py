@@ -0,0 +1,18 @@
+from ortega.instrumentation import Recorder
+
+
+def test_nested_stage_keeps_outer_peak():
+    recorder = Recorder(track_memory=True)
+    with recorder.stage("outer"):
+        block = bytearray(20 * 2 ** 20)
+        del block
+        with recorder.stage("inner"):
+            with recorder.stage("innermost"):
+                block = bytearray(10 * 2 ** 20)
+                del block
+        block = bytearray(2 ** 20)
+        del block
+    peaks = {stage.name: stage.peak_mb for stage in recorder.metrics}
+    assert peaks["innermost"] >= 10
+    assert 10 <= peaks["inner"] < 20
+    assert peaks["outer"] >= 20
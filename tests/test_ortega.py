@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ortega import ORTEGA, ORTEGAGroup, ORTEGAResults, ORTEGAStream, Instrumentation
+from ortega.ortega import check_continuous, get_spatial_intersect_pairs, last_segment_start, segment_starts
+
+DELAYS = [(0, 60), (0, 5000), (1000, 5000)]
+
+
+def pair_keys(results):
+    if results is None:
+        return set()
+    return {(p1.t0, p2.t0) for p1, p2 in results.intersection_ellipse_pair}
+
+
+def baseline_check_continuous(df: pd.DataFrame, id1, id2) -> pd.DataFrame:
+    # the rules of the loop implementation check_continuous replaced, comparing the times directly (the loops parsed
+    # them with '%Y-%m-%d %H:%M:%S', which drops sub-second times)
+    p1start, p1end = df["p1_t_start"].tolist(), df["p1_t_end"].tolist()
+    p2start, p2end = df["p2_t_start"].tolist(), df["p2_t_end"].tolist()
+    p1_segments = []
+    first = 0
+    for i in range(1, len(p1start)):
+        p1_continued = p1start[i] == p1start[i - 1] or p1end[i - 1] == p1start[i]
+        p2_continued = p2start[i] == p2start[i - 1] or p2end[i - 1] == p2start[i] or p2start[i - 1] == p2end[i]
+        if not (p1_continued and p2_continued):
+            p1_segments.append((first, i - 1))
+            first = i
+    p1_segments.append((first, len(p1start) - 1))
+
+    rows = []
+    for first, last in p1_segments:
+        starts, ends = sorted(p2start[first:last + 1]), sorted(p2end[first:last + 1])
+        p2_first = 0
+        for m in range(1, len(starts) + 1):
+            if m < len(starts) and (starts[m] == starts[m - 1] or ends[m - 1] == starts[m]):
+                continue
+            rows.append((id1, id2, p1start[first], p1end[last], starts[p2_first], ends[m - 1],
+                         pd.Timedelta(starts[p2_first] - p1start[first]).total_seconds() / 60))
+            p2_first = m
+    return pd.DataFrame(rows, columns=["p1", "p2", "p1_start", "p1_end", "p2_start", "p2_end", "difference"])
+
+
+def random_pairs(rng: np.random.Generator, step: pd.Timedelta, sort: bool) -> pd.DataFrame:
+    # PPAs on a regular time grid, pairs in the order of intersection_table (by id1 then id2 PPA) or shuffled
+    n = int(rng.integers(1, 60))
+    i1, i2 = np.sort(rng.integers(0, 30, n)), rng.integers(0, 30, n)
+    order = np.lexsort((i2, i1)) if sort else rng.permutation(n)
+    i1, i2 = i1[order], i2[order]
+    base = pd.Timestamp("2020-01-01")
+    return pd.DataFrame({
+        "p1_t_start": base + step * i1,
+        "p1_t_end": base + step * (i1 + 1),
+        "p2_t_start": base + step * i2,
+        "p2_t_end": base + step * (i2 + rng.integers(1, 3, n)),
+    })
+
+
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", DELAYS)
+def test_indexed_pairs_equal_brute_force_vultures(vultures, vulture_fields, minute_min_delay, minute_max_delay):
+    interaction = ORTEGA(vultures, minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay,
+                         max_el_time_min=120, crs=3857, **vulture_fields)
+    assert get_spatial_intersect_pairs(interaction.ellipses_list_id1, interaction.ellipses_list_id2) == \
+           get_spatial_intersect_pairs(interaction.ellipses_list_id1, interaction.ellipses_list_id2, brute_force=True)
+    expected = interaction.interaction_analysis(brute_force=True)
+    results = interaction.interaction_analysis()
+    assert pair_keys(results) == pair_keys(expected)
+    if expected is not None:
+        pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+        pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+def test_indexed_pairs_equal_brute_force_synthetic(synthetic):
+    first_day = synthetic[synthetic["time_local"] < synthetic["time_local"].min() + pd.Timedelta(days=1)]
+    interaction = ORTEGA(first_day, minute_min_delay=0, minute_max_delay=10, max_el_time_min=30)
+    expected = interaction.interaction_analysis(brute_force=True)
+    results = interaction.interaction_analysis()
+    assert len(pair_keys(expected)) > 0
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", DELAYS)
+def test_analytic_equals_polygons_vultures(vultures, vulture_fields, minute_min_delay, minute_max_delay):
+    interaction = ORTEGA(vultures, minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay,
+                         max_el_time_min=120, crs=3857, **vulture_fields)
+    expected = interaction.interaction_analysis()
+    results = interaction.interaction_analysis(analytic=True)
+    assert pair_keys(results) == pair_keys(expected)
+    if expected is not None:
+        pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+def test_analytic_contains_polygons_synthetic(synthetic):
+    # the polygons are inscribed in the ellipses: every pair of intersecting polygons is a pair of intersecting
+    # ellipses, and the few extra analytic pairs only touch within the gap between the polygon and the ellipse
+    interaction = ORTEGA(synthetic, minute_min_delay=0, minute_max_delay=10, max_el_time_min=30)
+    polygons = pair_keys(interaction.interaction_analysis())
+    analytic = pair_keys(interaction.interaction_analysis(analytic=True))
+    assert len(polygons) > 0
+    assert polygons <= analytic
+    assert len(analytic - polygons) <= 0.01 * len(polygons)
+
+
+@pytest.mark.parametrize("step", [pd.Timedelta(minutes=10), pd.Timedelta(milliseconds=250)])
+@pytest.mark.parametrize("sort", [True, False])
+def test_check_continuous_equals_baseline(step, sort):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        df = random_pairs(rng, step, sort)
+        pd.testing.assert_frame_equal(check_continuous(df, "a", "b"), baseline_check_continuous(df, "a", "b"))
+
+
+def test_check_continuous_vultures(vultures, vulture_fields):
+    interaction = ORTEGA(vultures, minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857,
+                         **vulture_fields)
+    pairs = interaction.interaction_analysis().df_all_intersection_pairs
+    pd.testing.assert_frame_equal(check_continuous(pairs, interaction.id1, interaction.id2),
+                                  baseline_check_continuous(pairs, interaction.id1, interaction.id2))
+
+
+
+@pytest.mark.parametrize("step", [pd.Timedelta(minutes=10), pd.Timedelta(milliseconds=250)])
+def test_last_segment_start_equals_segment_starts(step):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        # long runs of continued pairs so that the search reads back over several windows
+        df = pd.concat([random_pairs(rng, step, True) for _ in range(int(rng.integers(1, 6)))], ignore_index=True)
+        df = pd.concat([df] + [df.iloc[-1:]] * int(rng.integers(0, 300)), ignore_index=True)
+        starts = np.flatnonzero(segment_starts(df))
+        for stop in np.unique(np.r_[0, len(df), rng.integers(0, len(df) + 1, 30)]):
+            expected = starts[starts < stop].max() if stop > 0 else 0
+            assert last_segment_start(df, stop) == expected
+
+def test_check_continuous_empty():
+    df = pd.DataFrame({column: pd.Series(dtype="datetime64[ns]")
+                       for column in ["p1_t_start", "p1_t_end", "p2_t_start", "p2_t_end"]})
+    events = check_continuous(df, "a", "b")
+    assert events.shape[0] == 0
+    assert list(events.columns) == ["p1", "p2", "p1_start", "p1_end", "p2_start", "p2_end", "difference"]
+
+
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", DELAYS)
+def test_pair_table_equals_per_pair_rows(vultures, vulture_fields, minute_min_delay, minute_max_delay):
+    # the pair table gathered from the PPA tables against one row per pair built from the Ellipse objects
+    interaction = ORTEGA(vultures, minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay,
+                         max_el_time_min=120, crs=3857, **vulture_fields)
+    results = interaction.interaction_analysis()
+    if results is None:
+        return
+    names = {"pid": "p{num}", "t0": "p{num}_t_start", "t1": "p{num}_t_end", "last_lat": "p{num}_startlat",
+             "last_lon": "p{num}_startlon", "lat": "p{num}_endlat", "lon": "p{num}_endlon",
+             "speed": "p{num}_speed", "direction": "p{num}_direction"}
+    expected = pd.DataFrame([
+        {name.format(num=num): getattr(e, key) for num, e in [(1, p1), (2, p2)] for key, name in names.items()}
+        for p1, p2 in results.intersection_ellipse_pair
+    ])
+    # the times of the pairs have the dtype of the time field
+    expected = expected.astype({f"p{num}_t_{point}": vultures[vulture_fields["time_field"]].dtype
+                                for num in [1, 2] for point in ["start", "end"]})
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs[expected.columns], expected)
+
+
+@pytest.mark.parametrize("unit", ["s", "us", "ns"])
+def test_times_keep_the_dtype_of_the_time_field(vultures, vulture_fields, unit):
+    data = vultures.astype({vulture_fields["time_field"]: f"datetime64[{unit}]"})
+    kwargs = dict(minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857, **vulture_fields)
+    split = data[vulture_fields["time_field"]] < "2013-10-12"
+    appended = ORTEGA(data[split], **kwargs)
+    appended.interaction_analysis()
+    interaction = ORTEGA(data, **kwargs)
+    interaction.delay_sweep([(0, 60), (0, 5000)])
+    group = ORTEGAGroup(data, **kwargs)
+    stream = ORTEGAResults.concat(ORTEGAStream(**kwargs).run([data[split], data[~split]]))
+    for results in [interaction.interaction_analysis(), interaction.window_analysis("2013-10-01 00:00:00"),
+                    interaction.sweep_results[(0, 5000)], appended.append(data[~split]),
+                    group.interaction_analysis(), stream]:
+        for column in ["p1_t_start", "p1_t_end", "p2_t_start", "p2_t_end"]:
+            assert results.df_all_intersection_pairs[column].dtype == f"datetime64[{unit}]"
+        for column in ["p1_start", "p1_end", "p2_start", "p2_end"]:
+            assert results.df_interaction_events[column].dtype == f"datetime64[{unit}]"
+
+
+def test_ppa_statistics_go_to_the_instrumentation(vultures, vulture_fields, capsys):
+    class Messages(Instrumentation):
+        def __init__(self):
+            self.messages = []
+
+        def on_message(self, message: str):
+            self.messages.append(message)
+
+    instrumentation = Messages()
+    interaction = ORTEGA(vultures, minute_max_delay=60, max_el_time_min=120, crs=3857,
+                         instrumentation=instrumentation, **vulture_fields)
+    capsys.readouterr()
+    speeds = interaction.compute_ppa_speed()
+    areas = interaction.compute_ppa_area()
+    interaction.compute_ppa_perimeter()
+    interaction.compute_ppa_interval()
+    assert capsys.readouterr().out == ""
+    statistics = [m for m in instrumentation.messages if m.startswith("Descriptive statistics")]
+    assert len(statistics) == 8
+    assert statistics[0].startswith(f"Descriptive statistics of PPA speed (m/s) for id {interaction.id1}:")
+    assert str(pd.Series(speeds[0]).describe()) in statistics[0]
+    assert "area (square kilometer)" in statistics[2] and str(pd.Series(areas[1]).describe()) in statistics[3]
+
+
+@pytest.mark.parametrize("analytic", [False, True])
+def test_delay_sweep_equals_fresh_runs(vultures, vulture_fields, analytic):
+    windows = DELAYS + [(30, 120), (6000, 7000)]
+    kwargs = dict(max_el_time_min=120, crs=3857, attr_fields=["speed"], **vulture_fields)
+    interaction = ORTEGA(vultures, minute_max_delay=60, **kwargs)
+    summary = interaction.delay_sweep(windows, analytic=analytic)
+    assert list(summary.columns) == ["minute_min_delay", "minute_max_delay", "pairs", "events", "duration"]
+    assert list(zip(summary["minute_min_delay"], summary["minute_max_delay"])) == windows
+    for row, window in zip(summary.itertuples(), windows):
+        expected = ORTEGA(vultures, minute_min_delay=window[0], minute_max_delay=window[1],
+                          **kwargs).interaction_analysis(analytic=analytic)
+        results = interaction.sweep_results[window]
+        if expected is None:
+            assert results is None
+            assert (row.pairs, row.events, row.duration) == (0, 0, 0)
+            continue
+        pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+        pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+        assert pair_keys(results) == pair_keys(expected)
+        expected.compute_interaction_duration()
+        assert (row.pairs, row.events) == (len(expected.df_all_intersection_pairs),
+                                           len(expected.df_interaction_events))
+        assert row.duration == pytest.approx(expected.df_interaction_events["duration"].sum())
+
+
+WINDOWS = [("2013-10-05 00:00:00", None), (None, "2013-10-08 12:00:00"), ("2013-10-01 00:00:00", "2013-10-10 00:00:00")]
+
+
+@pytest.mark.parametrize("start_time, end_time", WINDOWS)
+def test_window_analysis_equals_ortega_window(vultures, vulture_fields, start_time, end_time):
+    # the PPAs of the window are the ones between two points of the window; only the rows of the points in the
+    # attribute tables differ, as the tables of the window start at its first point
+    kwargs = dict(minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857, **vulture_fields)
+    expected = ORTEGA(vultures, start_time=start_time, end_time=end_time, **kwargs).interaction_analysis()
+    results = ORTEGA(vultures, **kwargs).window_analysis(start_time, end_time)
+    assert len(pair_keys(expected)) > 0
+    assert pair_keys(results) == pair_keys(expected)
+    columns = [c for c in expected.df_all_intersection_pairs.columns if not c.endswith("_row")]
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs[columns],
+                                  expected.df_all_intersection_pairs[columns])
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+def test_window_analysis_after_append(vultures, vulture_fields):
+    kwargs = dict(minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857, **vulture_fields)
+    full = ORTEGA(vultures, **kwargs)
+    split = pd.Timestamp("2013-10-06 00:00:00")
+    interaction = ORTEGA(vultures[vultures["timestamp"] < split], **kwargs)
+    before = len(interaction.ppa_index)
+    interaction.append(vultures[vultures["timestamp"] >= split])
+    # the index of the PPAs is built again with the new PPAs
+    assert len(interaction.ppa_index) == len(full.ppa_index) > before
+    np.testing.assert_array_equal(interaction.ppa_index.records, full.ppa_index.records)
+    expected = full.window_analysis("2013-10-05 00:00:00", "2013-10-10 00:00:00")
+    results = interaction.window_analysis("2013-10-05 00:00:00", "2013-10-10 00:00:00")
+    assert len(pair_keys(expected)) > 0
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ortega import ORTEGA
+from ortega.output import ATTRIBUTE_METHODS
+
+
+def baseline_extract_attributes(df: pd.DataFrame, col: str, method: str) -> pd.DataFrame:
+    # the row-wise apply over the p{num}_start_attrs and p{num}_end_attrs dicts that extract_attributes replaced,
+    # extended with the min and max reducers
+    prefix, _ = ATTRIBUTE_METHODS[method]
+    combine = {"mean": lambda a, b: (a + b) / 2, "difference": lambda a, b: a - b, "min": min, "max": max}[method]
+
+    def reduce(row):
+        row['p1_attrs_' + col] = (row['p1_start_attrs'][col] + row['p1_end_attrs'][col]) / 2
+        row['p2_attrs_' + col] = (row['p2_start_attrs'][col] + row['p2_end_attrs'][col]) / 2
+        row[prefix + col] = combine(row['p1_attrs_' + col], row['p2_attrs_' + col])
+        return row
+
+    return df.apply(reduce, axis=1)
+
+
+@pytest.fixture
+def vulture_results(vultures, vulture_fields):
+    interaction = ORTEGA(vultures, minute_min_delay=0, minute_max_delay=5000, max_el_time_min=120, crs=3857,
+                         attr_fields=["speed", "stepLength"], **vulture_fields)
+    return interaction.interaction_analysis()
+
+
+@pytest.mark.parametrize("method", list(ATTRIBUTE_METHODS))
+def test_attach_attributes_equals_row_dicts(vulture_results, method):
+    results = vulture_results
+    pairs = results.df_all_intersection_pairs
+    # the attribute dicts of the two points of each PPA, as the pair table had them
+    dicts = pd.DataFrame([
+        {f'p{num}_{point}_attrs': e.to_dict(results.attributes[e.pid])[key]
+         for num, e in [(1, p1), (2, p2)] for point, key in [('start', 'last_attrs'), ('end', 'attrs')]}
+        for p1, p2 in results.intersection_ellipse_pair
+    ])
+    expected = baseline_extract_attributes(pd.concat([pairs, dicts], axis=1), "speed", method)
+    expected = baseline_extract_attributes(expected, "stepLength", method)
+
+    results.attach_attributes(["speed", "stepLength"], method)
+    prefix, _ = ATTRIBUTE_METHODS[method]
+    columns = [f'p{num}_attrs_{col}' for col in ["speed", "stepLength"] for num in [1, 2]] + \
+              [prefix + "speed", prefix + "stepLength"]
+    assert pairs.shape[0] > 0
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs[columns], expected[columns].astype(float))
+    if method in ["min", "max"]:
+        values = expected[["p1_attrs_speed", "p2_attrs_speed"]].to_numpy(dtype=float)
+        reduced = values.min(axis=1) if method == "min" else values.max(axis=1)
+        np.testing.assert_array_equal(results.df_all_intersection_pairs[prefix + "speed"], reduced)
+
+
+def test_attach_attributes_rejects_unknown_method(vulture_results):
+    with pytest.raises(ValueError, match="Parameter 'method' must be one of these"):
+        vulture_results.attach_attributes("speed", "median")
+    with pytest.raises(KeyError, match="not in 'attr_fields'"):
+        vulture_results.attach_attributes("migration_state", "mean")
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pyproj import Transformer
+from ortega import ORTEGA, ORTEGAGroup
+from ortega.projection import local_crs
+
+KWARGS = dict(minute_min_delay=0, minute_max_delay=10, max_el_time_min=30)
+
+
+def to_degrees(tracks: pd.DataFrame, lat_0: float, lon_0: float) -> pd.DataFrame:
+    # synthetic tracks in meters placed around (lat_0, lon_0) as WGS84 latitude/longitude
+    df = tracks.copy()
+    df["latitude"] = lat_0 + tracks["latitude"] / 111320
+    df["longitude"] = lon_0 + tracks["longitude"] / (111320 * np.cos(np.radians(lat_0)))
+    return df
+
+
+def test_local_crs_picks_utm_zone_or_laea():
+    assert local_crs(np.array([-117.9, -117.1]), np.array([34.0, 34.5])).to_epsg() == 32611
+    assert local_crs(np.array([10.2, 11.0]), np.array([-33.0, -32.0])).to_epsg() == 32732
+    # the UTM zones 10 and 11 meet at 120 degrees west
+    crs = local_crs(np.array([-120.2, -119.8]), np.array([34.0, 34.5]))
+    assert crs.is_projected and crs.to_epsg() is None
+    assert "Lambert azimuthal equal-area" in crs.name
+    assert crs.coordinate_operation.params[0].value == pytest.approx(34.25)
+    assert crs.coordinate_operation.params[1].value == pytest.approx(-120.0)
+
+
+@pytest.mark.parametrize("lon_0, expected", [(-117.5, "WGS 84 / UTM zone 11N"), (-120.0, "Lambert")])
+def test_auto_crs(synthetic, lon_0, expected):
+    data = to_degrees(synthetic, 34.0, lon_0)
+    interaction = ORTEGA(data, crs="auto", **KWARGS)
+    assert expected in interaction.target_crs.name
+    # the PPAs are created from the projected points, as with the data projected beforehand
+    x, y = Transformer.from_crs("EPSG:4326", interaction.target_crs, always_xy=True).transform(
+        data["longitude"].to_numpy(), data["latitude"].to_numpy())
+    projected = data.assign(latitude=y, longitude=x)
+    expected_results = ORTEGA(projected, **KWARGS).interaction_analysis()
+    results = interaction.interaction_analysis()
+    assert len(results.intersection_ellipse_pair) > 0
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected_results.df_all_intersection_pairs)
+
+
+def test_explicit_epsg_crs(synthetic):
+    data = to_degrees(synthetic, 34.0, -117.5)
+    interaction = ORTEGA(data, crs=32611, **KWARGS)
+    assert interaction.target_crs.to_epsg() == 32611
+    x, y = Transformer.from_crs("EPSG:4326", "EPSG:32611", always_xy=True).transform(
+        data["longitude"].to_numpy(), data["latitude"].to_numpy())
+    first = interaction.ellipses_list_id1[0]
+    track = data["pid"] == interaction.id1
+    np.testing.assert_allclose([first.last_lat, first.last_lon, first.lat, first.lon],
+                               [y[track][0], x[track][0], y[track][1], x[track][1]])
+    group = ORTEGAGroup(data, crs="EPSG:32611", **KWARGS)
+    assert group.target_crs.to_epsg() == 32611
+
+
+def test_append_reuses_transformer(synthetic):
+    # the points appended across the zone boundary are projected with the CRS picked for the first points
+    data = to_degrees(synthetic, 34.0, -120.0 + 0.02)
+    split = data["time_local"].min() + (data["time_local"].max() - data["time_local"].min()) / 2
+    interaction = ORTEGA(data[data["time_local"] < split], crs="auto", **KWARGS)
+    transformer = interaction.transformer
+    assert transformer.target_crs.to_epsg() == 32611
+    interaction.interaction_analysis()
+    results = interaction.append(data[data["time_local"] >= split])
+    assert interaction.transformer is transformer
+    assert "Lambert" in ORTEGA(data, crs="auto", **KWARGS).target_crs.name
+    expected = ORTEGA(data, crs=32611, **KWARGS)
+    assert interaction.ellipses_list == expected.ellipses_list
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs,
+                                  expected.interaction_analysis().df_all_intersection_pairs)
+
+
+@pytest.mark.parametrize("crs", [4326, "EPSG:4269", "+proj=longlat +datum=WGS84"])
+def test_geographic_crs_is_rejected(synthetic, crs):
+    data = to_degrees(synthetic, 34.0, -117.5)
+    with pytest.raises(ValueError, match="Parameter 'crs' must be a projected CRS!"):
+        ORTEGA(data, crs=crs, **KWARGS)
+    with pytest.raises(ValueError, match="Parameter 'crs' must be a projected CRS!"):
+        ORTEGAGroup(data, crs=crs, **KWARGS)
+    with pytest.raises(ValueError, match="a CRS accepted by pyproj"):
+        ORTEGA(data, crs="not a crs", **KWARGS)
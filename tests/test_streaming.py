@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ortega import ORTEGA, ORTEGAResults, ORTEGAStream
+
+
+@pytest.mark.parametrize("chunksize", [7, 50, 5000])
+@pytest.mark.parametrize("minute_min_delay, minute_max_delay", [(0, 60), (1000, 5000)])
+def test_concat_of_stream_results_equals_ortega(vultures, vulture_fields, tmp_path, chunksize, minute_min_delay,
+                                                minute_max_delay):
+    kwargs = dict(minute_min_delay=minute_min_delay, minute_max_delay=minute_max_delay, max_el_time_min=120,
+                  speed_average=True, crs=3857, attr_fields=["speed", "stepLength"], **vulture_fields)
+    path = tmp_path / "tracks.csv"
+    vultures.to_csv(path, index=False)
+    expected = ORTEGA(vultures, **kwargs).interaction_analysis()
+    expected.attach_attributes(["speed", "stepLength"], "mean")
+
+    results = ORTEGAResults.concat(list(ORTEGAStream(**kwargs).run(str(path), chunksize=chunksize)))
+    results.attach_attributes(["speed", "stepLength"], "mean")
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
+
+
+def test_long_continuous_interaction():
+    # two individuals moving together for the whole track form one interaction event spanning every chunk
+    n = 3000
+    rng = np.random.default_rng(0)
+    times = pd.Timestamp("2020-01-01") + pd.to_timedelta(np.arange(n) * 60, unit="s")
+    x = np.arange(n) * 10.0
+    tracks = pd.concat([
+        pd.DataFrame({"pid": "a", "time_local": times, "latitude": x + rng.normal(size=n),
+                      "longitude": rng.normal(size=n)}),
+        pd.DataFrame({"pid": "b", "time_local": times + pd.Timedelta(seconds=30), "latitude": x + rng.normal(size=n),
+                      "longitude": rng.normal(size=n)}),
+    ]).sort_values("time_local", kind="stable").reset_index(drop=True)
+    kwargs = dict(minute_min_delay=0, minute_max_delay=2, max_el_time_min=10)
+    expected = ORTEGA(tracks, **kwargs).interaction_analysis(analytic=True)
+
+    stream = ORTEGAStream(analytic=True, **kwargs)
+    chunks = [tracks.iloc[start:start + 200] for start in range(0, len(tracks), 200)]
+    results = ORTEGAResults.concat(list(stream.run(chunks)))
+    assert len(results.df_interaction_events) == len(expected.df_interaction_events)
+    pd.testing.assert_frame_equal(results.df_all_intersection_pairs, expected.df_all_intersection_pairs)
+    pd.testing.assert_frame_equal(results.df_interaction_events, expected.df_interaction_events)
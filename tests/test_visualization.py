@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from ortega import ORTEGA
+from ortega.ellipses import EllipseStore, ellipse_bounds, ellipse_parameters
+from ortega.visualization import decimate, plot_interaction, plot_original_tracks, plot_ppas
+
+
+@pytest.fixture(scope="module")
+def interaction(vultures, vulture_fields):
+    return ORTEGA(vultures, minute_max_delay=60, max_el_time_min=120, crs=3857, **vulture_fields)
+
+
+@pytest.fixture(autouse=True)
+def close_figures():
+    yield
+    plt.close("all")
+
+
+def segment_counts(ax):
+    return [len(collection.get_segments()) for collection in ax.collections]
+
+
+def test_plot_ppas_draws_one_collection_per_individual(interaction):
+    collections = [interaction.ellipses_list_id1, interaction.ellipses_list_id2]
+    fig, ax = plt.subplots(1)
+    plot_ppas(ax, collections, ["red", "blue"])
+    # the ellipses then the segments of each individual
+    n1, n2 = len(collections[0]), len(collections[1])
+    assert segment_counts(ax) == [n1, n1, n2, n2]
+    assert all(len(ring) == 101 for ring in ax.collections[0].get_segments())
+    fig, ax = plt.subplots(1)
+    plot_ppas(ax, collections, ["red", "blue"], segments=False)
+    assert segment_counts(ax) == [n1, n2]
+
+
+def test_plot_ppas_decimation(interaction):
+    collections = [interaction.ellipses_list_id1, interaction.ellipses_list_id2]
+    fig, ax = plt.subplots(1)
+    plot_ppas(ax, collections, ["red", "blue"], max_ppas=50)
+    assert segment_counts(ax) == [50, 50, 50, 50]
+    assert decimate(10, 20).tolist() == list(range(10))
+    assert decimate(10, 4).tolist() == [0, 3, 6, 9]
+    with pytest.raises(ValueError, match="Parameter 'max_ppas' must be a positive integer!"):
+        plot_ppas(ax, collections, ["red", "blue"], max_ppas=0)
+
+    # the ellipses smaller than min_ppa_pixels are left out, their segments are still drawn
+    fig, ax = plt.subplots(1)
+    plot_ppas(ax, collections, ["red", "blue"], min_ppa_pixels=3)
+    majors = [ellipse_parameters(collection)[2] for collection in collections]
+    counts = segment_counts(ax)
+    assert counts[1] == len(collections[0]) and counts[3] == len(collections[1])
+    assert 0 < counts[0] < len(collections[0]) and counts[2] < len(collections[1])
+    # the threshold is 3 pixels of the axes once they show the bounding boxes of all PPAs
+    bounds = np.concatenate([ellipse_bounds(*ellipse_parameters(collection)) for collection in collections])
+    extent = ax.get_window_extent()
+    min_major = 3 * max((bounds[:, 3].max() - bounds[:, 1].min()) / extent.width,
+                        (bounds[:, 2].max() - bounds[:, 0].min()) / extent.height)
+    assert [counts[0], counts[2]] == [(major >= min_major).sum() for major in majors]
+
+
+def test_plot_ppas_accepts_store(interaction):
+    lists = [interaction.ellipses_list_id1, interaction.ellipses_list_id2]
+    store = EllipseStore.from_ellipses({interaction.id1: lists[0], interaction.id2: lists[1]})
+    fig, expected = plt.subplots(1)
+    plot_ppas(expected, lists, ["red", "blue"], max_ppas=200)
+    fig, ax = plt.subplots(1)
+    plot_ppas(ax, [store.individual(interaction.id1), store.individual(interaction.id2)], ["red", "blue"],
+              max_ppas=200)
+    assert segment_counts(ax) == segment_counts(expected) == [200, 200, 200, 200]
+    for collection, expected_collection in zip(ax.collections, expected.collections):
+        for segment, expected_segment in zip(collection.get_segments(), expected_collection.get_segments()):
+            np.testing.assert_allclose(segment, expected_segment)
+
+
+def test_plots_without_basemap(interaction):
+    plot_original_tracks(interaction, basemap=None, max_ppas=100)
+    assert segment_counts(plt.gca()) == [100, 100, 100, 100]
+    results = interaction.interaction_analysis()
+    plot_interaction(interaction, results.intersection_ellipse_pair, basemap=None)
+    n1, n2 = len(interaction.ellipses_list_id1), len(interaction.ellipses_list_id2)
+    assert segment_counts(plt.gca()) == [n1, n1, n2, n2, 2 * len(results.intersection_ellipse_pair)]
+
+
+def test_import_without_contextily():
+    # contextily is only needed for basemap="contextily"
+    code = ("import sys; sys.modules['contextily'] = None; import ortega; import ortega.visualization; "
+            "assert 'contextily' not in [m for m in sys.modules if sys.modules[m] is not None]")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.join(os.path.dirname(__file__), os.pardir))